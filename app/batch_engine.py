@@ -0,0 +1,113 @@
+import numpy as np
+
+from app.schedule_index import MINUTES_PER_DAY, catalog_intervals
+
+# Upper bound on the number of (timestamp, interval) cells evaluated at once
+CHUNK_CELLS = 4_000_000
+
+
+class BatchEngine:
+    """
+    Vectorized availability engine answering many timestamps against every
+    restaurant in one pass. Schedules are packed into int16 minute-of-week
+    start/end arrays with a parallel owner-id array.
+    """
+
+    def __init__(self, restaurants):
+        starts, ends, owners = catalog_intervals(restaurants)
+        self._set_arrays(list(restaurants.keys()), starts, ends, owners)
+
+    @classmethod
+    def from_arrays(cls, names, starts, ends, owners):
+        """
+        Builds an engine directly from interval arrays, e.g. ones mapped from a snapshot file.
+        Owners must be ascending so each restaurant's intervals are contiguous.
+        """
+        engine = cls.__new__(cls)
+        engine._set_arrays(names, starts, ends, owners)
+        return engine
+
+    def _set_arrays(self, names, starts, ends, owners):
+        self.names = names
+        self.starts = np.asarray(starts, dtype=np.int16)
+        self.ends = np.asarray(ends, dtype=np.int16)
+        self.owners = np.asarray(owners, dtype=np.int32)
+
+        # Owners are emitted in ascending order, so each restaurant's intervals are contiguous
+        self._owner_ids, self._owner_offsets = np.unique(self.owners, return_index=True)
+
+    def __len__(self):
+        return len(self.names)
+
+    @staticmethod
+    def _query_arrays(query_dts):
+        """
+        Splits datetimes into minute-of-week and "has seconds" arrays.
+        """
+        minutes = np.fromiter(
+            (dt.weekday() * MINUTES_PER_DAY + dt.hour * 60 + dt.minute for dt in query_dts),
+            dtype=np.int16,
+            count=len(query_dts),
+        )
+        sub_minute = np.fromiter(
+            (bool(dt.second or dt.microsecond) for dt in query_dts),
+            dtype=bool,
+            count=len(query_dts),
+        )
+        return minutes, sub_minute
+
+    def _open_blocks(self, query_dts):
+        """
+        Yields (lo, hi, block) where block[i, k] is True when the k-th restaurant
+        with hours is open at query_dts[lo + i]. Blocks hold at most CHUNK_CELLS
+        cells, so callers that aggregate never hold the whole matrix.
+        """
+        minutes, sub_minute = self._query_arrays(query_dts)
+        if not len(minutes) or not len(self.starts):
+            return
+
+        chunk = max(1, CHUNK_CELLS // len(self.starts))
+        for lo in range(0, len(minutes), chunk):
+            q = minutes[lo:lo + chunk, None]
+            sub = sub_minute[lo:lo + chunk, None]
+            # Closed intervals, except a sub-minute query is already past an end minute
+            hits = (self.starts <= q) & ((q < self.ends) | ((q == self.ends) & ~sub))
+            yield lo, lo + len(q), np.logical_or.reduceat(hits, self._owner_offsets, axis=1)
+
+    def open_matrix(self, query_dts):
+        """
+        Returns a boolean matrix of shape (len(query_dts), len(self)) where cell
+        [i, j] is True when restaurant j is open at query_dts[i].
+        """
+        matrix = np.zeros((len(query_dts), len(self.names)), dtype=bool)
+        for lo, hi, block in self._open_blocks(query_dts):
+            matrix[lo:hi, self._owner_ids] = block
+        return matrix
+
+    def open_counts(self, query_dts):
+        """
+        Returns the number of open restaurants at each of `query_dts`, one chunk
+        at a time without building the open matrix.
+        """
+        counts = np.zeros(len(query_dts), dtype=np.int32)
+        for lo, hi, block in self._open_blocks(query_dts):
+            counts[lo:hi] = block.sum(axis=1)
+        return counts
+
+    def open_id_lists(self, query_dts):
+        """
+        Returns, for each of `query_dts`, an ascending int32 array of the ids of
+        open restaurants, one chunk at a time without building the open matrix.
+        """
+        found = [np.zeros(0, dtype=np.int32)] * len(query_dts)
+        for lo, hi, block in self._open_blocks(query_dts):
+            rows, cols = np.nonzero(block)
+            found[lo:hi] = np.split(self._owner_ids[cols], np.searchsorted(rows, np.arange(1, hi - lo)))
+        return found
+
+    def open_names(self, query_dts):
+        """
+        Returns, for each of `query_dts`, the names of open restaurants in catalog order.
+        """
+        names = self.names
+        return [[names[j] for j in ids.tolist()] for ids in self.open_id_lists(query_dts)]
@@ -0,0 +1,499 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+from collections.abc import Mapping
+from functools import cached_property
+from types import MappingProxyType
+
+import numpy as np
+
+from app.data_handler import (
+    iter_restaurant_rows,
+    latest_change,
+    parse_failures,
+    read_changes,
+    record_parse_failures,
+)
+from app.schedule_index import ScheduleIndex, build_index_arrays, hours_digest, hours_to_blob
+from app.compact_schedule import CompactScheduleBuilder, CompactSchedules
+from app.batch_engine import BatchEngine
+from app.range_query import RangeIndex
+from app.transitions import TransitionTable
+from app.occupancy import WeeklyOccupancy
+from app.poller import Poller
+from app.timezones import ZoneGroups, is_valid_zone
+from app.response_cache import encode_names
+from app.metrics import (
+    CATALOG_INTERVALS,
+    CATALOG_LOAD_SECONDS,
+    CATALOG_RESTAURANTS,
+    CATALOG_VERSION,
+    CATALOG_WITHOUT_HOURS,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DB_PATH = "app/restaurants.db"
+
+# Delta size, as a share of the base mapping, at which HoursOverlay is materialized
+OVERLAY_COMPACT_FRACTION = 0.25
+
+
+class Catalog:
+    """
+    Immutable snapshot of the restaurant schedules and every lookup structure
+    derived from them. A request should read `CatalogStore.current` once and
+    use that snapshot throughout, so a concurrent reload is never half-visible.
+    """
+
+    def __init__(
+        self, restaurants, hours, version=0, index=None, batch=None, zone_names=None, zone_ids=None, occupancy=None
+    ):
+        self.version = version
+        if not isinstance(restaurants, CompactSchedules):
+            restaurants = CompactSchedules.from_mapping(restaurants)
+        # Read-only name -> schedule view over compact interval pools
+        self.restaurants = restaurants
+        self.hours = MappingProxyType(hours) if isinstance(hours, dict) else hours
+        # Timezone of each restaurant as an index into zone_names; None means unzoned
+        self.zone_names = tuple(zone_names) if zone_names is not None else (None,)
+        self.zone_ids = zone_ids if zone_ids is not None else np.zeros(len(restaurants), dtype=np.int32)
+        if index is None or batch is None:
+            # Both structures share one flattening of the schedules
+            names = restaurants.names
+            starts, ends, owners = restaurants.interval_arrays()
+            index = ScheduleIndex.from_arrays(names, build_index_arrays(starts, ends, owners))
+            batch = BatchEngine.from_arrays(names, starts, ends, owners)
+        self.index = index
+        self.batch = batch
+        if occupancy is not None:
+            self.occupancy = occupancy
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    @cached_property
+    def ranges(self):
+        """
+        RangeIndex for window queries, built on first use from the batch arrays.
+        """
+        batch = self.batch
+        return RangeIndex(batch.names, batch.starts, batch.ends, batch.owners)
+
+    @cached_property
+    def transitions(self):
+        """
+        TransitionTable for next open/close lookups, built on first use.
+        """
+        return TransitionTable(self.ranges)
+
+    @cached_property
+    def occupancy(self):
+        """
+        WeeklyOccupancy with the open count for every minute of the week, built on first use.
+        """
+        return WeeklyOccupancy.from_schedules(self.restaurants)
+
+    @cached_property
+    def encoded_names(self):
+        """
+        Each name as UTF-8 JSON string bytes, for responses built without an encoder pass.
+        """
+        return encode_names(self.index.names)
+
+    @cached_property
+    def zone_groups(self):
+        """
+        ZoneGroups for timezone-aware lookups, built on first use.
+        """
+        return ZoneGroups(self)
+
+    def zone_of(self, restaurant_id):
+        """
+        Returns a restaurant's timezone name, or None.
+        """
+        return self.zone_names[self.zone_ids[restaurant_id]]
+
+    @cached_property
+    def ids(self):
+        """
+        Restaurant name -> position in the catalog.
+        """
+        return self.restaurants.ids
+
+    @classmethod
+    def from_rows(cls, rows, previous=None):
+        """
+        Builds a catalog from (name, hours, intervals, hours_hash, timezone) rows.
+        Schedules of restaurants whose hours text is unchanged since `previous`
+        are reused, and a precomputed intervals blob is used instead of parsing
+        the hours when its hours_hash matches the row's current hours.
+        Returns the catalog and the number of rows that had to be parsed.
+        Occupancy is built with the catalog, or updated from `previous` by
+        applying only the restaurants that changed.
+        """
+        builder = CompactScheduleBuilder()
+        hours = {}
+        zone_names = {None: 0}
+        zone_ids = []
+        parsed = 0
+        old_hours = previous.hours if previous is not None else {}
+        old_ids = previous.ids if previous is not None else {}
+        # Catalog ids of restaurants carried over unchanged, in the previous and the new catalog
+        kept_old = []
+        kept_new = []
+
+        for name, hours_str, intervals, hours_hash, timezone in rows:
+            if name in hours:
+                logger.warning(f"Ignoring duplicate row for restaurant '{name}'")
+                continue
+            zone_id = zone_names.setdefault(_known_zone(name, timezone), len(zone_names))
+
+            hours[name] = hours_str
+            previous_id = None
+            if old_hours.get(name) == hours_str and name in old_ids:
+                previous_id = old_ids[name]
+                blob = previous.restaurants.blob(previous_id)
+            else:
+                blob = _stored_blob(hours_str, intervals, hours_hash)
+            added, row_parsed = _add_schedule(builder, name, hours_str, blob)
+            parsed += row_parsed
+            if not added:
+                continue
+            if previous_id is not None and not row_parsed:
+                kept_old.append(previous_id)
+                kept_new.append(len(zone_ids))
+            zone_ids.append(zone_id)
+
+        version = previous.version + 1 if previous is not None else 0
+        restaurants = builder.build()
+        if previous is not None and "occupancy" in vars(previous):
+            occupancy = previous.occupancy.updated(
+                previous.restaurants, np.setdiff1d(np.arange(len(previous)), kept_old),
+                restaurants, np.setdiff1d(np.arange(len(restaurants)), kept_new),
+            )
+        else:
+            occupancy = WeeklyOccupancy.from_schedules(restaurants)
+        catalog = cls(
+            restaurants, hours, version,
+            zone_names=list(zone_names), zone_ids=np.array(zone_ids, dtype=np.int32), occupancy=occupancy,
+        )
+        return catalog, parsed
+
+    def patched(self, rows, deleted):
+        """
+        Returns a catalog with the (name, hours, intervals, hours_hash, timezone)
+        `rows` inserted or updated and the `deleted` names removed, plus the
+        number of rows that had to be parsed. Only the changed restaurants are
+        visited one by one: updated ones keep their id, new ones are appended,
+        and everything else is carried over with array copies. Hours text is an
+        overlay of the changed rows on the previous mapping. The interval index
+        is patched rather than rebuilt until patches make up too much of it,
+        and occupancy is updated by the delta.
+        """
+        old_ids = self.ids
+        keep = np.ones(len(self), dtype=bool)
+        changed_hours = {}
+        for name in deleted:
+            if name in old_ids:
+                keep[old_ids[name]] = False
+
+        builder = CompactScheduleBuilder()
+        zone_names = {zone: i for i, zone in enumerate(self.zone_names)}
+        # Per delta restaurant, the id it replaces (-1 when new) and its zone
+        replace_ids = []
+        delta_zones = []
+        parsed = 0
+        for name, hours_str, intervals, hours_hash, timezone in rows:
+            zone_id = zone_names.setdefault(_known_zone(name, timezone), len(zone_names))
+            previous_id = old_ids.get(name, -1)
+            if previous_id >= 0 and self.hours.get(name) == hours_str:
+                blob = self.restaurants.blob(previous_id)
+            else:
+                blob = _stored_blob(hours_str, intervals, hours_hash)
+            changed_hours[name] = hours_str
+            added, row_parsed = _add_schedule(builder, name, hours_str, blob)
+            parsed += row_parsed
+            if added:
+                replace_ids.append(previous_id)
+                delta_zones.append(zone_id)
+            elif previous_id >= 0:
+                keep[previous_id] = False
+
+        restaurants = self.restaurants.spliced(keep, replace_ids, builder.build())
+        replace_ids = np.array(replace_ids, dtype=np.int64)
+        replaced = replace_ids >= 0
+        delta_zones = np.array(delta_zones, dtype=np.int32)
+        zone_ids = np.array(self.zone_ids, dtype=np.int32)
+        zone_ids[replace_ids[replaced]] = delta_zones[replaced]
+        zone_ids = np.concatenate([zone_ids[keep], delta_zones[~replaced]])
+
+        # Old ids whose intervals are gone, and the new ids of the delta restaurants
+        new_ids = np.cumsum(keep) - 1
+        dropped_ids = np.union1d(np.flatnonzero(~keep), replace_ids[replaced])
+        changed_ids = np.concatenate([new_ids[replace_ids[replaced]], np.arange(int(keep.sum()), len(restaurants))])
+        names = restaurants.names
+        starts, ends, owners = restaurants.interval_arrays()
+        batch = BatchEngine.from_arrays(names, starts, ends, owners)
+        changed_intervals = restaurants.intervals_of(changed_ids)
+        if self.index.needs_rebuild(len(changed_intervals[0])):
+            # Patched nodes are never rebalanced, so rebuild once patches make up enough of the tree
+            index = ScheduleIndex.from_arrays(names, build_index_arrays(starts, ends, owners))
+        else:
+            index = self.index.patched(names, dropped_ids, new_ids, *changed_intervals)
+        if "occupancy" in vars(self):
+            occupancy = self.occupancy.updated(self.restaurants, dropped_ids, restaurants, changed_ids)
+        else:
+            occupancy = WeeklyOccupancy.from_schedules(restaurants)
+        hours = HoursOverlay.over(self.hours, changed_hours, deleted)
+        catalog = Catalog(
+            restaurants, hours, self.version + 1, index=index, batch=batch,
+            zone_names=list(zone_names), zone_ids=zone_ids, occupancy=occupancy,
+        )
+        return catalog, parsed
+
+
+def _known_zone(name, timezone):
+    """
+    Returns the row's timezone, or None when it is not a known IANA name.
+    """
+    if timezone is not None and not is_valid_zone(timezone):
+        logger.error(f"Unknown timezone '{timezone}' for restaurant '{name}', ignoring it")
+        return None
+    return timezone
+
+
+def _stored_blob(hours_str, intervals, hours_hash):
+    """
+    Returns a row's stored intervals blob if its hours_hash vouches for the
+    current hours text, else None.
+    """
+    if intervals is not None and hours_hash == hours_digest(hours_str):
+        return bytes(intervals)
+    return None
+
+
+def _add_schedule(builder, name, hours_str, blob):
+    """
+    Adds a restaurant to builder from `blob`, a reused or stored encoding, or
+    by parsing its hours when there is none or it is invalid. Returns
+    (added, parsed).
+    """
+    if blob is not None:
+        try:
+            builder.add(name, blob)
+            return True, False
+        except ValueError as ve:
+            logger.warning(f"Ignoring stored intervals for restaurant '{name}': {ve}")
+    try:
+        blob = hours_to_blob(hours_str)
+        record_parse_failures(parse_failures(hours_str))
+        builder.add(name, blob)
+        return True, True
+    except ValueError as ve:
+        logger.error(f"Error parsing hours for restaurant '{name}': {ve}")
+        return False, True
+
+
+def record_catalog_metrics(catalog, source, seconds):
+    """
+    Publishes a newly loaded catalog's load time and size to /metrics.
+    """
+    owners = catalog.batch.owners
+    CATALOG_LOAD_SECONDS.labels(source).observe(seconds)
+    CATALOG_RESTAURANTS.set(len(catalog))
+    CATALOG_INTERVALS.set(len(owners))
+    CATALOG_WITHOUT_HOURS.set(int(np.count_nonzero(np.asarray(catalog.restaurants.counts) == 0)))
+    CATALOG_VERSION.set(catalog.version)
+
+
+class HoursOverlay(Mapping):
+    """
+    Name -> hours text mapping of a patched catalog: the changed and deleted
+    names over a base mapping, so a reload costs O(changed rows) instead of
+    copying every name. Overlays of overlays are flattened onto the same base,
+    which is materialized into a plain dict once the delta outgrows
+    OVERLAY_COMPACT_FRACTION of it.
+    """
+
+    def __init__(self, base, changed, deleted):
+        self._base = base
+        self._changed = changed
+        self._deleted = deleted
+        self._len = (
+            len(base)
+            + sum(1 for name in changed if name not in base)
+            - sum(1 for name in deleted if name in base)
+        )
+
+    @classmethod
+    def over(cls, hours, changed, deleted):
+        """
+        Returns `hours` with `changed` (name -> hours) applied and the `deleted` names removed.
+        """
+        deleted = set(deleted).difference(changed)
+        if isinstance(hours, cls):
+            changed = {
+                **{name: text for name, text in hours._changed.items() if name not in deleted},
+                **changed,
+            }
+            deleted = hours._deleted.difference(changed) | deleted
+            hours = hours._base
+        if len(changed) + len(deleted) > OVERLAY_COMPACT_FRACTION * len(hours):
+            merged = {name: text for name, text in hours.items() if name not in deleted}
+            merged.update(changed)
+            return merged
+        return cls(hours, changed, deleted)
+
+    def __getitem__(self, name):
+        if name in self._changed:
+            return self._changed[name]
+        if name in self._deleted:
+            raise KeyError(name)
+        return self._base[name]
+
+    def __contains__(self, name):
+        return name in self._changed or (name not in self._deleted and name in self._base)
+
+    def __iter__(self):
+        for name in self._base:
+            if name not in self._deleted:
+                yield name
+        for name in self._changed:
+            if name not in self._base:
+                yield name
+
+    def __len__(self):
+        return self._len
+
+
+class CatalogStore:
+    """
+    Holds the current Catalog for a SQLite database and swaps in a new one when
+    the database changes. Changes are detected with PRAGMA data_version on a
+    long-lived connection plus the file's stat signature, which also catches
+    the database file being replaced.
+
+    When the database keeps a restaurant_changes log, a reload reads only the
+    rows logged since the last one and patches the current catalog; without a
+    usable log, or after the database file is replaced, it reads every row.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, snapshot_loader=None):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._conn = None
+        self._signature = None
+        # Change log position (log id, seq) the current catalog includes, None if unknown
+        self._change_seq = None
+        self._poller = Poller(self.reload, "catalog-reload")
+        self.current = Catalog({}, {})
+        if snapshot_loader is None or not self._load_snapshot(snapshot_loader):
+            self.reload(force=True)
+
+    def _load_snapshot(self, snapshot_loader):
+        """
+        Starts from a prebuilt catalog returned by snapshot_loader(db_path), which
+        returns None when its snapshot is missing or stale. Returns True on success.
+        """
+        with self._lock:
+            try:
+                # Taken first, so a write racing the staleness check triggers a reload
+                signature = self._data_signature()
+                change_seq = latest_change(self.db_path) if signature is not None else None
+            except sqlite3.Error as e:
+                logger.error(f"Error reading SQLite data version: {e}")
+                return False
+            start = time.perf_counter()
+            catalog = snapshot_loader(self.db_path)
+            if signature is None or catalog is None:
+                return False
+            self._signature = signature
+            self._change_seq = change_seq
+            self.current = catalog
+            record_catalog_metrics(catalog, "snapshot", time.perf_counter() - start)
+        logger.info(f"Loaded catalog snapshot: {len(catalog)} restaurants")
+        return True
+
+    def _file_signature(self):
+        try:
+            st = os.stat(self.db_path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+    def _data_signature(self):
+        """
+        Returns a tuple that changes whenever the database contents may have changed.
+        """
+        file_signature = self._file_signature()
+        if file_signature is None:
+            return None
+        if self._conn is None or self._signature is None or self._signature[0] != file_signature[0]:
+            # First run or the file was replaced, so reopen against the new inode
+            if self._conn is not None:
+                self._conn.close()
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        return file_signature + (data_version,)
+
+    def reload(self, force=False):
+        """
+        Reloads the catalog if the database changed. Returns True when a new
+        snapshot was published; changes that do not affect the catalog, such
+        as a cuisine edit, publish nothing.
+        """
+        with self._lock:
+            try:
+                signature = self._data_signature()
+                if signature is None:
+                    logger.error(f"Restaurant database not found at '{self.db_path}'")
+                    return False
+                if not force and signature == self._signature:
+                    return False
+
+                start = time.perf_counter()
+                changes = None
+                # A replaced file is another database, whatever its change log says
+                replaced = self._signature is not None and self._signature[0] != signature[0]
+                if not force and not replaced and self._change_seq is not None:
+                    changes = read_changes(self.db_path, self._change_seq)
+                if changes is not None:
+                    change_seq, rows, deleted = changes
+                    if not rows and not deleted:
+                        self._signature = signature
+                        self._change_seq = change_seq
+                        return False
+                    catalog, parsed = self.current.patched(rows, deleted)
+                    changed = f"{len(rows) + len(deleted)} changed"
+                else:
+                    # Read before the rows, so a write racing the load is applied again next time
+                    change_seq = latest_change(self.db_path)
+                    catalog, parsed = Catalog.from_rows(
+                        iter_restaurant_rows(self.db_path, include_stored=True), previous=self.current
+                    )
+                    changed = "full reload"
+            except sqlite3.Error as e:
+                logger.error(f"Error reloading data from SQLite: {e}")
+                return False
+
+            self._signature = signature
+            self._change_seq = change_seq
+            self.current = catalog
+            record_catalog_metrics(catalog, "sqlite", time.perf_counter() - start)
+            logger.info(
+                f"Loaded catalog version {catalog.version}: "
+                f"{len(catalog)} restaurants ({changed}), {parsed} hours strings parsed"
+            )
+            return True
+
+    def start_polling(self, interval):
+        """
+        Starts a daemon thread that checks the database for changes every `interval` seconds.
+        """
+        self._poller.start(interval)
+
+    def stop_polling(self):
+        self._poller.stop()
@@ -0,0 +1,224 @@
+from array import array
+from collections.abc import Mapping
+from functools import cached_property
+from itertools import compress
+
+import numpy as np
+
+from app.schedule_index import decode_intervals, encode_intervals, schedule_from_blob, schedule_to_intervals
+
+# Pools are compacted once dropped entries outnumber live ones by this many
+COMPACT_MIN_ENTRIES = 4096
+
+
+class CompactSchedules(Mapping):
+    """
+    Every restaurant's weekly intervals in shared flat arrays instead of a
+    dictionary of datetime.time tuples per restaurant.
+
+    Intervals live in `starts`/`ends` pools of minute-of-week values; restaurant
+    i owns pool entries first[i] .. first[i] + counts[i]. Restaurants with the
+    same hours point at the same entries, so a chain's schedule is stored once.
+    Per restaurant that leaves 6 bytes of offsets plus its name.
+
+    As a Mapping it is a compatibility view: catalog[name] returns the same
+    read-only day -> ((open, close), ...) mapping parse_hours_cached would,
+    decoded on access and shared between restaurants with identical hours.
+    """
+
+    def __init__(self, names, starts, ends, first, counts):
+        self.names = names
+        self.starts = starts
+        self.ends = ends
+        self.first = first
+        self.counts = counts
+
+    @classmethod
+    def from_mapping(cls, restaurants):
+        """
+        Packs a name -> schedule mapping, as returned by load_data, into a CompactSchedules.
+        """
+        builder = CompactScheduleBuilder()
+        converted = {}
+        for name, schedule in restaurants.items():
+            key = id(schedule)
+            if key not in converted:
+                converted[key] = (schedule, encode_intervals(schedule_to_intervals(schedule)))
+            builder.add(name, converted[key][1])
+        return builder.build()
+
+    @cached_property
+    def ids(self):
+        """
+        Name -> restaurant id, built on first use.
+        """
+        return dict(zip(self.names, range(len(self.names))))
+
+    def __getitem__(self, name):
+        return schedule_from_blob(self.blob(self.ids[name]))
+
+    def __contains__(self, name):
+        return name in self.ids
+
+    def __iter__(self):
+        return iter(self.names)
+
+    def __len__(self):
+        return len(self.names)
+
+    def blob(self, restaurant_id):
+        """
+        Returns a restaurant's intervals in the encode_intervals format.
+        """
+        a = int(self.first[restaurant_id])
+        b = a + int(self.counts[restaurant_id])
+        pairs = np.empty((b - a, 2), dtype="<u2")
+        pairs[:, 0] = self.starts[a:b]
+        pairs[:, 1] = self.ends[a:b]
+        return pairs.tobytes()
+
+    def interval_arrays(self):
+        """
+        Expands the pools into per-interval int32 (starts, ends, owners) arrays
+        in restaurant order, the input build_index_arrays and BatchEngine expect.
+        """
+        counts = np.asarray(self.counts, dtype=np.int64)
+        total = int(counts.sum())
+        owners = np.repeat(np.arange(len(counts), dtype=np.int32), counts)
+        # Position of each interval within its restaurant, added to the restaurant's first entry
+        run_starts = np.cumsum(counts) - counts
+        pool = np.repeat(np.asarray(self.first, dtype=np.int64) - run_starts, counts) + np.arange(total)
+        return (
+            np.asarray(self.starts, dtype=np.int32)[pool],
+            np.asarray(self.ends, dtype=np.int32)[pool],
+            owners,
+        )
+
+    def spliced(self, keep, replace_ids, delta):
+        """
+        Returns a CompactSchedules with the restaurants of `delta` merged in:
+        delta restaurant j takes over id replace_ids[j], or is appended when
+        that is -1, and restaurants whose `keep` mask entry is False are then
+        dropped. Pool entries of unchanged restaurants are reused as they are,
+        so the work is a few array copies plus the delta's intervals.
+        """
+        replace_ids = np.asarray(replace_ids, dtype=np.int64)
+        replaced = replace_ids >= 0
+        appended = np.flatnonzero(~replaced)
+        offset = len(self.starts)
+        delta_first = np.asarray(delta.first, dtype=np.int64) + offset
+        first = np.asarray(self.first, dtype=np.int64).copy()
+        counts = np.asarray(self.counts, dtype=np.uint16).copy()
+        first[replace_ids[replaced]] = delta_first[replaced]
+        counts[replace_ids[replaced]] = np.asarray(delta.counts)[replaced]
+
+        names = list(compress(self.names, keep.tolist()))
+        names.extend(delta.names[j] for j in appended.tolist())
+        spliced = CompactSchedules(
+            names,
+            np.concatenate([self.starts, delta.starts]).astype(np.uint16),
+            np.concatenate([self.ends, delta.ends]).astype(np.uint16),
+            np.concatenate([first[keep], delta_first[appended]]).astype(np.uint32),
+            np.concatenate([counts[keep], np.asarray(delta.counts)[appended]]).astype(np.uint16),
+        )
+        if "ids" in vars(self):
+            # Only names from the first dropped restaurant on change position
+            dropped = np.flatnonzero(~keep)
+            lo = int(dropped[0]) if len(dropped) else len(keep)
+            ids = self.ids.copy()
+            for i in dropped.tolist():
+                del ids[self.names[i]]
+            ids.update(zip(names[lo:], range(lo, len(names))))
+            spliced.ids = ids
+        if len(spliced.starts) > 2 * spliced.live_entries() + COMPACT_MIN_ENTRIES:
+            return spliced.compacted()
+        return spliced
+
+    def live_entries(self):
+        """
+        Number of pool entries some restaurant still points at.
+        """
+        runs = np.unique(np.asarray(self.first, dtype=np.int64) * 65536 + np.asarray(self.counts, dtype=np.int64))
+        return int((runs % 65536).sum())
+
+    def intervals_of(self, restaurant_ids):
+        """
+        Returns (starts, ends, owners) int32 arrays for just the given restaurants.
+        """
+        restaurant_ids = np.asarray(restaurant_ids, dtype=np.int64)
+        counts = np.asarray(self.counts, dtype=np.int64)[restaurant_ids]
+        run_starts = np.cumsum(counts) - counts
+        pool = np.repeat(np.asarray(self.first, dtype=np.int64)[restaurant_ids] - run_starts, counts)
+        pool += np.arange(int(counts.sum()))
+        return (
+            np.asarray(self.starts, dtype=np.int32)[pool],
+            np.asarray(self.ends, dtype=np.int32)[pool],
+            np.repeat(restaurant_ids, counts).astype(np.int32),
+        )
+
+    def compacted(self):
+        """
+        Returns a copy whose pools hold only entries some restaurant points at,
+        dropping the ones left behind by restaurants that were replaced.
+        """
+        runs, inverse = np.unique(
+            np.asarray(self.first, dtype=np.int64) * 65536 + np.asarray(self.counts, dtype=np.int64),
+            return_inverse=True,
+        )
+        run_first, run_counts = runs // 65536, runs % 65536
+        new_first = np.cumsum(run_counts) - run_counts
+        pool = np.repeat(run_first - new_first, run_counts) + np.arange(int(run_counts.sum()))
+        compacted = CompactSchedules(
+            self.names,
+            np.asarray(self.starts)[pool].astype(np.uint16),
+            np.asarray(self.ends)[pool].astype(np.uint16),
+            new_first[inverse.reshape(-1)].astype(np.uint32),
+            np.asarray(self.counts, dtype=np.uint16).copy(),
+        )
+        if "ids" in vars(self):
+            compacted.ids = self.ids
+        return compacted
+
+    def nbytes(self):
+        """
+        Bytes held by the interval pools and per-restaurant offsets, excluding names.
+        """
+        return sum(np.asarray(a).nbytes for a in (self.starts, self.ends, self.first, self.counts))
+
+
+class CompactScheduleBuilder:
+    """
+    Accumulates restaurants as encode_intervals blobs, storing each distinct
+    blob's intervals once.
+    """
+
+    def __init__(self):
+        self.names = []
+        self._first = array("I")
+        self._counts = array("H")
+        self._pool = bytearray()
+        self._offsets = {}
+
+    def add(self, name, blob):
+        """
+        Appends a restaurant. Raises ValueError, adding nothing, if the blob is not a valid encoding.
+        """
+        first = self._offsets.get(blob)
+        if first is None:
+            # Validated once per distinct blob
+            decode_intervals(blob)
+            first = self._offsets[blob] = len(self._pool) // 4
+            self._pool += blob
+        self.names.append(name)
+        self._first.append(first)
+        self._counts.append(len(blob) // 4)
+
+    def build(self):
+        pairs = np.frombuffer(bytes(self._pool), dtype="<u2").reshape(-1, 2)
+        return CompactSchedules(
+            self.names,
+            pairs[:, 0].astype(np.uint16),
+            pairs[:, 1].astype(np.uint16),
+            np.frombuffer(self._first, dtype=np.uint32).copy(),
+            np.frombuffer(self._counts, dtype=np.uint16).copy(),
+        )
@@ -1,8 +1,12 @@
 import sqlite3
 from datetime import datetime, time
+from functools import lru_cache
+from types import MappingProxyType
 import re
 import logging
 
+from app.metrics import PARSE_FAILURES
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,6 +21,15 @@ DAYS_MAP = {
     "sun": 6
 }
 
+# Day abbreviations indexed by their DAYS_MAP value
+DAY_NAMES = sorted(DAYS_MAP, key=DAYS_MAP.get)
+
+# Precompiled so every time token does not go through re's pattern cache
+TIME_PATTERN = re.compile(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)')
+
+# Maximum number of distinct normalized hours strings kept by parse_hours_cached
+PARSE_CACHE_SIZE = 4096
+
 # Mapping of possible day name variations to standardized abbreviations
 day_aliases = {
     'mon': 'mon',
@@ -43,7 +56,7 @@ def parse_time_string(time_str):
     Parses a time string like '1:30 pm' into a datetime.time object.
     """
     time_str = time_str.strip().lower()
-    match = re.match(r'(\d{1,2})(?::(\d{2}))?\s*(am|pm)', time_str)
+    match = TIME_PATTERN.match(time_str)
     if not match:
         logger.error(f"Invalid time format: '{time_str}'")
         raise ValueError(f"Invalid time format: '{time_str}'")
@@ -100,7 +113,6 @@ def expand_day_range(start, end):
     """
     Expands a range of days into a list of standardized day abbreviations.
     """
-    inv_map = {v: k for k, v in DAYS_MAP.items()}
     start_idx = DAYS_MAP.get(start[:3])
     end_idx = DAYS_MAP.get(end[:3])
 
@@ -109,26 +121,72 @@ def expand_day_range(start, end):
         raise ValueError(f"Invalid day names in range: '{start}-{end}'")
 
     if start_idx <= end_idx:
-        days = [inv_map[i] for i in range(start_idx, end_idx + 1)]
+        days = DAY_NAMES[start_idx:end_idx + 1]
     else:
         # Wrap around the week
-        days = [inv_map[i] for i in range(start_idx, 7)] + [inv_map[i] for i in range(0, end_idx + 1)]
+        days = DAY_NAMES[start_idx:] + DAY_NAMES[:end_idx + 1]
     return days
 
+def normalize_hours_string(hours_str):
+    """
+    Collapses runs of whitespace so equivalent hours strings share a cache entry.
+    """
+    return " ".join(hours_str.split())
+
 def parse_hours(hours_str):
     """
     Parses a restaurant's operating hours string into a schedule dictionary.
+    The parse itself is cached; the returned dictionary is a fresh copy the caller may modify.
+    """
+    return {d: list(ranges) for d, ranges in parse_hours_cached(hours_str).items()}
+
+def parse_hours_cached(hours_str):
+    """
+    Parses an hours string into a read-only schedule mapping of day -> tuple of ranges.
+    Restaurants with the same normalized hours string share the same object.
+    """
+    return _parse_normalized_hours(normalize_hours_string(hours_str))[0]
+
+def parse_failures(hours_str):
+    """
+    Returns the reasons, one per rejected segment, the parser dropped parts of
+    an hours string for. Cached with the schedule, so this does not parse again.
+    """
+    return _parse_normalized_hours(normalize_hours_string(hours_str))[1]
+
+def record_parse_failures(failures):
+    """
+    Counts one row's rejected segments in the parse failure metric.
+    """
+    for reason in failures:
+        PARSE_FAILURES.labels(reason).inc()
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_normalized_hours(hours_str):
+    schedule, failures = _parse_hours_uncached(hours_str)
+    return MappingProxyType({d: tuple(ranges) for d, ranges in schedule.items()}), failures
+
+def clear_parse_cache():
+    """
+    Empties the parse_hours_cached memoization cache.
+    """
+    _parse_normalized_hours.cache_clear()
+
+def _parse_hours_uncached(hours_str):
+    """
+    Parses an hours string from scratch, bypassing the cache. Returns the
+    schedule and a tuple with the failure reason of every rejected segment.
     """
     segments = [seg.strip() for seg in hours_str.split('/') if seg.strip()]
-    schedule = {d: [] for d in DAYS_MAP.keys()}  # mon,tue,wed...
+    schedule = {d: [] for d in DAY_NAMES}  # mon,tue,wed...
+    failures = []
 
     for segment in segments:
         words = segment.split()
         time_index = None
 
         # Find where time starts
-        for i, part in enumerate(words):
-            p = part.lower()
+        for i, p in enumerate(segment.lower().split()):
             if "am" in p or "pm" in p:
                 # Check if the time includes the previous word
                 if i > 0 and (any(char.isdigit() for char in words[i-1]) or ':' in words[i-1]):
@@ -139,6 +197,7 @@ def parse_hours(hours_str):
 
         if time_index is None:
             logger.warning(f"No time found in segment: '{segment}'")
+            failures.append("no_time")
             continue
 
         days_part = " ".join(words[:time_index])
@@ -148,12 +207,14 @@ def parse_hours(hours_str):
             days_list = parse_days(days_part)
         except ValueError as ve:
             logger.error(f"Error parsing days in segment '{segment}': {ve}")
+            failures.append("invalid_days")
             continue
 
         try:
             start_str, end_str = [t.strip() for t in time_part.split('-')]
         except ValueError:
             logger.error(f"Invalid time range in segment: '{segment}'")
+            failures.append("invalid_time_range")
             continue
 
         try:
@@ -161,6 +222,7 @@ def parse_hours(hours_str):
             end_time = parse_time_string(end_str)
         except ValueError as ve:
             logger.error(f"Error parsing time in segment '{segment}': {ve}")
+            failures.append("invalid_time")
             continue
 
         # Check if end_time is actually on the next day (end_time < start_time)
@@ -176,10 +238,7 @@ def parse_hours(hours_str):
                 schedule[d].append((start_time, end_of_day))
 
                 # Now find the next day (wrap around if needed)
-                current_day_idx = DAYS_MAP[d]
-                next_day_idx = (current_day_idx + 1) % 7
-                inv_map = {v: k for k, v in DAYS_MAP.items()}
-                next_day = inv_map[next_day_idx]
+                next_day = DAY_NAMES[(DAYS_MAP[d] + 1) % 7]
 
                 # Interval from midnight to end_time for the next day
                 schedule[next_day].append((midnight, end_time))
@@ -188,7 +247,94 @@ def parse_hours(hours_str):
             for d in days_list:
                 schedule[d].append((start_time, end_time))
 
-    return schedule
+    return schedule, tuple(failures)
+
+def iter_restaurant_rows(db_path="app/restaurants.db", include_stored=False):
+    """
+    Yields (name, hours) rows from the SQLite database without fetching the whole table.
+    With include_stored, yields (name, hours, intervals, hours_hash, timezone) where
+    intervals is the precomputed blob written by csv_to_sqlite.py and hours_hash the
+    digest of the hours it was computed from; columns missing from older databases
+    come back as None.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        if include_stored:
+            cursor = conn.execute(f"SELECT {_stored_columns(conn)} FROM restaurants")
+        else:
+            cursor = conn.execute("SELECT name, hours FROM restaurants")
+        for row in cursor:
+            yield row
+    finally:
+        conn.close()
+
+def _stored_columns(conn):
+    """
+    The select list for (name, hours, intervals, hours_hash, timezone) rows,
+    with NULL for columns older databases lack.
+    """
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(restaurants)")}
+    return ", ".join(c if c in columns else "NULL" for c in ("name", "hours", "intervals", "hours_hash", "timezone"))
+
+def _change_bounds(conn):
+    """
+    Returns (log id, oldest kept, newest) for the change log, or None when the
+    database has none. The log id is the random token csv_to_sqlite.py stores
+    when it creates the log, None for databases created before it existed.
+    An empty log reports oldest = newest + 1.
+    """
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'restaurant_changes'").fetchone() is None:
+        return None
+    log_id = None
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'restaurant_changes_id'").fetchone() is not None:
+        row = conn.execute("SELECT id FROM restaurant_changes_id").fetchone()
+        log_id = row[0] if row is not None else None
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'restaurant_changes'").fetchone()
+    newest = row[0] if row is not None else 0
+    oldest = conn.execute("SELECT MIN(seq) FROM restaurant_changes").fetchone()[0]
+    return log_id, (oldest if oldest is not None else newest + 1), newest
+
+def latest_change(db_path="app/restaurants.db"):
+    """
+    Returns the change log position (log id, sequence number of the newest
+    entry, 0 for an empty log), or None when the database has no change log.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        bounds = _change_bounds(conn)
+        return (bounds[0], bounds[2]) if bounds is not None else None
+    finally:
+        conn.close()
+
+def read_changes(db_path, since):
+    """
+    Reads the restaurants changed after the change log position `since`, a
+    (log id, sequence number) pair from latest_change or an earlier call.
+    Returns (newest, rows, deleted): the position of the newest entry read,
+    the current (name, hours, intervals, hours_hash, timezone) rows of changed
+    restaurants and the names of deleted ones. Returns None when the log cannot
+    say what changed, because the database has none, it was pruned past
+    `since`, or it is another database's log; the caller then has to read every row.
+    """
+    log_id, seq = since
+    conn = sqlite3.connect(db_path)
+    try:
+        # One read transaction, so the rows match the log entries read
+        conn.execute("BEGIN")
+        bounds = _change_bounds(conn)
+        if bounds is None or bounds[0] != log_id or not bounds[1] - 1 <= seq <= bounds[2]:
+            return None
+        changed = {row[0] for row in conn.execute(
+            "SELECT DISTINCT name FROM restaurant_changes WHERE seq > ?", (seq,)
+        )}
+        rows = conn.execute(
+            f"SELECT {_stored_columns(conn)} FROM restaurants WHERE name IN "
+            "(SELECT name FROM restaurant_changes WHERE seq > ?) ORDER BY id",
+            (seq,),
+        ).fetchall()
+        return (log_id, bounds[2]), rows, changed.difference(row[0] for row in rows)
+    finally:
+        conn.close()
 
 def load_data(db_path="app/restaurants.db"):
     """
@@ -196,22 +342,12 @@ def load_data(db_path="app/restaurants.db"):
     """
     restaurants = {}
     try:
-        # Connect to SQLite database
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-
-        # Fetch all restaurant data
-        cursor.execute("SELECT name, hours FROM restaurants")
-        rows = cursor.fetchall()
-
-        for name, hours_str in rows:
+        for name, hours_str in iter_restaurant_rows(db_path):
             try:
                 schedule = parse_hours(hours_str)
                 restaurants[name] = schedule
             except ValueError as ve:
                 logger.error(f"Error parsing hours for restaurant '{name}': {ve}")
-
-        conn.close()
     except sqlite3.Error as e:
         logger.error(f"Error loading data from SQLite: {e}")
     return restaurants
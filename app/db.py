@@ -0,0 +1,150 @@
+import queue
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+
+import anyio
+from anyio import to_thread
+from anyio.lowlevel import RunVar
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POOL_SIZE = 4
+
+# Statements compiled and kept per connection by the sqlite3 module
+STATEMENT_CACHE_SIZE = 256
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only SQLite connections for use from async handlers.
+
+    Queries run on worker threads, with at most `size` in flight, so handlers
+    never block the event loop and never queue behind a single connection.
+    Connections are opened with check_same_thread=False because a request may
+    be served by a different worker thread on every call.
+    """
+
+    def __init__(self, db_path, size=DEFAULT_POOL_SIZE):
+        self.db_path = db_path
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        # One limiter per event loop, since anyio limiters are bound to the loop that made them
+        self._limiter = RunVar(f"sqlite_pool_limiter_{id(self)}", default=None)
+        self._closed = False
+
+    def _connect(self):
+        uri = Path(self.db_path).resolve().as_uri() + "?mode=ro"
+        conn = sqlite3.connect(
+            uri, uri=True, check_same_thread=False, cached_statements=STATEMENT_CACHE_SIZE
+        )
+        conn.execute("PRAGMA query_only=ON")
+        journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+        if journal_mode != "wal":
+            # Readers only wait on writers outside WAL mode; csv_to_sqlite.py enables it
+            logger.info(f"SQLite database '{self.db_path}' is in {journal_mode} mode, not WAL")
+        return conn
+
+    def acquire(self, timeout=None):
+        """
+        Takes an idle connection, opening a new one while the pool is below its size.
+        """
+        if self._closed:
+            raise sqlite3.ProgrammingError("Connection pool is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._created -= 1
+                    raise
+        return self._idle.get(timeout=timeout)
+
+    def release(self, conn):
+        """
+        Returns a connection to the pool.
+        """
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """
+        Context manager lending a pooled connection to the calling thread.
+        """
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def execute(self, sql, params=()):
+        """
+        Runs a query synchronously and returns all rows.
+        """
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def _get_limiter(self):
+        limiter = self._limiter.get()
+        if limiter is None:
+            limiter = anyio.CapacityLimiter(self.size)
+            self._limiter.set(limiter)
+        return limiter
+
+    async def fetch_all(self, sql, params=()):
+        """
+        Runs a query on a worker thread and returns all rows.
+        """
+        return await to_thread.run_sync(self.execute, sql, params, limiter=self._get_limiter())
+
+    async def fetch_one(self, sql, params=()):
+        """
+        Runs a query on a worker thread and returns the first row, or None.
+        """
+        def run():
+            with self.connection() as conn:
+                return conn.execute(sql, params).fetchone()
+
+        return await to_thread.run_sync(run, limiter=self._get_limiter())
+
+    async def iter_rows(self, sql, params=(), batch_size=500):
+        """
+        Async generator streaming rows in batches of `batch_size` instead of
+        materializing the whole result. Holds one connection until exhausted or closed.
+        """
+        conn = await to_thread.run_sync(self.acquire, limiter=self._get_limiter())
+        try:
+            # The connection is already ours, so these calls must not wait for a pool
+            # slot; otherwise queued acquirers could starve the holder and deadlock.
+            cursor = await to_thread.run_sync(conn.execute, sql, params)
+            while True:
+                rows = await to_thread.run_sync(cursor.fetchmany, batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """
+        Closes every idle connection; connections still lent out close on release.
+        """
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
@@ -0,0 +1,146 @@
+"""
+Catalog generations shared between a parent process and its workers.
+
+The parent loads the catalog once and writes it as a snapshot per generation
+(catalog-00000001.snapshot, ...), then atomically replaces the CURRENT pointer
+file to publish it. Workers memory-map the generation CURRENT names, so every
+worker reads the same page-cache copy instead of holding its own, and swap to
+a newer generation when the pointer changes. A generation's number is its
+catalog version, so caches and pagination cursors agree across workers.
+"""
+import json
+import os
+import threading
+import time
+import logging
+
+from app.catalog import Catalog, CatalogStore, record_catalog_metrics
+from app.poller import Poller
+from app.snapshot import database_signature, load_snapshot, write_snapshot
+
+logger = logging.getLogger(__name__)
+
+POINTER_NAME = "CURRENT"
+
+# Generations kept on disk; older files are unlinked, which is safe on POSIX
+# even while a slow worker still has them mapped
+KEEP_GENERATIONS = 3
+
+
+def generation_path(directory, generation):
+    return os.path.join(directory, f"catalog-{generation:08d}.snapshot")
+
+
+def read_pointer(directory):
+    """
+    Returns the generation number CURRENT points at, or None if nothing is published.
+    """
+    try:
+        with open(os.path.join(directory, POINTER_NAME), "r", encoding="utf-8") as f:
+            return int(json.load(f)["generation"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def publish_generation(catalog, directory, generation, source=None):
+    """
+    Writes `catalog` as generation `generation` and points CURRENT at it.
+    """
+    os.makedirs(directory, exist_ok=True)
+    write_snapshot(catalog, generation_path(directory, generation), source)
+
+    pointer = os.path.join(directory, POINTER_NAME)
+    with open(pointer + ".tmp", "w", encoding="utf-8") as f:
+        json.dump({"generation": generation, "restaurants": len(catalog)}, f)
+    os.replace(pointer + ".tmp", pointer)
+
+    for old in range(generation - KEEP_GENERATIONS, 0, -1):
+        path = generation_path(directory, old)
+        if not os.path.exists(path):
+            break
+        os.remove(path)
+    logger.info(f"Published catalog generation {generation}: {len(catalog)} restaurants")
+
+
+class GenerationPublisher:
+    """
+    Parent side: keeps a CatalogStore over the database and publishes a new
+    generation whenever a reload produces a new catalog.
+    """
+
+    def __init__(self, db_path, directory, snapshot_loader=None):
+        self.directory = directory
+        self.store = CatalogStore(db_path, snapshot_loader=snapshot_loader)
+        # Continue numbering across restarts so workers never see a version go backwards
+        self.generation = read_pointer(directory) or 0
+        self._poller = Poller(self.reload, "catalog-publisher")
+        self.publish()
+
+    def publish(self):
+        self.generation += 1
+        publish_generation(
+            self.store.current, self.directory, self.generation, database_signature(self.store.db_path)
+        )
+
+    def reload(self):
+        """
+        Reloads the database and publishes a generation if it changed. Returns True if one was published.
+        """
+        if not self.store.reload():
+            return False
+        self.publish()
+        return True
+
+    def start_polling(self, interval):
+        """
+        Publishes database changes, checked every `interval` seconds.
+        """
+        self._poller.start(interval)
+
+    def stop_polling(self):
+        self._poller.stop()
+
+
+class GenerationStore:
+    """
+    Worker side: a drop-in for CatalogStore that follows the published
+    generation instead of reading the database. `current` always holds a
+    whole catalog; a new generation is mapped first and then swapped in.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._poller = Poller(self.reload, "catalog-generation")
+        self.generation = None
+        self.current = Catalog({}, {})
+        if not self.reload():
+            logger.error(f"No catalog generation published in '{directory}'")
+
+    def reload(self, force=False):
+        """
+        Maps the generation CURRENT points at if it is new. Returns True when it was swapped in.
+        """
+        with self._lock:
+            generation = read_pointer(self.directory)
+            if generation is None or (generation == self.generation and not force):
+                return False
+            start = time.perf_counter()
+            catalog = load_snapshot(generation_path(self.directory, generation), version=generation)
+            if catalog is None:
+                logger.error(f"Catalog generation {generation} in '{self.directory}' is unreadable")
+                return False
+            self.generation = generation
+            self.current = catalog
+            record_catalog_metrics(catalog, "generation", time.perf_counter() - start)
+        logger.info(f"Switched to catalog generation {generation}: {len(catalog)} restaurants")
+        return True
+
+    def start_polling(self, interval):
+        """
+        Follows new generations, checked every `interval` seconds.
+        """
+        self._poller.start(interval)
+
+    def stop_polling(self):
+        self._poller.stop()
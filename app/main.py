@@ -1,12 +1,81 @@
 # main.py
 
-from fastapi import FastAPI, HTTPException
+import os
+import sqlite3
+from contextlib import asynccontextmanager
+from functools import partial
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from datetime import datetime
-from app.data_handler import load_data
+from typing import Literal
+from pydantic import BaseModel
+from app.catalog import CatalogStore, DEFAULT_DB_PATH
+from app.db import ConnectionPool, DEFAULT_POOL_SIZE
+from app.generations import GenerationStore
+from app.snapshot import DEFAULT_SNAPSHOT_PATH, load_snapshot
+from app.schedule_index import query_point
+from app.pagination import MAX_PAGE_SIZE, iter_ndjson, paginate
+from app.occupancy import bucket_label, parse_resolution
+from app.search import MAX_SEARCH_RESULTS, build_match_query, search
+from app.response_cache import CachedResponse, ResponseCache, etag_matches, render_open_ids
+from app.timezones import from_local, minutes_between, to_local
+from app.metrics import CONTENT_TYPE, REGISTRY, STAGE_SECONDS, MetricsMiddleware, SharedMetrics
+from app.profiler import DEFAULT_INTERVAL, ProfilerMiddleware, SamplingProfiler
+from app.transitions import minutes_later
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 
-app = FastAPI()
+# Prebuilt catalog snapshot mapped at startup; falls back to SQLite when missing or stale
+SNAPSHOT_PATH = os.environ.get("OPEN_BITES_SNAPSHOT", DEFAULT_SNAPSHOT_PATH)
+
+DB_PATH = os.environ.get("OPEN_BITES_DB", DEFAULT_DB_PATH)
+
+# Set by app.serve: workers follow the catalog generations its parent process publishes there
+GENERATIONS_DIR = os.environ.get("OPEN_BITES_GENERATIONS_DIR")
+
+if GENERATIONS_DIR:
+    catalog_store = GenerationStore(GENERATIONS_DIR)
+    # Workers each keep their own metrics; every scrape merges all of them
+    shared_metrics = SharedMetrics(os.path.join(GENERATIONS_DIR, "metrics"))
+else:
+    catalog_store = CatalogStore(DB_PATH, snapshot_loader=partial(load_snapshot, SNAPSHOT_PATH))
+    shared_metrics = None
+
+# Read-only connections for endpoints that query SQLite directly
+db_pool = ConnectionPool(DB_PATH, int(os.environ.get("OPEN_BITES_DB_POOL_SIZE", DEFAULT_POOL_SIZE)))
+
+# Seconds between checks for database changes; 0 disables hot reload
+RELOAD_INTERVAL = float(os.environ.get("OPEN_BITES_RELOAD_INTERVAL", "0"))
+
+# Seconds between worker checks for a newly published generation
+GENERATION_POLL_INTERVAL = 1.0
+
+# How long browsers and CDNs may reuse an /open_restaurants/ response
+CACHE_MAX_AGE = int(os.environ.get("OPEN_BITES_CACHE_MAX_AGE", "60"))
+
+response_cache = ResponseCache()
+
+# Exposes the /debug/profiler endpoints; sampling itself is started and stopped at runtime
+PROFILER_ENABLED = os.environ.get("OPEN_BITES_PROFILER", "").lower() in ("1", "true", "yes")
+
+profiler = SamplingProfiler()
+
+@asynccontextmanager
+async def lifespan(app):
+    if GENERATIONS_DIR:
+        catalog_store.start_polling(GENERATION_POLL_INTERVAL)
+        shared_metrics.start()
+    elif RELOAD_INTERVAL > 0:
+        catalog_store.start_polling(RELOAD_INTERVAL)
+    yield
+    profiler.stop()
+    catalog_store.stop_polling()
+    if shared_metrics is not None:
+        shared_metrics.stop()
+    db_pool.close()
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,15 +84,31 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(ProfilerMiddleware, profiler=profiler)
+app.add_middleware(MetricsMiddleware)
+
+# A full week at one-minute resolution
+MAX_BATCH_SIZE = 10080
 
-restaurants_data = load_data()
+class BatchQuery(BaseModel):
+    datetimes: list[str]
+    counts_only: bool = False
 
 @app.get("/open_restaurants/")
-def get_open_restaurants(datetime_str: str):
+def get_open_restaurants(
+    datetime_str: str,
+    request: Request,
+    limit: int | None = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    response_format: Literal["json", "ndjson"] = Query("json", alias="format"),
+):
     """
     Endpoint to get a list of open restaurants at a given datetime.
     Expects datetime_str in ISO 8601 format, e.g., "2024-12-13T13:30:00"
+    With `limit`, returns one page plus a "next_cursor" to pass back as `cursor`.
+    format=ndjson streams one {"name": ...} object per line instead.
     """
+    stages = STAGE_SECONDS.stages("/open_restaurants/")
     # Parse the input datetime_str into a datetime object
     try:
         query_dt = datetime.fromisoformat(datetime_str)
@@ -32,31 +117,303 @@ def get_open_restaurants(datetime_str: str):
             status_code=400,
             detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
         )
+    stages.mark("parse_datetime")
+
+    catalog = catalog_store.current
+    zones = catalog.zone_groups
+    if query_dt.tzinfo is not None and zones.zoned:
+        # An instant lands on a different local minute per zone, so it is not cacheable by minute
+        cached = None
+        ids = np.asarray(zones.open_ids(query_dt), dtype=np.int32)
+    else:
+        # Identical minute-of-week slots share one pre-serialized response
+        cached = response_cache.get(catalog, query_point(query_dt))
+        ids = cached.ids
+
+    paginated = limit is not None or cursor is not None
+    next_cursor = None
+    if paginated:
+        try:
+            ids, next_cursor = paginate(ids, catalog.version, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    stages.mark("lookup")
+
+    if response_format == "ndjson":
+        headers = {"X-Next-Cursor": next_cursor} if next_cursor else None
+
+        def stream():
+            # The body is written after the handler returns, so time it as its own stage
+            yield from iter_ndjson(catalog.encoded_names, ids)
+            stages.mark("stream")
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson", headers=headers)
+
+    if paginated or cached is None:
+        cached = CachedResponse(render_open_ids(catalog.encoded_names, ids, next_cursor, paginated))
+    stages.mark("serialize")
+    headers = {"ETag": cached.etag, "Cache-Control": f"public, max-age={CACHE_MAX_AGE}"}
+    if etag_matches(request.headers.get("if-none-match"), cached.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=cached.body, media_type="application/json", headers=headers)
+
+@app.get("/open_restaurants/range")
+def get_open_restaurants_range(start: str, end: str, mode: Literal["all", "any"] = "all"):
+    """
+    Endpoint to get restaurants open for an entire window (mode=all) or at any
+    point in it (mode=any). Expects start and end in ISO 8601 format; the window
+    may cross midnight or span several days.
+    """
+    try:
+        start_dt = datetime.fromisoformat(start)
+        end_dt = datetime.fromisoformat(end)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
+        )
 
-    # Determine which day of week this corresponds to
-    day_of_week = query_dt.weekday()  # Monday=0, Sunday=6
-    inv_map = {0: "mon", 1: "tue", 2: "wed", 3: "thu", 4: "fri", 5: "sat", 6: "sun"}
-    query_day = inv_map[day_of_week]
-    query_time = query_dt.time()
-
-    open_restaurants = []
-    for r_name, schedule in restaurants_data.items():
-        if query_day in schedule:
-            time_ranges = schedule[query_day]
-            for (start, end) in time_ranges:
-                if start <= end:
-                    if start <= query_time <= end:
-                        open_restaurants.append(r_name)
-                        break  # No need to check further ranges for this restaurant
-                else:
-                    # Overnight hours (e.g., 10 pm - 1 am)
-                    if query_time >= start or query_time <= end:
-                        open_restaurants.append(r_name)
-                        break  # No need to check further ranges for this restaurant
+    catalog = catalog_store.current
+    zones = catalog.zone_groups
+    try:
+        if zones.zoned and (start_dt.tzinfo is not None or end_dt.tzinfo is not None):
+            names = catalog.ranges.names
+            open_restaurants = [names[i] for i in zones.range_ids(start_dt, end_dt, mode)]
+        else:
+            open_restaurants = catalog.ranges.open_between(start_dt, end_dt, mode)
+    except (ValueError, TypeError):
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid window. The end must not be before the start, and both must use the same timezone style."
+        )
 
     if not open_restaurants:
         return {"message": "No restaurants are open at that time. Please try again."}
     return {"open_restaurants": open_restaurants}
 
+@app.get("/open_restaurants/closing_soon")
+def get_closing_soon(datetime_str: str, within: int = Query(30, ge=0, le=10080)):
+    """
+    Endpoint to get restaurants open at datetime_str that close within `within` minutes, soonest first.
+    """
+    try:
+        query_dt = datetime.fromisoformat(datetime_str)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
+        )
+
+    catalog = catalog_store.current
+    names = catalog.index.names
+    zones = catalog.zone_groups
+    if query_dt.tzinfo is not None and zones.zoned:
+        # closes_at is reported in each restaurant's own zone, minutes in real time
+        closing = zones.closing_within(query_dt, within)
+    else:
+        closing = [
+            (restaurant_id, minutes, minutes_later(query_dt, minutes))
+            for restaurant_id, minutes in catalog.transitions.closing_within(query_point(query_dt), within)
+        ]
+    return {"closing_soon": [
+        {
+            "name": names[restaurant_id],
+            "closes_at": closes_at.isoformat(),
+            "minutes_until_close": minutes,
+        }
+        for restaurant_id, minutes, closes_at in closing
+    ]}
+
+@app.post("/open_restaurants/batch")
+def get_open_restaurants_batch(query: BatchQuery):
+    """
+    Endpoint to evaluate many datetimes in a single vectorized pass.
+    Expects a JSON body like {"datetimes": ["2024-12-13T13:30:00", ...], "counts_only": false}
+    """
+    if len(query.datetimes) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many datetimes. A batch may contain at most {MAX_BATCH_SIZE}."
+        )
+
+    stages = STAGE_SECONDS.stages("/open_restaurants/batch")
+    try:
+        query_dts = [datetime.fromisoformat(dt) for dt in query.datetimes]
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
+        )
+    stages.mark("parse_datetime")
+
+    catalog = catalog_store.current
+    batch = catalog.batch
+    if catalog.zone_groups.zoned and any(dt.tzinfo is not None for dt in query_dts):
+        batch = catalog.zone_groups
+    if query.counts_only:
+        counts = batch.open_counts(query_dts)
+        stages.mark("lookup")
+        return {"results": [
+            {"datetime": dt, "open_count": int(count)}
+            for dt, count in zip(query.datetimes, counts)
+        ]}
+
+    names = batch.open_names(query_dts)
+    stages.mark("lookup")
+    return {"results": [
+        {"datetime": dt, "open_restaurants": open_restaurants}
+        for dt, open_restaurants in zip(query.datetimes, names)
+    ]}
+
+@app.get("/restaurants/{name}")
+async def get_restaurant(name: str):
+    """
+    Endpoint to get a single restaurant's stored hours, read through the connection pool.
+    """
+    row = await db_pool.fetch_one("SELECT name, hours FROM restaurants WHERE name = ?", (name,))
+    if row is None:
+        raise HTTPException(status_code=404, detail=f"Restaurant '{name}' not found")
+    return {"name": row[0], "hours": row[1]}
+
+@app.get("/search")
+async def search_restaurants(
+    q: str,
+    open_at: str | None = None,
+    limit: int = Query(50, ge=1, le=MAX_SEARCH_RESULTS),
+):
+    """
+    Endpoint to search restaurant names, cuisines and tags, best matches first.
+    With open_at (ISO 8601), only restaurants open at that time are returned.
+    """
+    query_dt = None
+    if open_at is not None:
+        try:
+            query_dt = datetime.fromisoformat(open_at)
+        except ValueError:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
+            )
+    try:
+        match = build_match_query(q)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    catalog = catalog_store.current
+    open_ids = None
+    if query_dt is not None:
+        zones = catalog.zone_groups
+        if query_dt.tzinfo is not None and zones.zoned:
+            open_ids = np.asarray(zones.open_ids(query_dt), dtype=np.int32)
+        else:
+            open_ids = response_cache.get(catalog, query_point(query_dt)).ids
+
+    try:
+        rows = await search(db_pool, catalog, match, limit, open_ids)
+    except sqlite3.OperationalError:
+        # Databases imported before the index existed have no restaurants_fts table
+        raise HTTPException(
+            status_code=503,
+            detail="The search index is unavailable. Re-run csv_to_sqlite.py to build it."
+        )
+    return {"results": [{"name": name, "cuisine": cuisine, "tags": tags} for name, cuisine, tags in rows]}
+
+@app.get("/restaurants/{name}/next_change")
+def get_next_change(name: str, datetime_str: str):
+    """
+    Endpoint to get whether a restaurant is open at datetime_str and when that
+    next changes: "closes_at" while open, "opens_at" while closed.
+    """
+    try:
+        query_dt = datetime.fromisoformat(datetime_str)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="Invalid datetime format. Please use ISO 8601 (e.g. 2024-12-13T13:30:00)"
+        )
+
+    catalog = catalog_store.current
+    restaurant_id = catalog.ids.get(name)
+    if restaurant_id is None:
+        raise HTTPException(status_code=404, detail=f"Restaurant '{name}' not found")
+
+    # Hours are the restaurant's local wall-clock time; aware queries are converted into its zone
+    zone = catalog.zone_groups.zone_for(restaurant_id)
+    local_dt = to_local(query_dt, zone)
+    is_open, minutes = catalog.transitions.next_change(restaurant_id, query_point(local_dt))
+    change_at = None
+    if minutes is not None:
+        # Wall-clock minutes become real ones once the local change time is resolved in its zone
+        change_dt = from_local(minutes_later(local_dt, minutes), zone, query_dt)
+        minutes = minutes_between(query_dt, change_dt)
+        change_at = change_dt.isoformat()
+    return {
+        "name": name,
+        "open": is_open,
+        "closes_at": change_at if is_open else None,
+        "opens_at": None if is_open else change_at,
+        "minutes_until_change": minutes,
+    }
+
+@app.get("/stats/open_counts")
+def get_open_counts(resolution: str = "1h"):
+    """
+    Endpoint to get how many restaurants are open across the week, in buckets
+    of `resolution` (e.g. 1m, 15m, 1h). Each bucket reports the fewest, most
+    and mean number of restaurants open in its minutes, in local wall-clock time.
+    """
+    try:
+        minutes = parse_resolution(resolution)
+        starts, mins, maxes, means = catalog_store.current.occupancy.buckets(minutes)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    buckets = []
+    for start, low, high, mean in zip(starts.tolist(), mins.tolist(), maxes.tolist(), means.tolist()):
+        day, time = bucket_label(start)
+        buckets.append({"day": day, "time": time, "open_min": low, "open_max": high, "open_mean": round(mean, 2)})
+    return {"resolution_minutes": minutes, "buckets": buckets}
+
+@app.get("/metrics")
+def get_metrics():
+    """
+    Endpoint exposing request, stage and catalog metrics in the Prometheus text format.
+    Under app.serve every worker's metrics are included, labelled by worker.
+    """
+    content = shared_metrics.render() if shared_metrics is not None else REGISTRY.render()
+    return Response(content=content, media_type=CONTENT_TYPE)
+
+def require_profiler():
+    if not PROFILER_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+
+@app.post("/debug/profiler/start")
+def start_profiler(interval_ms: float = Query(DEFAULT_INTERVAL * 1000, gt=0, le=1000), reset: bool = True):
+    """
+    Starts the sampling profiler. Only available when OPEN_BITES_PROFILER is set.
+    """
+    require_profiler()
+    if reset:
+        profiler.reset()
+    profiler.start(interval_ms / 1000)
+    return {"running": True, "interval_ms": profiler.interval * 1000}
+
+@app.post("/debug/profiler/stop")
+def stop_profiler():
+    """
+    Stops the sampling profiler, keeping what it collected.
+    """
+    require_profiler()
+    profiler.stop()
+    return {"running": False, "samples": profiler.samples}
+
+@app.get("/debug/profiler")
+def get_profile():
+    """
+    Endpoint returning collected stacks in folded format, for flamegraph.pl or speedscope.
+    """
+    require_profiler()
+    return Response(content=profiler.folded(), media_type="text/plain; charset=utf-8")
+
 # Serve frontend static files
 app.mount("/", StaticFiles(directory="frontend", html=True), name="static")
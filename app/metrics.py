@@ -0,0 +1,392 @@
+import bisect
+import json
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+
+from app.poller import Poller
+
+logger = logging.getLogger(__name__)
+
+# Default histogram buckets in seconds, from 50 microseconds to 10 seconds
+DEFAULT_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+    0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric(ABC):
+    """
+    A named metric with a fixed set of label names, one child per label values.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+        (REGISTRY if registry is None else registry).register(self)
+
+    def labels(self, *values):
+        """
+        Returns the child for one combination of label values, creating it on first use.
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    @abstractmethod
+    def _new_child(self):
+        """
+        Returns the value holder for one combination of label values.
+        """
+
+    def _unlabelled(self):
+        return self._children[()]
+
+    @abstractmethod
+    def samples(self):
+        """
+        Yields (suffix, label_values, extra_label, value) for the text format.
+        """
+
+    def render(self, sources=None):
+        """
+        Returns the metric in the text format. `sources` is a list of
+        (label, samples) pairs from several processes, each sample list
+        rendered with the preformatted `label` added; None renders this process.
+        """
+        if sources is None:
+            sources = [("", self.samples())]
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for label, samples in sources:
+            for suffix, values, extra, value in samples:
+                extra = ",".join(pair for pair in (label, extra) if pair)
+                lines.append(
+                    f"{self.name}{suffix}{_format_labels(self.labelnames, values, extra)} {_format_value(value)}"
+                )
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value", "_lock")
+
+    def __init__(self):
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+
+class Counter(_Metric):
+    """
+    A monotonically increasing count, e.g. parse failures.
+    """
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self._unlabelled().inc(amount)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+
+class Gauge(_Metric):
+    """
+    A value that can go up and down, e.g. catalog size.
+    """
+    kind = "gauge"
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value):
+        self._unlabelled().set(value)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            yield "", values, "", child.value
+
+
+class _HistogramChild:
+    __slots__ = ("buckets", "counts", "sum", "_lock")
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+
+
+class Histogram(_Metric):
+    """
+    Observations counted into cumulative buckets, e.g. request latency in seconds.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=None):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self._unlabelled().observe(value)
+
+    def stages(self, *values):
+        """
+        Returns a StageTimer observing into this histogram, with `values` as the
+        leading labels and the stage name as the last one.
+        """
+        return StageTimer(self, values)
+
+    def samples(self):
+        for values, child in list(self._children.items()):
+            with child._lock:
+                counts, total = list(child.counts), child.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                yield "_bucket", values, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", values, "", total
+            yield "_count", values, "", cumulative
+
+
+class StageTimer:
+    """
+    Times consecutive stages of one request: each mark(stage) observes the time
+    since the previous mark, or since the timer was created.
+    """
+    __slots__ = ("histogram", "values", "last")
+
+    def __init__(self, histogram, values):
+        self.histogram = histogram
+        self.values = values
+        self.last = time.perf_counter()
+
+    def mark(self, stage):
+        now = time.perf_counter()
+        self.histogram.labels(*self.values, stage).observe(now - self.last)
+        self.last = now
+
+
+class Registry:
+    """
+    The metrics exposed by /metrics, in registration order.
+    """
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+
+    def collect(self):
+        """
+        Returns every metric's samples as JSON-serializable lists, keyed by metric name.
+        """
+        return {metric.name: [list(sample) for sample in metric.samples()] for metric in self._metrics}
+
+    def render(self, collected=None):
+        """
+        Returns every metric in the Prometheus text exposition format. With
+        `collected`, a {worker: collect() output} mapping from several
+        processes, each process's samples carry a worker label instead.
+        """
+        if collected is None:
+            return "\n".join(metric.render() for metric in self._metrics) + "\n"
+        return "\n".join(
+            metric.render([
+                (f'worker="{_escape(worker)}"', samples.get(metric.name, []))
+                for worker, samples in sorted(collected.items())
+            ])
+            for metric in self._metrics
+        ) + "\n"
+
+
+class SharedMetrics:
+    """
+    Metrics of every worker process serving one port. Each worker keeps its own
+    registry and writes its samples to `directory` every `interval` seconds and
+    before answering a scrape; any worker renders all of them with a worker
+    label, so each scrape sees every worker, whichever one accepted it. Files
+    not rewritten for STALE_INTERVALS intervals belong to exited workers and
+    are skipped.
+    """
+
+    STALE_INTERVALS = 10
+
+    def __init__(self, directory, interval=1.0, registry=None):
+        self.directory = directory
+        self.interval = interval
+        self.registry = REGISTRY if registry is None else registry
+        self.worker = str(os.getpid())
+        self.path = os.path.join(directory, f"worker-{self.worker}.json")
+        self._poller = Poller(self.write, "metrics-writer")
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self):
+        with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self.registry.collect(), f)
+        os.replace(self.path + ".tmp", self.path)
+
+    def render(self):
+        """
+        Returns the metrics of every live worker in the text format.
+        """
+        self.write()
+        collected = {}
+        oldest = time.time() - self.STALE_INTERVALS * self.interval
+        for entry in os.listdir(self.directory):
+            if not (entry.startswith("worker-") and entry.endswith(".json")):
+                continue
+            path = os.path.join(self.directory, entry)
+            try:
+                if os.stat(path).st_mtime < oldest:
+                    continue
+                with open(path, "r", encoding="utf-8") as f:
+                    collected[entry[len("worker-"):-len(".json")]] = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable worker metrics '{path}': {e}")
+        return self.registry.render(collected)
+
+    def start(self):
+        self._poller.start(self.interval)
+
+    def stop(self):
+        """
+        Stops writing and removes this worker's file.
+        """
+        self._poller.stop()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+
+REGISTRY = Registry()
+
+REQUEST_SECONDS = Histogram(
+    "open_bites_request_duration_seconds",
+    "Time from receiving a request to sending the last byte of its response.",
+    ("method", "route", "status"),
+)
+
+STAGE_SECONDS = Histogram(
+    "open_bites_stage_duration_seconds",
+    "Time spent in each stage of a request handler.",
+    ("route", "stage"),
+)
+
+PARSE_FAILURES = Counter(
+    "open_bites_hours_parse_failures_total",
+    "Hours segments rejected by the parser, by reason, counted for every restaurant row parsed at load or import.",
+    ("reason",),
+)
+
+CATALOG_LOAD_SECONDS = Histogram(
+    "open_bites_catalog_load_duration_seconds",
+    "Time to load and index the restaurant catalog, by source.",
+    ("source",),
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+
+CATALOG_RESTAURANTS = Gauge(
+    "open_bites_catalog_restaurants", "Restaurants in the current catalog."
+)
+
+CATALOG_INTERVALS = Gauge(
+    "open_bites_catalog_intervals", "Weekly open intervals indexed in the current catalog."
+)
+
+CATALOG_WITHOUT_HOURS = Gauge(
+    "open_bites_catalog_restaurants_without_hours",
+    "Restaurants in the current catalog whose hours produced no open intervals.",
+)
+
+CATALOG_VERSION = Gauge(
+    "open_bites_catalog_version", "Version of the current catalog; increases on every reload."
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording REQUEST_SECONDS per method, route template and status.
+    Routes are labelled by their path template (/restaurants/{name}), never the
+    raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or "other"
+            REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
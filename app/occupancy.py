@@ -0,0 +1,122 @@
+import numpy as np
+
+from app.data_handler import DAY_NAMES
+from app.schedule_index import MINUTES_PER_DAY, MINUTES_PER_WEEK
+
+
+def _difference_array(schedules, restaurant_ids=None):
+    """
+    Returns an int64 difference array of length MINUTES_PER_WEEK + 1 whose
+    prefix sum is the number of restaurants (all, or `restaurant_ids`) open in
+    each minute of the week.
+
+    Work is per distinct interval run rather than per restaurant: restaurants
+    sharing pool entries are counted once with a weight. Overlapping intervals
+    of one restaurant are clipped against the running end of its earlier ones,
+    so a restaurant adds at most 1 to any minute.
+    """
+    first = np.asarray(schedules.first, dtype=np.int64)
+    counts = np.asarray(schedules.counts, dtype=np.int64)
+    if restaurant_ids is not None:
+        first = first[restaurant_ids]
+        counts = counts[restaurant_ids]
+    diff = np.zeros(MINUTES_PER_WEEK + 1, dtype=np.int64)
+    if not len(first):
+        return diff
+
+    # Restaurants with the same (first, count) own the same intervals
+    runs, weights = np.unique(first * 65536 + counts, return_counts=True)
+    run_first, run_counts = runs // 65536, runs % 65536
+    total = int(run_counts.sum())
+    if not total:
+        return diff
+    groups = np.repeat(np.arange(len(runs)), run_counts)
+    pool = np.repeat(run_first - (np.cumsum(run_counts) - run_counts), run_counts) + np.arange(total)
+    starts = np.asarray(schedules.starts, dtype=np.int64)[pool]
+    ends = np.asarray(schedules.ends, dtype=np.int64)[pool]
+
+    order = np.lexsort((starts, groups))
+    groups, starts, ends = groups[order], starts[order], ends[order]
+    # Latest end among each run's earlier intervals; the group offset keeps runs apart
+    reach = np.maximum.accumulate(groups * MINUTES_PER_WEEK + ends) - groups * MINUTES_PER_WEEK
+    covered = np.empty(total, dtype=np.int64)
+    covered[0] = -1
+    covered[1:] = reach[:-1]
+    covered[np.flatnonzero(np.diff(groups)) + 1] = -1
+    clipped = np.maximum(starts, covered + 1)
+    keep = clipped <= ends
+
+    run_weights = weights[groups[keep]]
+    diff += np.bincount(clipped[keep], weights=run_weights, minlength=MINUTES_PER_WEEK + 1).astype(np.int64)
+    diff -= np.bincount(ends[keep] + 1, weights=run_weights, minlength=MINUTES_PER_WEEK + 1).astype(np.int64)
+    return diff
+
+
+class WeeklyOccupancy:
+    """
+    Number of restaurants open in every minute of the week, in each
+    restaurant's local wall-clock time, kept as a difference array and its
+    prefix sum. Building it costs O(intervals + 10,080); a reload that changes
+    a few restaurants is applied as a delta in O(their intervals + 10,080).
+    """
+
+    def __init__(self, diff):
+        self.diff = diff
+        self.counts = np.cumsum(diff[:MINUTES_PER_WEEK])
+        self.diff.flags.writeable = False
+        self.counts.flags.writeable = False
+
+    @classmethod
+    def from_schedules(cls, schedules):
+        return cls(_difference_array(schedules))
+
+    def updated(self, old_schedules, removed_ids, new_schedules, added_ids):
+        """
+        Returns the occupancy after dropping `removed_ids` of old_schedules and
+        adding `added_ids` of new_schedules.
+        """
+        diff = (
+            self.diff
+            - _difference_array(old_schedules, removed_ids)
+            + _difference_array(new_schedules, added_ids)
+        )
+        return WeeklyOccupancy(diff)
+
+    def buckets(self, minutes):
+        """
+        Aggregates the per-minute counts into buckets of `minutes`, which must
+        divide a day. Returns (starts, mins, maxes, means) arrays.
+        """
+        if minutes <= 0 or MINUTES_PER_DAY % minutes:
+            raise ValueError(f"Resolution must divide a day evenly, got {minutes} minutes")
+        grid = self.counts.reshape(-1, minutes)
+        return (
+            np.arange(0, MINUTES_PER_WEEK, minutes),
+            grid.min(axis=1),
+            grid.max(axis=1),
+            grid.mean(axis=1),
+        )
+
+
+def parse_resolution(text):
+    """
+    Parses a resolution such as "15m", "1h" or "30" (minutes) into minutes.
+    Raises ValueError for anything else.
+    """
+    value = text.strip().lower()
+    scale = 1
+    if value.endswith("h"):
+        value, scale = value[:-1], 60
+    elif value.endswith("m"):
+        value = value[:-1]
+    if not value.isdigit():
+        raise ValueError(f"Invalid resolution: '{text}'. Use minutes or hours, e.g. 15m or 1h")
+    return int(value) * scale
+
+
+def bucket_label(minute):
+    """
+    Returns (day, "HH:MM") for a minute of the week.
+    """
+    day, minute = divmod(int(minute), MINUTES_PER_DAY)
+    return DAY_NAMES[day], f"{minute // 60:02d}:{minute % 60:02d}"
@@ -0,0 +1,65 @@
+import base64
+import json
+
+import numpy as np
+
+# Largest page a client may request with `limit`
+MAX_PAGE_SIZE = 1000
+
+# Names written per chunk of a streamed NDJSON response
+NDJSON_CHUNK_SIZE = 1024
+
+
+def encode_cursor(version, after_id):
+    """
+    Returns an opaque cursor resuming after catalog id `after_id`.
+    """
+    raw = json.dumps([version, after_id], separators=(",", ":")).encode("ascii")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    Returns (catalog_version, after_id) from a cursor made by encode_cursor.
+    Raises ValueError for anything else.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        version, after_id = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid cursor: '{cursor}'") from e
+    if not isinstance(version, int) or not isinstance(after_id, int):
+        raise ValueError(f"Invalid cursor: '{cursor}'")
+    return version, after_id
+
+
+def paginate(ids, version, cursor=None, limit=None):
+    """
+    Slices a sorted array of open catalog ids into one page.
+
+    Pages are keyed on the last id returned rather than an offset, so a client
+    walking the pages with one datetime never sees a name twice. Ids are only
+    meaningful within one catalog version, so a cursor from another version
+    raises ValueError and the client has to start over.
+    Returns (page_ids, next_cursor), with next_cursor None on the last page.
+    """
+    start = 0
+    if cursor is not None:
+        cursor_version, after_id = decode_cursor(cursor)
+        if cursor_version != version:
+            raise ValueError("Cursor is from an older version of the restaurant data")
+        start = int(np.searchsorted(ids, after_id, side="right"))
+    stop = len(ids) if limit is None else min(start + limit, len(ids))
+    page = ids[start:stop]
+    next_cursor = encode_cursor(version, int(page[-1])) if stop < len(ids) and len(page) else None
+    return page, next_cursor
+
+
+def iter_ndjson(encoded_names, ids, chunk_size=NDJSON_CHUNK_SIZE):
+    """
+    Yields NDJSON chunks, one {"name": ...} object per line, from pre-encoded names.
+    """
+    for i in range(0, len(ids), chunk_size):
+        yield b"".join(
+            b'{"name":' + encoded_names[j] + b"}\n" for j in ids[i:i + chunk_size].tolist()
+        )
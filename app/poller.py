@@ -0,0 +1,50 @@
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class Poller:
+    """
+    Daemon thread that calls `callback` every `interval` seconds until stopped.
+    An exception from `callback` is logged and polling carries on, so one
+    failed reload leaves the current catalog in place without ending reloads.
+    """
+
+    def __init__(self, callback, name):
+        self.callback = callback
+        self.name = name
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval):
+        """
+        Starts polling; does nothing if already running.
+        """
+        if self._thread is not None:
+            return
+        self._stop.clear()
+
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.callback()
+                except Exception:
+                    logger.exception(f"Error in {self.name} polling")
+
+        self._thread = threading.Thread(target=poll, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops polling and waits for a callback in progress to finish.
+        """
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
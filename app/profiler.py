@@ -0,0 +1,133 @@
+import os
+import sys
+import threading
+import logging
+from collections import Counter
+
+logger = logging.getLogger(__name__)
+
+# Seconds between samples while the profiler runs
+DEFAULT_INTERVAL = 0.005
+
+# Deepest stack kept per sample; deeper frames are cut from the root end
+MAX_DEPTH = 128
+
+# A thread whose innermost frame is in one of these files is waiting, not working
+IDLE_FILES = ("threading.py", "selectors.py", "queue.py")
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler that snapshots every thread's stack on a timer.
+
+    Samples are only taken while at least one request is in flight (see
+    ProfilerMiddleware), and threads that are blocked waiting are skipped, so
+    the output shows where requests spend CPU time. Stacks are aggregated in
+    the folded format ("root;caller;callee count") that flamegraph.pl,
+    speedscope and inferno read directly.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.active_requests = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self, interval=None):
+        """
+        Starts sampling on a daemon thread. Does nothing if already running.
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            if interval is not None:
+                self.interval = interval
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"Sampling profiler started, every {self.interval * 1000:.1f} ms")
+
+    def stop(self):
+        """
+        Stops sampling; collected stacks are kept until reset().
+        """
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._stop.set()
+            thread.join()
+            logger.info(f"Sampling profiler stopped after {self.samples} samples")
+
+    def reset(self):
+        """
+        Discards every collected stack.
+        """
+        with self._lock:
+            self.stacks = Counter()
+            self.samples = 0
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if self.active_requests > 0:
+                self.sample(exclude=own)
+
+    def sample(self, exclude=None):
+        """
+        Records the current stack of every busy thread except `exclude`.
+        """
+        frames = sys._current_frames()
+        with self._lock:
+            self.samples += 1
+            for thread_id, frame in frames.items():
+                if thread_id == exclude or os.path.basename(frame.f_code.co_filename) in IDLE_FILES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(frame_label(frame))
+                    frame = frame.f_back
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self):
+        """
+        Returns the collected stacks in folded format, heaviest first.
+        """
+        with self._lock:
+            items = self.stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+
+class ProfilerMiddleware:
+    """
+    ASGI middleware telling a SamplingProfiler when requests are in flight.
+    While the profiler is stopped it costs one property check per request.
+    """
+
+    def __init__(self, app, profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        profiler = self.profiler
+        if scope["type"] != "http" or not profiler.running:
+            await self.app(scope, receive, send)
+            return
+
+        # Only touched from the event loop thread, so no lock is needed
+        profiler.active_requests += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiler.active_requests -= 1
@@ -0,0 +1,101 @@
+from datetime import timedelta
+
+import numpy as np
+
+from app.schedule_index import MINUTES_PER_WEEK, query_point
+
+RANGE_MODES = ("all", "any")
+
+
+def window_parts(start_dt, end_dt):
+    """
+    Converts a datetime window into one or two inclusive minute-of-week ranges.
+    Both ends are truncated to the minute; a window wrapping past Sunday midnight
+    is split in two, and one lasting a week or more covers the whole week.
+    Raises ValueError if end_dt is before start_dt.
+    """
+    start_dt = start_dt.replace(second=0, microsecond=0)
+    end_dt = end_dt.replace(second=0, microsecond=0)
+    if end_dt < start_dt:
+        raise ValueError("Window end must not be before its start")
+
+    length = (end_dt - start_dt) // timedelta(minutes=1)
+    if length >= MINUTES_PER_WEEK - 1:
+        return [(0, MINUTES_PER_WEEK - 1)]
+
+    first = int(query_point(start_dt))
+    last = first + length
+    if last < MINUTES_PER_WEEK:
+        return [(first, last)]
+    return [(first, MINUTES_PER_WEEK - 1), (0, last - MINUTES_PER_WEEK)]
+
+
+class RangeIndex:
+    """
+    Answers "open for the whole window" and "open at any point in the window"
+    with interval overlap math, so cost does not depend on the window's length.
+
+    Each restaurant's intervals are merged into maximal runs of covered minutes.
+    That joins the overnight splits parse_hours produces (..23:59 then 00:00..),
+    so a bar open 10 pm - 2 am counts as open for the whole 11 pm - 1 am window.
+    """
+
+    def __init__(self, names, starts, ends, owners):
+        self.names = names
+        starts = np.asarray(starts, dtype=np.int32)
+        ends = np.asarray(ends, dtype=np.int32)
+        owners = np.asarray(owners, dtype=np.int32)
+        self._starts, self._ends, self._owners = starts, ends, owners
+
+        if not len(starts):
+            self.run_starts = self.run_ends = self.run_owners = starts
+            self.run_count = 0
+            return
+
+        # Offset every restaurant into its own stretch of the number line so a
+        # single running maximum can merge runs without crossing owners.
+        order = np.lexsort((starts, owners))
+        shift = owners[order].astype(np.int64) * (2 * MINUTES_PER_WEEK)
+        shifted_starts = starts[order] + shift
+        shifted_ends = ends[order] + shift
+        reach = np.maximum.accumulate(shifted_ends)
+        new_run = np.ones(len(order), dtype=bool)
+        new_run[1:] = shifted_starts[1:] > reach[:-1] + 1
+        first = np.flatnonzero(new_run)
+
+        self.run_owners = owners[order][first]
+        self.run_starts = starts[order][first]
+        self.run_ends = (np.maximum.reduceat(shifted_ends, first) - shift[first]).astype(np.int32)
+        self.run_count = len(first)
+
+    def open_ids(self, start_dt, end_dt, mode="all"):
+        """
+        Returns the sorted ids of restaurants open for the whole window ("all")
+        or for at least one minute of it ("any").
+        """
+        if mode not in RANGE_MODES:
+            raise ValueError(f"Unknown range mode: '{mode}'")
+
+        result = None
+        for first, last in window_parts(start_dt, end_dt):
+            if mode == "all":
+                mask = (self.run_starts <= first) & (self.run_ends >= last)
+                ids = self.run_owners[mask]
+            else:
+                mask = (self._starts <= last) & (self._ends >= first)
+                ids = self._owners[mask]
+            ids = np.unique(ids)
+            if result is None:
+                result = ids
+            elif mode == "all":
+                result = np.intersect1d(result, ids, assume_unique=True)
+            else:
+                result = np.union1d(result, ids)
+        return result.tolist()
+
+    def open_between(self, start_dt, end_dt, mode="all"):
+        """
+        Returns names of restaurants matching the window and mode, in catalog order.
+        """
+        names = self.names
+        return [names[i] for i in self.open_ids(start_dt, end_dt, mode)]
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+NO_RESULTS_MESSAGE = "No restaurants are open at that time. Please try again."
+
+
+def render_open_restaurants(open_restaurants):
+    """
+    Serializes an /open_restaurants/ result exactly as FastAPI's JSONResponse would.
+    """
+    if not open_restaurants:
+        payload = {"message": NO_RESULTS_MESSAGE}
+    else:
+        payload = {"open_restaurants": open_restaurants}
+    return json.dumps(payload, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def encode_names(names):
+    """
+    JSON-encodes every name once, so responses can be assembled from bytes.
+    """
+    return [json.dumps(name, ensure_ascii=False).encode("utf-8") for name in names]
+
+
+def render_open_ids(encoded_names, ids, next_cursor=None, paginated=False):
+    """
+    Serializes an /open_restaurants/ result from pre-encoded names, byte for byte
+    what render_open_restaurants would produce for the same names. Paginated
+    responses always list their (possibly empty) page and carry "next_cursor".
+    """
+    if not len(ids) and not paginated:
+        return render_open_restaurants([])
+    body = b'{"open_restaurants":[' + b",".join([encoded_names[i] for i in ids.tolist()]) + b"]"
+    if paginated:
+        body += b',"next_cursor":' + (json.dumps(next_cursor).encode("ascii"))
+    return body + b"}"
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Returns True if an If-None-Match header value matches `etag`: it is `*`,
+    or one of its comma-separated validators equals the ETag once weak W/
+    prefixes are dropped, the weak comparison RFC 9110 asks for.
+    """
+    if if_none_match is None:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    etag = etag.removeprefix("W/")
+    return any(candidate.strip().removeprefix("W/") == etag for candidate in if_none_match.split(","))
+
+class CachedResponse:
+    """
+    A pre-serialized response body and its strong ETag, plus the sorted catalog
+    ids it lists so pages can be cut from it without recomputing the answer.
+    """
+    __slots__ = ("body", "etag", "ids")
+
+    def __init__(self, body, ids=None):
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.ids = ids
+
+
+class ResponseCache:
+    """
+    Caches /open_restaurants/ bodies per minute-of-week for one catalog version.
+
+    The answer depends only on the weekday and time of day, so there are at most
+    10,080 keys. Each key holds two slots, for queries exactly on the minute and
+    for queries with seconds, since a range's closing minute matches only the former.
+    Switching to a different catalog drops every entry.
+    """
+
+    def __init__(self):
+        # (catalog, entries) swapped as one object so readers never pair the wrong two
+        self._state = (None, {})
+
+    def __len__(self):
+        return len(self._state[1])
+
+    def _entries_for(self, catalog):
+        current, entries = self._state
+        if current is catalog:
+            return entries
+        if current is not None and catalog.version < current.version:
+            # A request still holding an older catalog; answer it without caching
+            return {}
+        logger.info(f"Response cache reset for catalog version {catalog.version}")
+        entries = {}
+        self._state = (catalog, entries)
+        return entries
+
+    def get(self, catalog, point):
+        """
+        Returns the CachedResponse for a query_point against `catalog`, computing it on a miss.
+        """
+        entries = self._entries_for(catalog)
+        minute = int(point)
+        slot = 1 if point != minute else 0
+        entry = entries.get(minute)
+        if entry is None:
+            entry = entries.setdefault(minute, [None, None])
+        response = entry[slot]
+        if response is None:
+            ids = np.asarray(catalog.index.open_ids(point), dtype=np.int32)
+            response = entry[slot] = CachedResponse(render_open_ids(catalog.encoded_names, ids), ids)
+        return response
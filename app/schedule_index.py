@@ -0,0 +1,352 @@
+import hashlib
+import sys
+from array import array
+from datetime import time
+from functools import lru_cache
+from itertools import chain
+from types import MappingProxyType
+
+import numpy as np
+
+from app.data_handler import DAYS_MAP, DAY_NAMES, PARSE_CACHE_SIZE, normalize_hours_string, parse_hours_cached
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY  # 10080, minute-of-week runs 0..10079
+
+
+def time_to_minute(t):
+    """
+    Converts a datetime.time into minutes since midnight, ignoring seconds.
+    """
+    return t.hour * 60 + t.minute
+
+
+def schedule_to_intervals(schedule):
+    """
+    Converts a schedule dictionary produced by parse_hours into a sorted list of
+    closed (start, end) minute-of-week intervals.
+    Overnight ranges are already split per day by parse_hours, so no interval wraps.
+    """
+    intervals = []
+    for day, time_ranges in schedule.items():
+        base = DAYS_MAP[day] * MINUTES_PER_DAY
+        for start, end in time_ranges:
+            intervals.append((base + time_to_minute(start), base + time_to_minute(end)))
+    intervals.sort()
+    return intervals
+
+
+def catalog_intervals(restaurants):
+    """
+    Flattens every schedule in a restaurants mapping into parallel int32 arrays
+    (starts, ends, owners), where owners holds the restaurant's position in the
+    mapping. Restaurants sharing a cached schedule object are converted once.
+    """
+    starts, ends, owners = [], [], []
+    converted = {}
+    for restaurant_id, schedule in enumerate(restaurants.values()):
+        key = id(schedule)
+        if key not in converted:
+            # Hold a reference so the id cannot be reused by another schedule mid-loop
+            converted[key] = (schedule, schedule_to_intervals(schedule))
+        for start, end in converted[key][1]:
+            starts.append(start)
+            ends.append(end)
+            owners.append(restaurant_id)
+    return (
+        np.array(starts, dtype=np.int32),
+        np.array(ends, dtype=np.int32),
+        np.array(owners, dtype=np.int32),
+    )
+
+
+def encode_intervals(intervals):
+    """
+    Packs minute-of-week intervals into the compact little-endian uint16 pair
+    encoding stored in the `intervals` column next to the raw hours text.
+    """
+    packed = array('H', chain.from_iterable(intervals))
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_intervals(blob):
+    """
+    Unpacks an encode_intervals blob into a list of (start, end) minute-of-week tuples.
+    Raises ValueError if the blob is not a valid encoding.
+    """
+    if len(blob) % 4:
+        raise ValueError(f"Interval blob length {len(blob)} is not a multiple of 4")
+    packed = array('H')
+    packed.frombytes(blob)
+    if sys.byteorder != 'little':
+        packed.byteswap()
+    intervals = list(zip(packed[::2], packed[1::2]))
+    for start, end in intervals:
+        if not start <= end < MINUTES_PER_WEEK or start // MINUTES_PER_DAY != end // MINUTES_PER_DAY:
+            raise ValueError(f"Invalid minute-of-week interval in blob: ({start}, {end})")
+    return intervals
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def schedule_from_blob(blob):
+    """
+    Rebuilds the read-only schedule mapping that parse_hours_cached would return
+    from a stored interval blob, without parsing the hours text.
+    """
+    schedule = {d: [] for d in DAY_NAMES}
+    for start, end in decode_intervals(blob):
+        day, start_minute = divmod(start, MINUTES_PER_DAY)
+        end_minute = end - day * MINUTES_PER_DAY
+        schedule[DAY_NAMES[day]].append(
+            (time(*divmod(start_minute, 60)), time(*divmod(end_minute, 60)))
+        )
+    return MappingProxyType({d: tuple(ranges) for d, ranges in schedule.items()})
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def hours_to_blob(hours_str):
+    """
+    Parses an hours string straight to its encode_intervals blob; chain-wide
+    strings are parsed and encoded once.
+    """
+    return encode_intervals(schedule_to_intervals(parse_hours_cached(hours_str)))
+
+
+def hours_digest(hours_str):
+    """
+    Returns a hex digest of the normalized hours string. Stored next to an
+    intervals blob, it tells readers which hours text the blob was computed
+    from, so a blob left behind by an edit to the hours is never trusted.
+    """
+    return hashlib.blake2b(normalize_hours_string(hours_str).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def query_point(query_dt):
+    """
+    Converts a datetime into the point used to probe minute-of-week intervals.
+
+    The original endpoint compares full datetime.time values, so 22:00:30 is
+    already past a range ending at 22:00. Sub-minute queries are therefore
+    shifted half a minute forward, which keeps integer intervals closed while
+    reproducing that comparison exactly.
+    """
+    minute = query_dt.weekday() * MINUTES_PER_DAY + query_dt.hour * 60 + query_dt.minute
+    if query_dt.second or query_dt.microsecond:
+        return minute + 0.5
+    return minute
+
+
+# Names of the flat arrays that make up a ScheduleIndex, in a stable order
+# Share of an index's intervals that patches may add before the tree is rebuilt balanced
+PATCH_REBUILD_FRACTION = 0.25
+
+INDEX_ARRAYS = ("centers", "lefts", "rights", "los", "his", "starts", "start_ids", "ends", "end_ids")
+
+
+def build_index_arrays(starts, ends, owners):
+    """
+    Builds a centered interval tree from parallel start, end and owner arrays and
+    flattens it into arrays. Node i holds the intervals in [los[i], his[i]) of
+    the start-sorted and end-sorted arrays, all of which contain centers[i].
+    Child links of -1 mean no child; node 0 is the root.
+    """
+    table = np.column_stack((starts, ends, owners)).astype(np.int32).reshape(-1, 3)
+    nodes = {name: [] for name in ("centers", "lefts", "rights", "los", "his")}
+    by_start, by_end = [], []
+    filled = 0
+
+    def build(rows):
+        nonlocal filled
+        if not len(rows):
+            return -1
+
+        starts, ends = rows[:, 0], rows[:, 1]
+        endpoints = np.unique(np.concatenate((starts, ends)))
+        center = int(endpoints[len(endpoints) // 2])
+        here = rows[(starts <= center) & (ends >= center)]
+
+        node = len(nodes["centers"])
+        nodes["centers"].append(center)
+        nodes["los"].append(filled)
+        filled += len(here)
+        nodes["his"].append(filled)
+        by_start.append(here[np.argsort(here[:, 0], kind="stable")])
+        by_end.append(here[np.argsort(here[:, 1], kind="stable")])
+        nodes["lefts"].append(-1)
+        nodes["rights"].append(-1)
+        nodes["lefts"][node] = build(rows[ends < center])
+        nodes["rights"][node] = build(rows[starts > center])
+        return node
+
+    build(table)
+    by_start = np.concatenate(by_start) if by_start else table
+    by_end = np.concatenate(by_end) if by_end else table
+    arrays = {name: np.array(values, dtype=np.int32) for name, values in nodes.items()}
+    arrays["centers"] = arrays["centers"].astype(np.int16)
+    arrays["starts"] = by_start[:, 0].astype(np.int16)
+    arrays["start_ids"] = by_start[:, 2].copy()
+    arrays["ends"] = by_end[:, 1].astype(np.int16)
+    arrays["end_ids"] = by_end[:, 2].copy()
+    return arrays
+
+
+class ScheduleIndex:
+    """
+    Minute-of-week interval index over a restaurants dictionary from load_data.
+    Point queries cost O(log n + k) instead of scanning every restaurant.
+
+    The tree is stored as flat NumPy arrays (see INDEX_ARRAYS), so it can be
+    written to and served from a memory-mapped snapshot file.
+    """
+
+    def __init__(self, restaurants):
+        self._set_arrays(list(restaurants.keys()), build_index_arrays(*catalog_intervals(restaurants)))
+
+    @classmethod
+    def from_arrays(cls, names, arrays):
+        """
+        Rebuilds an index from a names sequence and the arrays returned by `arrays()`.
+        """
+        index = cls.__new__(cls)
+        index._set_arrays(names, arrays)
+        return index
+
+    def _set_arrays(self, names, arrays):
+        self.names = names
+        for name in INDEX_ARRAYS:
+            setattr(self, "_" + name, arrays[name])
+        # The node walk touches one element at a time, which is faster on Python lists
+        self._nodes = list(zip(
+            arrays["centers"].tolist(), arrays["lefts"].tolist(), arrays["rights"].tolist(),
+            arrays["los"].tolist(), arrays["his"].tolist(),
+        ))
+        self.interval_count = len(arrays["starts"])
+        # Intervals added by patched() since the tree was last built balanced
+        self.patched_count = 0
+
+    def patched(self, names, dropped_ids, new_ids, starts, ends, owners):
+        """
+        Returns an index over `names` without the intervals of restaurants in
+        `dropped_ids`, with every other restaurant renumbered through `new_ids`
+        (old id -> new id) and the (starts, ends, owners) intervals added.
+
+        Added intervals go to the first node on their root path whose center
+        they contain; one that falls off the tree becomes a new leaf centered on
+        its start. Nodes are never rebalanced, so the walk costs O(depth) per
+        added interval and the rest is filtering the flat arrays and merging
+        the added intervals into them. Callers rebuild the index instead once
+        needs_rebuild() reports that patches would make up too much of it.
+        """
+        centers = self._centers.tolist()
+        lefts = self._lefts.tolist()
+        rights = self._rights.tolist()
+        added_nodes = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            node = 0 if centers else -1
+            parent, side = None, None
+            while node >= 0:
+                center = centers[node]
+                if end < center:
+                    parent, side, node = node, lefts, lefts[node]
+                elif start > center:
+                    parent, side, node = node, rights, rights[node]
+                else:
+                    break
+            if node < 0:
+                node = len(centers)
+                centers.append(start)
+                lefts.append(-1)
+                rights.append(-1)
+                if parent is not None:
+                    side[parent] = node
+            added_nodes.append(node)
+
+        old_count = len(self._nodes)
+        added_nodes = np.array(added_nodes, dtype=np.int64)
+        starts, ends, owners = np.asarray(starts), np.asarray(ends), np.asarray(owners)
+        los, his = self._los.tolist(), self._his.tolist()
+        end = his[-1] if his else 0
+        dropped = np.zeros(len(self.names), dtype=bool)
+        dropped[dropped_ids] = True
+        arrays = {
+            "centers": np.array(centers, dtype=np.int16),
+            "lefts": np.array(lefts, dtype=np.int32),
+            "rights": np.array(rights, dtype=np.int32),
+        }
+        for key, values, ids, added_values in (
+            ("starts", self._starts, self._start_ids, starts), ("ends", self._ends, self._end_ids, ends),
+        ):
+            # Insert the added intervals in (node, value) order, each at its sorted
+            # place within its node's run; runs of new nodes follow the existing ones
+            order = np.lexsort((added_values, added_nodes))
+            positions = [
+                los[node] + int(np.searchsorted(values[los[node]:his[node]], value, side="right"))
+                if node < old_count else end
+                for node, value in zip(added_nodes[order].tolist(), added_values[order].tolist())
+            ]
+            kept = np.insert(~dropped[ids], positions, True)
+            arrays[key] = np.insert(values, positions, added_values[order])[kept].astype(np.int16)
+            arrays[key[:-1] + "_ids"] = np.insert(new_ids[ids], positions, owners[order])[kept].astype(np.int32)
+
+        # Run lengths less the dropped intervals plus the added ones
+        counts = np.zeros(len(centers), dtype=np.int64)
+        counts[:old_count] = self._his - self._los
+        dropped_positions = np.flatnonzero(dropped[self._start_ids])
+        counts[:old_count] -= np.bincount(
+            np.searchsorted(self._his, dropped_positions, side="right"), minlength=old_count
+        )[:old_count]
+        counts += np.bincount(added_nodes, minlength=len(centers))
+        his = np.cumsum(counts)
+        arrays["los"] = (his - counts).astype(np.int32)
+        arrays["his"] = his.astype(np.int32)
+        index = ScheduleIndex.from_arrays(names, arrays)
+        index.patched_count = self.patched_count + len(starts)
+        return index
+
+    def needs_rebuild(self, added):
+        """
+        Returns True when patching in `added` more intervals would bring the
+        share of patched intervals past PATCH_REBUILD_FRACTION.
+        """
+        return self.patched_count + added > PATCH_REBUILD_FRACTION * max(self.interval_count, 1)
+
+    def arrays(self):
+        """
+        Returns the flat arrays backing the index, keyed by INDEX_ARRAYS names.
+        """
+        return {name: getattr(self, "_" + name) for name in INDEX_ARRAYS}
+
+    def __len__(self):
+        return len(self.names)
+
+    def open_ids(self, point):
+        """
+        Returns the sorted ids of restaurants with an interval containing `point`.
+        """
+        parts = []
+        node = 0 if self._nodes else -1
+        while node >= 0:
+            center, left, right, lo, hi = self._nodes[node]
+            if point < center:
+                k = lo + int(np.searchsorted(self._starts[lo:hi], point, side="right"))
+                parts.append(self._start_ids[lo:k])
+                node = left
+            elif point > center:
+                k = lo + int(np.searchsorted(self._ends[lo:hi], point, side="left"))
+                parts.append(self._end_ids[k:hi])
+                node = right
+            else:
+                parts.append(self._start_ids[lo:hi])
+                break
+        if not parts:
+            return []
+        return np.unique(np.concatenate(parts)).tolist()
+
+    def open_at(self, query_dt):
+        """
+        Returns names of restaurants open at `query_dt`, in catalog order.
+        """
+        names = self.names
+        return [names[i] for i in self.open_ids(query_point(query_dt))]
@@ -0,0 +1,82 @@
+import re
+
+import numpy as np
+
+# Largest number of results a client may request with `limit`
+MAX_SEARCH_RESULTS = 1000
+
+# Hits fetched per query while filtering by open_at; later batches double in size
+SEARCH_BATCH_SIZE = 256
+MAX_SEARCH_BATCH_SIZE = 16_384
+
+# Best matches first; bm25 weights name hits above cuisine and tags hits. The
+# rank MATCH form lets FTS5 apply LIMIT while ranking instead of sorting every hit.
+SEARCH_SQL = """
+    SELECT r.name, r.cuisine, r.tags
+    FROM restaurants_fts JOIN restaurants r ON r.id = restaurants_fts.rowid
+    WHERE restaurants_fts MATCH ? AND rank MATCH 'bm25(10.0, 5.0, 1.0)'
+    ORDER BY rank
+    LIMIT ? OFFSET ?
+"""
+
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(text):
+    """
+    Turns free text into an FTS5 query matching rows that contain every word,
+    the last one as a prefix so partial input ("sus") still matches. Words are
+    quoted, so FTS5 operators and punctuation in user input are never parsed.
+    Raises ValueError when the text has no words.
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+def hit_ids(catalog, names):
+    """
+    Maps ranked search hits to catalog ids, -1 for names the catalog does not
+    hold (rows added since it loaded, or with unparseable hours).
+    """
+    ids = catalog.ids
+    return np.fromiter((ids.get(name, -1) for name in names), dtype=np.int32, count=len(names))
+
+
+def intersect_ranked(ranked_ids, open_ids=None):
+    """
+    Returns the positions in `ranked_ids` of hits the catalog holds and, if
+    `open_ids` is given, that are also open, in rank order. Both are catalog id
+    arrays, so filtering is one sorted-set intersection rather than a
+    membership test per name.
+    """
+    known = np.flatnonzero(ranked_ids >= 0)
+    if open_ids is None:
+        return known
+    _, positions, _ = np.intersect1d(ranked_ids[known], open_ids, assume_unique=True, return_indices=True)
+    positions.sort()
+    return known[positions]
+
+
+async def search(pool, catalog, match, limit, open_ids=None):
+    """
+    Returns up to `limit` (name, cuisine, tags) rows for an FTS5 match, best
+    first, keeping only restaurants in the catalog and, if `open_ids` is given,
+    open ones. Hits are fetched in batches until enough survive, so a broad
+    query never loads the whole table.
+    """
+    results = []
+    offset = 0
+    batch = limit if open_ids is None else max(limit, SEARCH_BATCH_SIZE)
+    while len(results) < limit:
+        rows = await pool.fetch_all(SEARCH_SQL, (match, batch, offset))
+        positions = intersect_ranked(hit_ids(catalog, [row[0] for row in rows]), open_ids)
+        results.extend(rows[i] for i in positions.tolist())
+        if len(rows) < batch:
+            break
+        offset += batch
+        batch = min(batch * 2, MAX_SEARCH_BATCH_SIZE)
+    return results[:limit]
@@ -0,0 +1,72 @@
+"""
+Multi-process server: loads the catalog once in this process, publishes it as
+a shared memory-mapped generation and runs uvicorn workers that attach to it.
+
+    python -m app.serve --workers 4 --port 8000
+"""
+import argparse
+import os
+import logging
+from functools import partial
+
+import uvicorn
+
+from app.catalog import DEFAULT_DB_PATH
+from app.generations import GenerationPublisher
+from app.snapshot import DEFAULT_SNAPSHOT_PATH, load_snapshot
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_GENERATIONS_DIR = "app/generations"
+
+
+def default_workers():
+    """
+    Returns the number of CPUs this process may use: its CPU affinity, capped
+    by a cgroup v2 CPU quota when running in a container that sets one.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the API from several worker processes sharing one catalog.")
+    parser.add_argument("--workers", type=int, default=default_workers())
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--db", default=os.environ.get("OPEN_BITES_DB", DEFAULT_DB_PATH))
+    parser.add_argument("--snapshot", default=os.environ.get("OPEN_BITES_SNAPSHOT", DEFAULT_SNAPSHOT_PATH),
+                        help="prebuilt snapshot to start from when it is fresh")
+    parser.add_argument("--generations-dir", default=DEFAULT_GENERATIONS_DIR,
+                        help="directory the catalog generations are published to")
+    parser.add_argument("--reload-interval", type=float,
+                        default=float(os.environ.get("OPEN_BITES_RELOAD_INTERVAL", "0")),
+                        help="seconds between database change checks; 0 disables reloads")
+    args = parser.parse_args(argv)
+
+    publisher = GenerationPublisher(args.db, args.generations_dir, partial(load_snapshot, args.snapshot))
+    # Workers are new interpreters that read their configuration from the environment
+    os.environ["OPEN_BITES_DB"] = args.db
+    os.environ["OPEN_BITES_GENERATIONS_DIR"] = os.path.abspath(args.generations_dir)
+    if args.reload_interval > 0:
+        publisher.start_polling(args.reload_interval)
+    logger.info(f"Starting {args.workers} workers on catalog generation {publisher.generation}")
+    try:
+        uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers)
+    finally:
+        publisher.stop_polling()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,245 @@
+"""
+Binary catalog snapshots that worker processes memory-map at startup.
+
+File layout: an 8-byte magic, a little-endian uint32 header length, a JSON
+header, then 64-byte aligned array sections. The header lists each section's
+dtype, offset (relative to the first section) and length, plus the signature
+of the SQLite database the snapshot was built from and the catalog's
+timezone names.
+
+    python -m app.snapshot --db app/restaurants.db --out app/restaurants.snapshot
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+from collections.abc import Mapping
+
+import numpy as np
+
+from app.batch_engine import BatchEngine
+from app.catalog import Catalog, DEFAULT_DB_PATH
+from app.compact_schedule import CompactSchedules
+from app.data_handler import iter_restaurant_rows
+from app.schedule_index import INDEX_ARRAYS, ScheduleIndex
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SNAPSHOT_PATH = "app/restaurants.snapshot"
+
+MAGIC = b"OBSNAP\x00\x01"
+SNAPSHOT_VERSION = 2
+ALIGNMENT = 64
+
+
+def database_signature(db_path):
+    """
+    Returns the size and mtime of the database and its WAL file, which change
+    whenever committed data changes. Returns None if the database is missing.
+    An empty WAL holds no data and is recreated by every new connection, so it
+    counts as no WAL at all.
+    """
+    try:
+        st = os.stat(db_path)
+    except OSError:
+        return None
+    signature = [st.st_size, st.st_mtime_ns]
+    try:
+        wal = os.stat(db_path + "-wal")
+    except OSError:
+        wal = None
+    if wal is not None and wal.st_size:
+        signature += [wal.st_size, wal.st_mtime_ns]
+    else:
+        signature += [0, 0]
+    return signature
+
+
+def _string_table(strings):
+    """
+    Encodes strings as (int64 offsets, uint8 blob) arrays.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def write_snapshot(catalog, path, source=None):
+    """
+    Writes a catalog to `path` atomically. `source` is the database_signature
+    the catalog was built from and is used to detect stale snapshots.
+    """
+    names = list(catalog.restaurants.keys())
+    names_offsets, names_blob = _string_table(names)
+    hours_offsets, hours_blob = _string_table(catalog.hours.get(name, "") for name in names)
+
+    batch = catalog.batch
+    interval_offsets = np.searchsorted(batch.owners, np.arange(len(names) + 1)).astype(np.int64)
+
+    sections = {
+        "names_offsets": names_offsets,
+        "names_blob": names_blob,
+        "hours_offsets": hours_offsets,
+        "hours_blob": hours_blob,
+        "interval_offsets": interval_offsets,
+        "interval_starts": batch.starts,
+        "interval_ends": batch.ends,
+        "interval_owners": batch.owners,
+        "zone_ids": np.asarray(catalog.zone_ids, dtype=np.int32),
+    }
+    for name, array in catalog.index.arrays().items():
+        sections["index_" + name] = array
+
+    layout = {}
+    offset = 0
+    for name, array in sections.items():
+        array = np.ascontiguousarray(array, dtype=array.dtype.newbyteorder("<"))
+        sections[name] = array
+        layout[name] = [array.dtype.str, offset, len(array)]
+        offset += -(-array.nbytes // ALIGNMENT) * ALIGNMENT
+
+    header = json.dumps({
+        "version": SNAPSHOT_VERSION,
+        "source": source,
+        "count": len(names),
+        "zones": list(catalog.zone_names),
+        "sections": layout,
+    }).encode("utf-8")
+    data_start = -(-(len(MAGIC) + 4 + len(header)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        for name, array in sections.items():
+            f.seek(data_start + layout[name][1])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+    os.replace(tmp_path, path)
+
+
+def build_snapshot(db_path=DEFAULT_DB_PATH, path=DEFAULT_SNAPSHOT_PATH):
+    """
+    Loads the catalog from SQLite and writes it as a snapshot. Returns the catalog.
+    """
+    # Taken before reading, so a write racing the build leaves the snapshot stale
+    source = database_signature(db_path)
+    catalog, _ = Catalog.from_rows(iter_restaurant_rows(db_path, include_stored=True))
+    write_snapshot(catalog, path, source)
+    logger.info(f"Wrote snapshot of {len(catalog)} restaurants to '{path}'")
+    return catalog
+
+
+class _SnapshotTable:
+    """
+    Read-only restaurant table backed by memory-mapped snapshot arrays.
+    """
+
+    def __init__(self, arrays):
+        self._arrays = arrays
+        offsets, blob = arrays["names_offsets"], arrays["names_blob"]
+        self.names = [
+            bytes(blob[a:b]).decode("utf-8") for a, b in zip(offsets[:-1].tolist(), offsets[1:].tolist())
+        ]
+
+    def hours(self, i):
+        offsets = self._arrays["hours_offsets"]
+        return bytes(self._arrays["hours_blob"][offsets[i]:offsets[i + 1]]).decode("utf-8")
+
+    def schedules(self):
+        """
+        Returns a CompactSchedules over the mapped interval arrays, without copying them.
+        """
+        offsets = self._arrays["interval_offsets"]
+        return CompactSchedules(
+            self.names,
+            self._arrays["interval_starts"],
+            self._arrays["interval_ends"],
+            offsets[:-1],
+            np.diff(offsets).astype(np.uint16),
+        )
+
+
+class SnapshotHours(Mapping):
+    """
+    Name -> raw hours text mapping backed by the snapshot.
+    """
+
+    def __init__(self, table, ids):
+        self._table = table
+        self._ids = ids
+
+    def __getitem__(self, name):
+        return self._table.hours(self._ids[name])
+
+    def __contains__(self, name):
+        return name in self._ids
+
+    def __iter__(self):
+        return iter(self._table.names)
+
+    def __len__(self):
+        return len(self._table.names)
+
+
+def load_snapshot(path=DEFAULT_SNAPSHOT_PATH, db_path=None, version=0):
+    """
+    Memory-maps a snapshot and returns a Catalog over it, or None when the file
+    is missing, unreadable or (given `db_path`) older than the database.
+    """
+    try:
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        logger.info(f"No usable snapshot at '{path}': {e}")
+        return None
+
+    try:
+        if mapped[:len(MAGIC)] != MAGIC:
+            raise ValueError("bad magic")
+        (header_len,) = struct.unpack_from("<I", mapped, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(mapped[header_start:header_start + header_len])
+        if header["version"] != SNAPSHOT_VERSION:
+            raise ValueError(f"unsupported version {header['version']}")
+        data_start = -(-(header_start + header_len) // ALIGNMENT) * ALIGNMENT
+        arrays = {
+            name: np.frombuffer(mapped, dtype=np.dtype(dtype), count=count, offset=data_start + offset)
+            for name, (dtype, offset, count) in header["sections"].items()
+        }
+    except (ValueError, KeyError, struct.error) as e:
+        logger.error(f"Ignoring corrupt snapshot '{path}': {e}")
+        return None
+
+    if db_path is not None and header["source"] != database_signature(db_path):
+        logger.info(f"Snapshot '{path}' is stale for '{db_path}', falling back to SQLite")
+        return None
+
+    table = _SnapshotTable(arrays)
+    index = ScheduleIndex.from_arrays(
+        table.names, {name: arrays["index_" + name] for name in INDEX_ARRAYS}
+    )
+    batch = BatchEngine.from_arrays(
+        table.names, arrays["interval_starts"], arrays["interval_ends"], arrays["interval_owners"]
+    )
+    schedules = table.schedules()
+    return Catalog(
+        schedules, SnapshotHours(table, schedules.ids), version, index=index, batch=batch,
+        zone_names=header["zones"], zone_ids=arrays["zone_ids"],
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a catalog snapshot from the SQLite database.")
+    parser.add_argument("--db", default=DEFAULT_DB_PATH, help="source SQLite database path")
+    parser.add_argument("--out", default=DEFAULT_SNAPSHOT_PATH, help="snapshot output path")
+    args = parser.parse_args(argv)
+    build_snapshot(args.db, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+# conftest.py
+
+import shutil
+import pytest
+from app.catalog import Catalog
+
+
+@pytest.fixture
+def make_catalog():
+    """
+    Builds a Catalog from (name, hours) or (name, hours, timezone) rows.
+    """
+    def make(rows, previous=None):
+        catalog, _ = Catalog.from_rows(
+            [(row[0], row[1], None, None, row[2] if len(row) > 2 else None) for row in rows], previous
+        )
+        return catalog
+
+    return make
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """
+    Path to a copy of the shipped database that the test may modify.
+    """
+    db_path = str(tmp_path / "restaurants.db")
+    shutil.copy("app/restaurants.db", db_path)
+    return db_path
@@ -0,0 +1,120 @@
+# test_api.py
+
+from fastapi.testclient import TestClient
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_open_restaurants_endpoint():
+    response = client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00"})
+    assert response.status_code == 200
+    assert "The Cowfish Sushi Burger Bar" in response.json()["open_restaurants"]
+
+    response = client.get("/open_restaurants/", params={"datetime_str": "not a date"})
+    assert response.status_code == 400
+
+
+def test_open_restaurants_batch_endpoint():
+    datetimes = ["2024-12-13T13:30:00", "2024-12-16T04:00:00"]
+    response = client.post("/open_restaurants/batch", json={"datetimes": datetimes})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["datetime"] for r in results] == datetimes
+
+    singles = [
+        client.get("/open_restaurants/", params={"datetime_str": dt}).json().get("open_restaurants", [])
+        for dt in datetimes
+    ]
+    assert [r["open_restaurants"] for r in results] == singles
+
+    response = client.post("/open_restaurants/batch", json={"datetimes": datetimes, "counts_only": True})
+    assert [r["open_count"] for r in response.json()["results"]] == [len(names) for names in singles]
+
+
+def test_open_restaurants_batch_invalid():
+    response = client.post("/open_restaurants/batch", json={"datetimes": ["2024-12-13T13:30:00", "nope"]})
+    assert response.status_code == 400
+    response = client.post("/open_restaurants/batch", json={"datetimes": ["2024-12-13T13:30:00"] * 10081})
+    assert response.status_code == 400
+
+
+def test_open_restaurants_cache_headers():
+    first = client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00"})
+    # Same weekday and minute on another date hits the same cache entry
+    second = client.get("/open_restaurants/", params={"datetime_str": "2024-12-20T13:30:00"})
+    assert first.content == second.content
+    assert first.headers["etag"] == second.headers["etag"]
+    assert "max-age" in first.headers["cache-control"]
+
+    response = client.get(
+        "/open_restaurants/",
+        params={"datetime_str": "2024-12-13T13:30:00"},
+        headers={"If-None-Match": first.headers["etag"]},
+    )
+    assert response.status_code == 304
+    assert response.content == b""
+
+    # Lists of validators and weak forms match too
+    for header in (f'"other", {first.headers["etag"]}', "W/" + first.headers["etag"], "*"):
+        response = client.get(
+            "/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00"}, headers={"If-None-Match": header}
+        )
+        assert response.status_code == 304, header
+
+
+def test_open_restaurants_no_results_message():
+    # 2024-12-16 is a Monday; nothing in the sample data is open at 6 am
+    response = client.get("/open_restaurants/", params={"datetime_str": "2024-12-16T06:00:00"})
+    assert response.json() == {"message": "No restaurants are open at that time. Please try again."}
+
+
+def test_open_restaurants_range_endpoint():
+    params = {"start": "2024-12-13T19:00:00", "end": "2024-12-13T22:00:00"}
+    all_open = client.get("/open_restaurants/range", params={**params, "mode": "all"}).json()["open_restaurants"]
+    any_open = client.get("/open_restaurants/range", params={**params, "mode": "any"}).json()["open_restaurants"]
+    assert set(all_open) <= set(any_open)
+
+    response = client.get("/open_restaurants/range", params={"start": params["end"], "end": params["start"]})
+    assert response.status_code == 400
+    response = client.get("/open_restaurants/range", params={**params, "mode": "some"})
+    assert response.status_code == 422
+
+
+def test_restaurant_detail_endpoint():
+    response = client.get("/restaurants/Caffe Luna")
+    assert response.status_code == 200
+    assert response.json()["name"] == "Caffe Luna"
+    assert client.get("/restaurants/Nowhere Diner").status_code == 404
+
+
+def test_search_endpoint():
+    response = client.get("/search", params={"q": "sush"})
+    assert response.status_code == 200
+    assert [r["name"] for r in response.json()["results"]] == ["The Cowfish Sushi Burger Bar"]
+
+    # Open on Friday afternoon, closed at 4 am on Monday
+    response = client.get("/search", params={"q": "cowfish sushi", "open_at": "2024-12-13T13:30:00"})
+    assert [r["name"] for r in response.json()["results"]] == ["The Cowfish Sushi Burger Bar"]
+    response = client.get("/search", params={"q": "cowfish sushi", "open_at": "2024-12-16T04:00:00"})
+    assert response.json()["results"] == []
+
+    assert client.get("/search", params={"q": '" * -'}).status_code == 400
+    assert client.get("/search", params={"q": "sushi", "open_at": "nope"}).status_code == 400
+
+
+def test_next_change_and_closing_soon_endpoints():
+    # 2024-12-13 is a Friday; Caffe Luna is open for lunch
+    response = client.get("/restaurants/Caffe Luna/next_change", params={"datetime_str": "2024-12-13T13:30:00"})
+    body = response.json()
+    assert body["open"] is True
+    assert body["opens_at"] is None
+    assert body["closes_at"] > "2024-12-13T13:30:00"
+
+    response = client.get("/open_restaurants/closing_soon", params={
+        "datetime_str": "2024-12-13T13:30:00", "within": body["minutes_until_change"],
+    })
+    assert "Caffe Luna" in [r["name"] for r in response.json()["closing_soon"]]
+
+    assert client.get("/restaurants/Nowhere/next_change", params={"datetime_str": "2024-12-13T13:30:00"}).status_code == 404
+    assert client.get("/open_restaurants/closing_soon", params={"datetime_str": "2024-12-13T13:30:00", "within": -1}).status_code == 422
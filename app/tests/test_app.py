@@ -1,7 +1,7 @@
 # test_app.py
 
 import pytest
-from app.data_handler import parse_time_string, parse_hours, load_data
+from app.data_handler import parse_time_string, parse_hours, parse_hours_cached, load_data
 from datetime import time
 
 def test_parse_time_string():
@@ -139,3 +139,18 @@ def test_parse_hours_multiple_aliases():
     # Check Saturday
     assert len(schedule["sat"]) == 1, "Sat should have one time range"
     assert schedule["sat"][0] == (time(17, 0), time(23, 0)), "Sat time range incorrect"
+
+def test_parse_hours_cached_shares_schedules():
+    # Whitespace variants of the same hours string share one read-only schedule
+    first = parse_hours_cached("Mon-Sun 11 am - 10 pm")
+    second = parse_hours_cached("Mon-Sun  11 am -  10 pm ")
+    assert first is second
+    assert first["wed"] == ((time(11, 0), time(22, 0)),)
+    with pytest.raises(TypeError):
+        first["wed"] = []
+
+def test_parse_hours_returns_independent_copies():
+    # parse_hours hands out mutable copies, so callers cannot corrupt the cache
+    schedule = parse_hours("Mon 11 am - 10 pm")
+    schedule["mon"].append((time(23, 0), time(23, 30)))
+    assert parse_hours("Mon 11 am - 10 pm")["mon"] == [(time(11, 0), time(22, 0))]
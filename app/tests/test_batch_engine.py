@@ -0,0 +1,71 @@
+# test_batch_engine.py
+
+from datetime import datetime, timedelta
+import numpy as np
+from app import batch_engine
+from app.data_handler import parse_hours, load_data
+from app.schedule_index import ScheduleIndex
+from app.batch_engine import BatchEngine
+
+
+def test_batch_matches_index():
+    restaurants = load_data("app/restaurants.db")
+    index = ScheduleIndex(restaurants)
+    engine = BatchEngine(restaurants)
+
+    start = datetime(2024, 12, 16)
+    query_dts = [start + timedelta(minutes=15 * i) for i in range(7 * 24 * 4)]
+    query_dts += [dt + timedelta(seconds=30) for dt in query_dts]
+
+    names = engine.open_names(query_dts)
+    counts = engine.open_counts(query_dts)
+    for query_dt, open_names, count in zip(query_dts, names, counts):
+        expected = index.open_at(query_dt)
+        assert open_names == expected
+        assert count == len(expected)
+
+
+def test_batch_matrix_shape_and_closed_restaurants():
+    restaurants = {
+        "Closed": parse_hours("Mon-Fri"),
+        "Late": parse_hours("Sun 10 pm - 1 am"),
+    }
+    engine = BatchEngine(restaurants)
+    # 2024-12-22 is a Sunday, 2024-12-23 a Monday
+    matrix = engine.open_matrix([
+        datetime(2024, 12, 22, 23, 0),
+        datetime(2024, 12, 23, 0, 30),
+        datetime(2024, 12, 23, 12, 0),
+    ])
+    assert matrix.shape == (3, 2)
+    assert matrix.tolist() == [[False, True], [False, True], [False, False]]
+
+
+def test_batch_empty_inputs():
+    assert BatchEngine({}).open_matrix([datetime(2024, 12, 16)]).shape == (1, 0)
+    assert BatchEngine({"A": parse_hours("Mon 9 am - 5 pm")}).open_counts([]).tolist() == []
+
+
+def test_counts_are_chunked_without_matrix(monkeypatch):
+    engine = BatchEngine(load_data("app/restaurants.db"))
+    start = datetime(2024, 12, 16)
+    query_dts = [start + timedelta(minutes=7 * i) for i in range(1000)]
+    expected = engine.open_matrix(query_dts).sum(axis=1)
+
+    # Forces a chunk of one timestamp, and fails if the full matrix is requested
+    monkeypatch.setattr(batch_engine, "CHUNK_CELLS", 1)
+    monkeypatch.setattr(BatchEngine, "open_matrix", None)
+    counts = engine.open_counts(query_dts)
+    assert counts.dtype == np.int32
+    assert counts.tolist() == expected.tolist()
+
+
+def test_names_are_chunked_without_matrix(monkeypatch):
+    engine = BatchEngine(load_data("app/restaurants.db"))
+    start = datetime(2024, 12, 16)
+    query_dts = [start + timedelta(minutes=7 * i) for i in range(1000)]
+    expected = [[engine.names[j] for j in np.flatnonzero(row)] for row in engine.open_matrix(query_dts)]
+
+    monkeypatch.setattr(batch_engine, "CHUNK_CELLS", 1)
+    monkeypatch.setattr(BatchEngine, "open_matrix", None)
+    assert engine.open_names(query_dts) == expected
@@ -0,0 +1,31 @@
+# test_benchmarks.py
+
+import json
+from benchmarks import bench_suite
+from benchmarks.synthetic import iter_catalog
+from app.data_handler import parse_hours
+from app.schedule_index import MINUTES_PER_DAY, schedule_to_intervals
+
+
+def test_synthetic_hours_parse_with_realistic_shapes():
+    hours = [hours for _, hours, _ in iter_catalog(3000, seed=1, unique_ratio=0.5)]
+    intervals = [schedule_to_intervals(parse_hours(h)) for h in hours]
+    assert all(intervals)
+    assert any(" / " in h for h in hours)
+    # Overnight hours split at midnight
+    assert any(any(start % MINUTES_PER_DAY == 0 for start, _ in i) for i in intervals)
+    # Day ranges that wrap past Sunday, e.g. "Fri-Mon"
+    assert any(h.startswith(("Thu-M", "Fri-M", "Sat-M", "Sun-M", "Fri-Tue", "Sat-T", "Sun-T")) for h in hours)
+
+
+def test_suite_writes_results(tmp_path):
+    output = tmp_path / "results.json"
+    bench_suite.main([
+        "--sizes", "300", "--requests", "5", "--workdir", str(tmp_path), "--output", str(output),
+    ])
+    report = json.loads(output.read_text())
+    result = report["results"][0]
+    assert result["restaurants"] == 300
+    assert set(result["startup"]) == set(bench_suite.STARTUP_MODES)
+    assert result["startup"]["snapshot"]["restaurants"] == 300
+    assert result["endpoints"]["open_restaurants_cold"]["count"] == 5
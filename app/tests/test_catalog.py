@@ -0,0 +1,224 @@
+# test_catalog.py
+
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta
+import numpy as np
+from csv_to_sqlite import PRUNE_CHANGES, ensure_schema
+from app.catalog import Catalog, CatalogStore, HoursOverlay
+from app.data_handler import iter_restaurant_rows, latest_change, read_changes
+
+
+def make_db(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE restaurants (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        hours TEXT NOT NULL
+        )
+    """)
+    conn.executemany("INSERT INTO restaurants (name, hours) VALUES (?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_from_rows_reuses_unchanged_schedules():
+    first, parsed = Catalog.from_rows([("A", "Mon 9 am - 5 pm", None, None, None), ("B", "Tue 9 am - 5 pm", None, None, None)])
+    assert parsed == 2
+    second, parsed = Catalog.from_rows(
+        [("A", "Mon 9 am - 5 pm", None, None, None), ("B", "Tue 10 am - 5 pm", None, None, None), ("C", "Wed 9 am - 5 pm", None, None, None)],
+        previous=first,
+    )
+    assert parsed == 2
+    assert second.version == first.version + 1
+    assert second.restaurants["A"] is first.restaurants["A"]
+    assert second.restaurants["B"] is not first.restaurants["B"]
+
+
+def test_store_reloads_only_on_change(tmp_path):
+    db_path = str(tmp_path / "restaurants.db")
+    make_db(db_path, [("A", "Mon 9 am - 5 pm"), ("B", "Mon 6 pm - 10 pm")])
+    store = CatalogStore(db_path)
+    before = store.current
+    # 2024-12-16 is a Monday
+    assert before.index.open_at(datetime(2024, 12, 16, 12, 0)) == ["A"]
+
+    assert store.reload() is False
+    assert store.current is before
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET hours = ? WHERE name = ?", ("Mon 11 am - 1 pm", "B"))
+    conn.execute("DELETE FROM restaurants WHERE name = ?", ("A",))
+    conn.commit()
+    conn.close()
+
+    assert store.reload() is True
+    after = store.current
+    assert after.version == before.version + 1
+    assert after.index.open_at(datetime(2024, 12, 16, 12, 0)) == ["B"]
+    # The old snapshot is untouched for requests still holding it
+    assert before.index.open_at(datetime(2024, 12, 16, 12, 0)) == ["A"]
+
+
+def test_store_missing_database(tmp_path):
+    store = CatalogStore(str(tmp_path / "missing.db"))
+    assert len(store.current) == 0
+
+
+def make_logged_db(path, rows):
+    conn = sqlite3.connect(path)
+    ensure_schema(conn)
+    conn.executemany("INSERT INTO restaurants (name, hours, timezone) VALUES (?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+
+def test_store_applies_logged_changes_only(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "restaurants.db")
+    make_logged_db(db_path, [
+        ("A", "Mon 9 am - 5 pm", None),
+        ("B", "Mon 6 pm - 10 pm", None),
+        ("C", "Tue 9 am - 5 pm", "Europe/Berlin"),
+        ("D", "Wed 9 am - 5 pm", None),
+    ])
+    store = CatalogStore(db_path)
+    store.current.occupancy
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET hours = 'Mon 11 am - 1 pm' WHERE name = 'B'")
+    conn.execute("UPDATE restaurants SET timezone = 'Asia/Tokyo' WHERE name = 'C'")
+    conn.execute("UPDATE restaurants SET name = 'D2' WHERE name = 'D'")
+    conn.execute("DELETE FROM restaurants WHERE name = 'A'")
+    conn.execute("INSERT INTO restaurants (name, hours) VALUES ('E', 'Mon 12 pm - 2 pm')")
+    conn.commit()
+    conn.close()
+
+    def full_scan(*args, **kwargs):
+        raise AssertionError("reload read the whole table")
+
+    monkeypatch.setattr("app.catalog.iter_restaurant_rows", full_scan)
+    assert store.reload() is True
+    patched = store.current
+    monkeypatch.undo()
+
+    full, _ = Catalog.from_rows(iter_restaurant_rows(db_path, include_stored=True))
+    assert list(patched.restaurants) == list(full.restaurants) == ["B", "C", "D2", "E"]
+    assert dict(patched.hours) == dict(full.hours)
+    assert [patched.zone_of(i) for i in range(len(patched))] == [full.zone_of(i) for i in range(len(full))]
+    assert np.array_equal(patched.occupancy.counts, full.occupancy.counts)
+    assert patched.index.open_at(datetime(2024, 12, 16, 12, 0)) == ["B", "E"]
+    for point in range(0, 7 * 24 * 60, 30):
+        assert patched.index.open_ids(point) == full.index.open_ids(point)
+    moments = [datetime(2024, 12, 16) + timedelta(hours=h) for h in range(0, 7 * 24, 3)]
+    assert patched.batch.open_names(moments) == full.batch.open_names(moments)
+    assert patched.restaurants["D2"]["wed"]
+
+    # A cuisine edit is not logged, so nothing is published
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET cuisine = 'Thai' WHERE name = 'E'")
+    conn.commit()
+    conn.close()
+    assert store.reload() is False
+    assert store.current is patched
+
+
+def test_repeated_patches_match_full_builds():
+    rows = {f"R{i}": f"Mon {i % 12 + 1} am - 11 pm" for i in range(100)}
+    catalog, _ = Catalog.from_rows((name, hours, None, None, None) for name, hours in rows.items())
+    rebuilt = False
+    for step in range(60):
+        changed = {f"R{step}": "Tue 9 am - 5 pm", f"New{step}": "Wed 9 am - 5 pm"}
+        deleted = [f"R{99 - step}"]
+        rows.update(changed)
+        rows.pop(deleted[0])
+        catalog, _ = catalog.patched([(name, hours, None, None, None) for name, hours in changed.items()], deleted)
+        rebuilt = rebuilt or catalog.index.patched_count == 0
+        if step == 0:
+            # A small delta is layered over the previous mapping rather than copying it
+            assert isinstance(catalog.hours, HoursOverlay)
+
+    full, _ = Catalog.from_rows((name, hours, None, None, None) for name, hours in rows.items())
+    assert dict(catalog.hours) == dict(full.hours) == rows
+    assert len(catalog.hours) == len(rows)
+    assert "R99" not in catalog.hours and catalog.hours.get("New59") == "Wed 9 am - 5 pm"
+    # Patches eventually make up enough of the index that it is rebuilt balanced
+    assert rebuilt
+    for point in range(0, 7 * 24 * 60, 30):
+        assert {catalog.index.names[i] for i in catalog.index.open_ids(point)} == {
+            full.index.names[i] for i in full.index.open_ids(point)
+        }
+
+
+def test_store_reads_every_row_when_log_was_pruned(tmp_path):
+    db_path = str(tmp_path / "restaurants.db")
+    make_logged_db(db_path, [("A", "Mon 9 am - 5 pm", None)])
+    store = CatalogStore(db_path)
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("INSERT INTO restaurants (name, hours) VALUES ('B', 'Mon 9 am - 5 pm')")
+    conn.execute("INSERT INTO restaurants (name, hours) VALUES ('C', 'Mon 9 am - 5 pm')")
+    # Keeps only the entry for C, dropping B's, which the store has not seen yet
+    conn.execute(PRUNE_CHANGES, (1,))
+    conn.commit()
+    conn.close()
+    assert read_changes(db_path, (latest_change(db_path)[0], 1)) is None
+
+    assert store.reload() is True
+    assert list(store.current.restaurants) == ["A", "B", "C"]
+
+
+def test_store_reads_every_row_from_a_recreated_database(tmp_path):
+    db_path = str(tmp_path / "restaurants.db")
+    make_logged_db(db_path, [("A", "Mon 9 am - 5 pm", None), ("B", "Mon 9 am - 5 pm", None)])
+    store = CatalogStore(db_path)
+
+    # A fresh database restarts the log at 1, so its sequence numbers overlap the old ones
+    replacement = str(tmp_path / "replacement.db")
+    make_logged_db(replacement, [("X", "Mon 9 am - 5 pm", None), ("Y", "Mon 9 am - 5 pm", None)])
+    shutil.copyfile(replacement, db_path)
+    assert store.reload() is True
+    assert list(store.current.restaurants) == ["X", "Y"]
+
+    os.remove(replacement)
+    make_logged_db(replacement, [("P", "Mon 9 am - 5 pm", None), ("Q", "Mon 9 am - 5 pm", None), ("R", "Mon 9 am - 5 pm", None)])
+    os.replace(replacement, db_path)
+    assert store.reload() is True
+    assert list(store.current.restaurants) == ["P", "Q", "R"]
+
+
+def test_polling_survives_a_failing_reload(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "restaurants.db")
+    make_logged_db(db_path, [("A", "Mon 9 am - 5 pm", None)])
+    store = CatalogStore(db_path)
+    patched = Catalog.patched
+    failures = []
+
+    def fail_once(self, rows, deleted):
+        if not failures:
+            failures.append(rows)
+            raise RuntimeError("broken reload")
+        return patched(self, rows, deleted)
+
+    def wait_for(condition):
+        deadline = time.monotonic() + 5
+        while not condition() and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert condition()
+
+    monkeypatch.setattr(Catalog, "patched", fail_once)
+    store.start_polling(0.01)
+    try:
+        conn = sqlite3.connect(db_path)
+        conn.execute("INSERT INTO restaurants (name, hours) VALUES ('B', 'Mon 9 am - 5 pm')")
+        conn.commit()
+        wait_for(lambda: failures)
+        conn.execute("INSERT INTO restaurants (name, hours) VALUES ('C', 'Mon 9 am - 5 pm')")
+        conn.commit()
+        conn.close()
+        wait_for(lambda: "C" in store.current.hours)
+    finally:
+        store.stop_polling()
+    assert list(store.current.restaurants) == ["A", "B", "C"]
@@ -0,0 +1,94 @@
+# test_compact_schedule.py
+
+import numpy as np
+import pytest
+from app.catalog import Catalog
+from app.compact_schedule import CompactScheduleBuilder, CompactSchedules
+from app.data_handler import load_data, parse_hours
+from app.schedule_index import catalog_intervals, encode_intervals, schedule_to_intervals
+
+
+def test_compatibility_view_matches_parse_hours():
+    restaurants = load_data("app/restaurants.db")
+    compact = CompactSchedules.from_mapping(restaurants)
+    assert list(compact) == list(restaurants)
+    assert len(compact) == len(restaurants)
+    for name, schedule in restaurants.items():
+        assert name in compact
+        # Same ranges per day, in start order
+        assert {d: sorted(r) for d, r in compact[name].items()} == {d: sorted(r) for d, r in schedule.items()}
+
+    starts, ends, owners = compact.interval_arrays()
+    expected = catalog_intervals(restaurants)
+    assert (starts == expected[0]).all() and (ends == expected[1]).all() and (owners == expected[2]).all()
+
+
+def test_identical_hours_share_pool_entries():
+    builder = CompactScheduleBuilder()
+    chain = encode_intervals(schedule_to_intervals(parse_hours("Mon-Fri 11 am - 10 pm / Sat 5 pm - 2 am")))
+    for i in range(1000):
+        builder.add(f"Chain {i}", chain)
+    builder.add("Solo", encode_intervals([(0, 60)]))
+    compact = builder.build()
+
+    assert len(compact.starts) == len(chain) // 4 + 1
+    assert compact.counts[0] == len(chain) // 4
+    assert compact["Chain 0"] is compact["Chain 999"]
+    assert compact.blob(1000) == encode_intervals([(0, 60)])
+
+    with pytest.raises(ValueError):
+        builder.add("Broken", b"\x01\x02\x03")
+    assert "Broken" not in builder.names
+
+
+def test_catalog_reload_reuses_stored_pool():
+    rows = [("A", "Mon 9 am - 5 pm", None, None, None), ("B", "Tue 9 am - 5 pm", None, None, None)]
+    catalog, parsed = Catalog.from_rows(rows)
+    assert isinstance(catalog.restaurants, CompactSchedules)
+    assert parsed == 2
+
+    rows[1] = ("B", "Wed 9 am - 5 pm", None, None, None)
+    reloaded, parsed = Catalog.from_rows(rows, previous=catalog)
+    assert parsed == 1
+    assert reloaded.restaurants["A"] is catalog.restaurants["A"]
+    assert reloaded.restaurants["B"]["wed"] and not reloaded.restaurants["B"]["tue"]
+    assert np.array_equal(reloaded.batch.owners, [0, 1])
+
+
+def test_spliced_reuses_pool_and_compacts(monkeypatch):
+    monkeypatch.setattr("app.compact_schedule.COMPACT_MIN_ENTRIES", 0)
+    mon = encode_intervals([(0, 60), (100, 200)])
+    tue = encode_intervals([(1440, 1500)])
+    builder = CompactScheduleBuilder()
+    for name in ("A", "B", "C"):
+        builder.add(name, mon)
+    schedules = builder.build()
+
+    delta = CompactScheduleBuilder()
+    delta.add("B", tue)
+    delta.add("D", tue)
+    keep = np.array([False, True, True])
+    spliced = schedules.spliced(keep, [1, -1], delta.build())
+    assert spliced.names == ["B", "C", "D"]
+    assert [spliced.blob(i) for i in range(3)] == [tue, mon, tue]
+    # C still points at the original entries; the delta adds one pool entry
+    assert len(spliced.starts) == 3
+
+    delta = CompactScheduleBuilder()
+    delta.add("C", tue)
+    delta.add("E", encode_intervals([(2880, 2940)]))
+    spliced = spliced.spliced(np.ones(3, dtype=bool), [1, -1], delta.build())
+    assert spliced.names == ["B", "C", "D", "E"]
+    assert [spliced.blob(i) for i in range(3)] == [tue, tue, tue]
+    # Monday's two dead entries do not outnumber the three live ones yet
+    assert len(spliced.starts) == 5
+
+    compacted = spliced.compacted()
+    assert len(compacted.starts) == 3
+    assert [compacted.blob(i) for i in range(4)] == [spliced.blob(i) for i in range(4)]
+
+    # Dropping B, C and D leaves mostly dead entries, so the splice compacts
+    only_e = spliced.spliced(np.array([False, False, False, True]), [], CompactScheduleBuilder().build())
+    assert only_e.names == ["E"]
+    assert len(only_e.starts) == 1
+    assert only_e.blob(0) == encode_intervals([(2880, 2940)])
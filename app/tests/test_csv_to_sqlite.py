@@ -0,0 +1,173 @@
+# test_csv_to_sqlite.py
+
+import sqlite3
+import logging
+from csv_to_sqlite import ensure_schema, ingest
+from app.catalog import Catalog, CatalogStore
+from app.data_handler import iter_restaurant_rows, parse_hours, load_data
+from app.schedule_index import decode_intervals, hours_digest, schedule_to_intervals
+
+
+def write_csv(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('"Restaurant Name","Hours"\n')
+        for name, hours in rows:
+            f.write(f'"{name}","{hours}"\n')
+
+
+def test_ingest_sample_csv(tmp_path):
+    db_path = str(tmp_path / "restaurants.db")
+    stats = ingest("data/restaurants.csv", db_path)
+    assert stats["written"] > 0
+    assert stats["invalid"] == 0
+
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT name, hours, intervals FROM restaurants").fetchall()
+    conn.close()
+    assert len(rows) == stats["written"]
+    for name, hours, blob in rows:
+        assert decode_intervals(blob) == schedule_to_intervals(parse_hours(hours)), name
+
+    # Same restaurants the server loads from the shipped database
+    assert set(load_data(db_path)) == set(load_data("app/restaurants.db"))
+
+
+def test_ingest_upserts_and_skips_invalid(tmp_path):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    write_csv(csv_path, [
+        ("A", "Mon 9 am - 5 pm"),
+        ("B", "Mon-Fri"),
+        ("", "Tue 9 am - 5 pm"),
+        # Valid on weekdays, but Saturday would be dropped
+        ("C", "Mon-Fri 11 am - 10 pm / Sat 13 am - 5 pm"),
+    ])
+    stats = ingest(csv_path, db_path, batch_size=1)
+    assert (stats["written"], stats["invalid"], stats["incomplete"]) == (1, 2, 1)
+    assert set(load_data(db_path)) == {"A"}
+
+    write_csv(csv_path, [("A", "Tue 9 am - 5 pm")])
+    ingest(csv_path, db_path)
+    assert load_data(db_path)["A"]["tue"] != []
+
+
+def test_reimport_leaves_unchanged_rows_alone(tmp_path):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    write_csv(csv_path, [("A", "Mon 9 am - 5 pm"), ("B", "Tue 9 am - 5 pm")])
+    ingest(csv_path, db_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE updated (name TEXT)")
+    conn.execute("CREATE TRIGGER record_update AFTER UPDATE ON restaurants BEGIN INSERT INTO updated VALUES (NEW.name); END")
+    conn.commit()
+
+    ingest(csv_path, db_path)
+    assert conn.execute("SELECT name FROM updated").fetchall() == []
+
+    write_csv(csv_path, [("A", "Mon 9 am - 5 pm"), ("B", "Wed 9 am - 5 pm")])
+    ingest(csv_path, db_path)
+    assert conn.execute("SELECT name FROM updated").fetchall() == [("B",)]
+    conn.close()
+
+
+def test_catalog_uses_stored_intervals(tmp_path, caplog):
+    db_path = str(tmp_path / "restaurants.db")
+    ingest("data/restaurants.csv", db_path)
+    with caplog.at_level(logging.INFO, logger="app.catalog"):
+        store = CatalogStore(db_path)
+    assert "0 hours strings parsed" in caplog.text
+    for name, schedule in load_data(db_path).items():
+        assert schedule_to_intervals(store.current.restaurants[name]) == schedule_to_intervals(schedule)
+
+    # Editing hours without recomputing intervals leaves a blob the hash no longer vouches for
+    conn = sqlite3.connect(db_path)
+    name = conn.execute("SELECT name FROM restaurants WHERE id = 1").fetchone()[0]
+    conn.execute("UPDATE restaurants SET hours = 'Mon 1 am - 2 am' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    with caplog.at_level(logging.INFO, logger="app.catalog"):
+        assert store.reload() is True
+    assert "1 hours strings parsed" in caplog.text
+    assert schedule_to_intervals(store.current.restaurants[name]) == schedule_to_intervals(parse_hours("Mon 1 am - 2 am"))
+
+
+def test_rewritten_hours_keep_recomputed_intervals(tmp_path):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    write_csv(csv_path, [("A", "Mon 9 am - 5 pm")])
+    ingest(csv_path, db_path)
+    # Different text, same intervals: the freshly written blob must survive
+    write_csv(csv_path, [("A", "Monday 9 am - 5 pm")])
+    ingest(csv_path, db_path)
+
+    conn = sqlite3.connect(db_path)
+    hours, blob, hours_hash = conn.execute("SELECT hours, intervals, hours_hash FROM restaurants").fetchone()
+    conn.close()
+    assert hours == "Monday 9 am - 5 pm"
+    assert hours_hash == hours_digest(hours)
+    assert decode_intervals(blob) == schedule_to_intervals(parse_hours(hours))
+    catalog, parsed = Catalog.from_rows(iter_restaurant_rows(db_path, include_stored=True))
+    assert parsed == 0
+    assert catalog.restaurants["A"]["mon"]
+
+
+def test_ingest_timezone_column(tmp_path):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write('"Restaurant Name","Hours","Timezone"\n')
+        f.write('"A","Mon 9 am - 5 pm","America/New_York"\n')
+        f.write('"B","Mon 9 am - 5 pm",""\n')
+        f.write('"C","Mon 9 am - 5 pm","Nowhere/Special"\n')
+    stats = ingest(csv_path, db_path)
+    assert (stats["written"], stats["invalid"]) == (2, 1)
+
+    catalog = CatalogStore(db_path).current
+    assert catalog.zone_of(catalog.ids["A"]) == "America/New_York"
+    assert catalog.zone_of(catalog.ids["B"]) is None
+
+
+def test_ingest_maintains_search_index(tmp_path):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write('"Restaurant Name","Hours","Cuisine","Tags"\n')
+        f.write('"Umi","Mon 9 am - 5 pm","Japanese","sushi, late night"\n')
+        f.write('"Crêperie","Mon 9 am - 5 pm","French",""\n')
+    ingest(csv_path, db_path)
+
+    def search(query):
+        conn = sqlite3.connect(db_path)
+        rows = conn.execute(
+            "SELECT r.name FROM restaurants_fts JOIN restaurants r ON r.id = restaurants_fts.rowid "
+            "WHERE restaurants_fts MATCH ? ORDER BY r.name", (query,)
+        ).fetchall()
+        conn.close()
+        return [row[0] for row in rows]
+
+    assert search("sushi") == ["Umi"]
+    assert search("creperie") == ["Crêperie"]
+
+    # Re-importing updates the index through the upsert
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write('"Restaurant Name","Hours","Cuisine"\n')
+        f.write('"Umi","Mon 9 am - 5 pm","Ramen"\n')
+    ingest(csv_path, db_path)
+    assert search("sushi") == []
+    assert search("ramen") == ["Umi"]
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("DELETE FROM restaurants WHERE name = 'Umi'")
+    conn.commit()
+    conn.close()
+    assert search("ramen") == []
+
+
+def test_ensure_schema_indexes_existing_rows(tmp_path):
+    db_path = str(tmp_path / "restaurants.db")
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE restaurants (id INTEGER PRIMARY KEY AUTOINCREMENT, name TEXT NOT NULL UNIQUE, hours TEXT NOT NULL)")
+    conn.execute("INSERT INTO restaurants (name, hours) VALUES ('Old Sushi House', 'Mon 9 am - 5 pm')")
+    ensure_schema(conn)
+    assert conn.execute("SELECT rowid FROM restaurants_fts WHERE restaurants_fts MATCH 'sushi'").fetchall() == [(1,)]
+    conn.close()
@@ -0,0 +1,52 @@
+# test_db.py
+
+import asyncio
+import sqlite3
+import pytest
+from app.db import ConnectionPool
+
+
+@pytest.fixture
+def pool(db_path):
+    pool = ConnectionPool(db_path, size=2)
+    yield pool
+    pool.close()
+
+
+def test_pool_is_read_only_and_bounded(pool):
+    with pytest.raises(sqlite3.OperationalError):
+        pool.execute("DELETE FROM restaurants")
+
+    first, second = pool.acquire(), pool.acquire()
+    with pytest.raises(Exception):
+        pool.acquire(timeout=0.05)
+    pool.release(first)
+    assert pool.acquire(timeout=0.05) is first
+    pool.release(first)
+    pool.release(second)
+
+
+def test_concurrent_async_queries(pool):
+    async def run():
+        names = [row[0] for row in await pool.fetch_all("SELECT name FROM restaurants")]
+        rows = await asyncio.gather(*[
+            pool.fetch_one("SELECT name, hours FROM restaurants WHERE name = ?", (name,))
+            for name in names
+        ])
+        return names, rows
+
+    names, rows = asyncio.run(run())
+    assert [row[0] for row in rows] == names
+
+
+def test_iter_rows_streams_while_pool_is_busy(pool):
+    async def run():
+        streamed = []
+        async for row in pool.iter_rows("SELECT name FROM restaurants ORDER BY id", batch_size=7):
+            streamed.append(row[0])
+            # Other queries still get the pool's remaining connection
+            await pool.fetch_one("SELECT 1")
+        return streamed
+
+    streamed = asyncio.run(run())
+    assert streamed == [row[0] for row in pool.execute("SELECT name FROM restaurants ORDER BY id")]
@@ -0,0 +1,67 @@
+# test_generations.py
+
+import os
+import sqlite3
+from datetime import datetime
+from app.generations import (
+    KEEP_GENERATIONS,
+    GenerationPublisher,
+    GenerationStore,
+    generation_path,
+    publish_generation,
+    read_pointer,
+)
+
+
+def test_publish_and_follow_generations(tmp_path, make_catalog):
+    directory = str(tmp_path / "generations")
+    assert read_pointer(directory) is None
+
+    first = make_catalog([("Cafe", "Mon 9 am - 5 pm")])
+    publish_generation(first, directory, 1)
+    store = GenerationStore(directory)
+    assert store.generation == 1
+    assert store.current.version == 1
+    assert store.current.index.open_at(datetime(2024, 12, 16, 10)) == ["Cafe"]
+    assert not store.current.batch.starts.flags.writeable
+    assert store.reload() is False
+
+    second = make_catalog([("Cafe", "Mon 9 am - 5 pm"), ("Diner", "Mon 8 am - 11 am")])
+    publish_generation(second, directory, 2)
+    assert store.reload() is True
+    assert store.current.version == 2
+    assert store.current.index.open_at(datetime(2024, 12, 16, 10)) == ["Cafe", "Diner"]
+
+
+def test_old_generations_are_pruned(tmp_path, make_catalog):
+    directory = str(tmp_path / "generations")
+    catalog = make_catalog([("Cafe", "Mon 9 am - 5 pm")])
+    last = KEEP_GENERATIONS + 2
+    for generation in range(1, last + 1):
+        publish_generation(catalog, directory, generation)
+
+    assert read_pointer(directory) == last
+    kept = [g for g in range(1, last + 1) if os.path.exists(generation_path(directory, g))]
+    assert kept == list(range(last - KEEP_GENERATIONS + 1, last + 1))
+
+
+def test_publisher_publishes_database_changes(tmp_path, db_path):
+    directory = str(tmp_path / "generations")
+    publisher = GenerationPublisher(db_path, directory)
+    store = GenerationStore(directory)
+    assert store.generation == publisher.generation == 1
+    assert len(store.current) == len(publisher.store.current)
+    assert publisher.reload() is False
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET hours = 'Mon 1 am - 2 am' WHERE name = 'Caffe Luna'")
+    conn.commit()
+    conn.close()
+    assert publisher.reload() is True
+    assert store.reload() is True
+    assert store.current.version == 2
+    # 2024-12-16 is a Monday
+    assert "Caffe Luna" in store.current.index.open_at(datetime(2024, 12, 16, 1, 30))
+
+    # A restarted parent continues the numbering
+    assert GenerationPublisher(db_path, directory).generation == 3
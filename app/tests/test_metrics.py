@@ -0,0 +1,137 @@
+# test_metrics.py
+
+import os
+import threading
+import time
+from fastapi.testclient import TestClient
+from app import main
+from app.data_handler import _parse_hours_uncached
+from app.metrics import PARSE_FAILURES, Counter, Gauge, Histogram, Registry, SharedMetrics
+from app.profiler import SamplingProfiler
+
+client = TestClient(main.app)
+
+
+def test_text_format():
+    registry = Registry()
+    requests = Counter("x_requests_total", "Requests.", ("route",), registry=registry)
+    size = Gauge("x_size", "Size.", registry=registry)
+    latency = Histogram("x_seconds", "Latency.", ("stage",), buckets=(0.1, 1.0), registry=registry)
+
+    requests.labels('/a"b').inc()
+    requests.labels('/a"b').inc(2)
+    size.set(42)
+    stage = latency.labels("parse")
+    stage.observe(0.05)
+    stage.observe(0.1)
+    stage.observe(5)
+
+    text = registry.render()
+    assert '# TYPE x_requests_total counter' in text
+    assert 'x_requests_total{route="/a\\"b"} 3' in text
+    assert "x_size 42" in text
+    assert 'x_seconds_bucket{stage="parse",le="0.1"} 2' in text
+    assert 'x_seconds_bucket{stage="parse",le="1.0"} 2' in text
+    assert 'x_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'x_seconds_count{stage="parse"} 3' in text
+
+
+def test_shared_metrics_merge_workers(tmp_path):
+    directory = str(tmp_path / "metrics")
+    workers = []
+    for worker, count in (("101", 2), ("202", 5)):
+        registry = Registry()
+        Counter("x_requests_total", "Requests.", ("route",), registry=registry).labels("/a").inc(count)
+        Histogram("x_seconds", "Latency.", buckets=(1.0,), registry=registry).observe(0.5)
+        shared = SharedMetrics(directory, registry=registry)
+        shared.worker, shared.path = worker, str(tmp_path / "metrics" / f"worker-{worker}.json")
+        shared.write()
+        workers.append(shared)
+
+    text = workers[0].render()
+    assert text.count("# TYPE x_requests_total counter") == 1
+    assert 'x_requests_total{route="/a",worker="101"} 2' in text
+    assert 'x_requests_total{route="/a",worker="202"} 5' in text
+    assert 'x_seconds_bucket{worker="202",le="1.0"} 1' in text
+
+    # An exited worker's file is dropped once it goes stale
+    os.utime(workers[1].path, (0, 0))
+    assert 'worker="202"' not in workers[0].render()
+    workers[0].stop()
+    assert not os.path.exists(workers[0].path)
+
+
+def test_parse_failures_counted_per_row(make_catalog):
+    def count(reason):
+        return PARSE_FAILURES.labels(reason).value
+
+    reasons = ("no_time", "invalid_days", "invalid_time_range", "invalid_time")
+    assert _parse_hours_uncached("Mon 13 am - 5 pm / Tue 9 am - 5 pm")[1] == ("invalid_time",)
+
+    before = {reason: count(reason) for reason in reasons}
+    bad_hours = ["Mon-Fri closed", "Funday 9 am - 5 pm", "Mon 9 am to 5 pm", "Mon 13 am - 5 pm / Tue 9 am - 5 pm"]
+    # Two rows per hours string: both count, though each string is parsed once
+    make_catalog([(f"{hours} {copy}", hours) for hours in bad_hours for copy in range(2)])
+    for reason, value in before.items():
+        assert count(reason) == value + 2, reason
+
+
+def test_metrics_endpoint():
+    # Catalog gauges describe the most recently loaded catalog in the process
+    main.catalog_store.reload(force=True)
+    client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00"})
+    client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00", "format": "ndjson"})
+    client.get("/restaurants/Caffe Luna/next_change", params={"datetime_str": "2024-12-13T13:30:00"})
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = response.text
+    assert 'open_bites_request_duration_seconds_count{method="GET",route="/open_restaurants/",status="200"}' in text
+    # Routes are labelled by template, not by the raw path
+    assert 'route="/restaurants/{name}/next_change"' in text
+    assert "Caffe Luna" not in text
+    for stage in ("parse_datetime", "lookup", "serialize", "stream"):
+        assert f'open_bites_stage_duration_seconds_count{{route="/open_restaurants/",stage="{stage}"}}' in text
+    assert f"open_bites_catalog_restaurants {len(main.catalog_store.current)}" in text
+
+
+def busy(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_sampling_profiler_folds_busy_stacks():
+    profiler = SamplingProfiler()
+    stop = threading.Event()
+    worker = threading.Thread(target=busy, args=(stop,))
+    worker.start()
+    try:
+        for _ in range(20):
+            profiler.sample(exclude=threading.get_ident())
+            time.sleep(0.001)
+    finally:
+        stop.set()
+        worker.join()
+
+    folded = profiler.folded()
+    assert profiler.samples == 20
+    line = next(line for line in folded.splitlines() if "busy (test_metrics.py" in line)
+    stack, count = line.rsplit(" ", 1)
+    assert stack.split(";")[-1].startswith("busy (") and int(count) > 0
+
+
+def test_profiler_endpoints(monkeypatch):
+    assert client.post("/debug/profiler/start").status_code == 404
+
+    monkeypatch.setattr(main, "PROFILER_ENABLED", True)
+    try:
+        assert client.post("/debug/profiler/start", params={"interval_ms": 1}).json()["running"]
+        for _ in range(20):
+            client.post("/open_restaurants/batch", json={"datetimes": ["2024-12-13T13:30:00"] * 500})
+        assert client.post("/debug/profiler/stop").json()["running"] is False
+    finally:
+        main.profiler.stop()
+    assert main.profiler.active_requests == 0
+    response = client.get("/debug/profiler")
+    assert response.status_code == 200
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in response.text.splitlines())
@@ -0,0 +1,81 @@
+# test_occupancy.py
+
+from datetime import datetime, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.catalog import Catalog
+from app.data_handler import load_data
+from app.occupancy import WeeklyOccupancy, parse_resolution
+
+client = TestClient(app)
+
+WEEK_START = datetime(2024, 12, 16)
+
+
+def test_counts_match_batch_engine():
+    catalog = Catalog(load_data("app/restaurants.db"), {})
+    query_dts = [WEEK_START + timedelta(minutes=m) for m in range(7 * 24 * 60)]
+    assert (catalog.occupancy.counts == catalog.batch.open_counts(query_dts)).all()
+
+
+def test_overlapping_and_shared_hours_counted_once(make_catalog):
+    catalog = make_catalog([
+        ("A", "Mon 9 am - 5 pm / Mon 12 pm - 8 pm"),
+        ("B", "Mon 9 am - 5 pm"),
+        ("C", "Mon 9 am - 5 pm"),
+    ])
+    counts = catalog.occupancy.counts
+    assert counts[9 * 60] == 3
+    assert counts[18 * 60] == 1
+    assert counts[21 * 60] == 0
+    assert counts.max() == 3
+
+
+def test_reload_updates_occupancy_incrementally(make_catalog):
+    before = make_catalog([("A", "Mon 9 am - 5 pm"), ("B", "Tue 9 am - 5 pm"), ("C", "Wed 9 am - 5 pm")])
+    after = make_catalog([("A", "Mon 9 am - 5 pm"), ("C", "Thu 9 am - 5 pm"), ("D", "Mon 10 am - 11 am")], previous=before)
+    rebuilt = WeeklyOccupancy.from_schedules(after.restaurants)
+    assert (after.occupancy.counts == rebuilt.counts).all()
+    assert (after.occupancy.diff == rebuilt.diff).all()
+
+
+def test_restaurants_without_intervals(make_catalog):
+    catalog = make_catalog([("A", "Mon-Fri")])
+    assert catalog.occupancy.counts.max() == 0
+
+    catalog = make_catalog([("A", "Mon-Fri"), ("B", "Mon 9 am - 5 pm")])
+    patched, _ = catalog.patched([("A", "Closed", None, None, None)], [])
+    patched, _ = patched.patched([], ["A"])
+    rebuilt = WeeklyOccupancy.from_schedules(patched.restaurants)
+    assert (patched.occupancy.diff == rebuilt.diff).all()
+    assert patched.occupancy.counts[9 * 60] == 1
+
+
+def test_buckets_and_resolution(make_catalog):
+    catalog = make_catalog([("A", "Mon 9 am - 9:30 am")])
+    starts, mins, maxes, means = catalog.occupancy.buckets(60)
+    assert len(starts) == 7 * 24
+    assert (mins[9], maxes[9]) == (0, 1)
+    assert means[9] == pytest.approx(31 / 60)
+    assert maxes.sum() == 1
+
+    assert [parse_resolution(r) for r in ("15m", "1h", "30")] == [15, 60, 30]
+    with pytest.raises(ValueError):
+        parse_resolution("soon")
+    with pytest.raises(ValueError):
+        catalog.occupancy.buckets(7)
+
+
+def test_open_counts_endpoint():
+    response = client.get("/stats/open_counts", params={"resolution": "15m"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["resolution_minutes"] == 15
+    assert len(body["buckets"]) == 7 * 24 * 4
+    friday = next(b for b in body["buckets"] if (b["day"], b["time"]) == ("fri", "13:30"))
+    open_now = client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T13:30:00"}).json()
+    assert friday["open_min"] <= len(open_now["open_restaurants"]) <= friday["open_max"]
+
+    assert client.get("/stats/open_counts", params={"resolution": "7m"}).status_code == 400
+    assert client.get("/stats/open_counts", params={"resolution": "lots"}).status_code == 400
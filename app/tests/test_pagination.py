@@ -0,0 +1,78 @@
+# test_pagination.py
+
+import json
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.pagination import decode_cursor, encode_cursor, iter_ndjson, paginate
+from app.response_cache import encode_names, render_open_ids, render_open_restaurants
+
+client = TestClient(app)
+
+OPEN_AT = {"datetime_str": "2024-12-13T13:30:00"}
+
+
+def test_render_open_ids_matches_json_encoder():
+    names = ['Caffe "Luna"', "Café Ñandú", "Back\\slash", "😀 Emoji", "Plain"]
+    encoded = encode_names(names)
+    ids = np.array([0, 1, 2, 3, 4], dtype=np.int32)
+    assert render_open_ids(encoded, ids) == render_open_restaurants(names)
+    assert render_open_ids(encoded, ids[:0]) == render_open_restaurants([])
+    assert json.loads(render_open_ids(encoded, ids[1:2], "abc", paginated=True)) == {
+        "open_restaurants": ["Café Ñandú"], "next_cursor": "abc"
+    }
+    lines = b"".join(iter_ndjson(encoded, ids, chunk_size=2)).splitlines()
+    assert [json.loads(line)["name"] for line in lines] == names
+
+
+def test_paginate_walks_every_id_once():
+    ids = np.array([1, 4, 5, 9, 12, 30, 31], dtype=np.int32)
+    seen, cursor = [], None
+    while True:
+        page, cursor = paginate(ids, 7, cursor, limit=3)
+        seen.extend(page.tolist())
+        if cursor is None:
+            break
+    assert seen == ids.tolist()
+
+    assert decode_cursor(encode_cursor(7, 12)) == (7, 12)
+    with pytest.raises(ValueError):
+        paginate(ids, 8, encode_cursor(7, 12))
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_open_restaurants_pages_and_stream():
+    full = client.get("/open_restaurants/", params=OPEN_AT).json()["open_restaurants"]
+
+    pages, cursor = [], None
+    while True:
+        params = {**OPEN_AT, "limit": 7}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/open_restaurants/", params=params)
+        assert response.status_code == 200
+        body = response.json()
+        assert len(body["open_restaurants"]) <= 7
+        pages.extend(body["open_restaurants"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            break
+    assert pages == full
+
+    response = client.get("/open_restaurants/", params={**OPEN_AT, "format": "ndjson"})
+    assert response.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line)["name"] for line in response.text.splitlines()] == full
+
+    response = client.get("/open_restaurants/", params={**OPEN_AT, "format": "ndjson", "limit": 5})
+    assert len(response.text.splitlines()) == 5
+    assert "x-next-cursor" in response.headers
+
+
+def test_open_restaurants_page_errors():
+    assert client.get("/open_restaurants/", params={**OPEN_AT, "limit": 0}).status_code == 422
+    assert client.get("/open_restaurants/", params={**OPEN_AT, "format": "xml"}).status_code == 422
+    assert client.get("/open_restaurants/", params={**OPEN_AT, "cursor": "bogus"}).status_code == 400
+    stale = encode_cursor(-1, 0)
+    assert client.get("/open_restaurants/", params={**OPEN_AT, "cursor": stale}).status_code == 400
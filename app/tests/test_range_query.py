@@ -0,0 +1,56 @@
+# test_range_query.py
+
+import random
+from datetime import datetime, timedelta
+import pytest
+from app.catalog import Catalog
+from app.data_handler import load_data
+from app.range_query import window_parts
+
+
+def brute_force(catalog, start_dt, end_dt, mode):
+    # Reference: probe every minute of the window with the point index
+    minutes = int((end_dt - start_dt) / timedelta(minutes=1)) + 1
+    open_sets = [
+        set(catalog.index.open_at(start_dt + timedelta(minutes=m)))
+        for m in range(min(minutes, 7 * 24 * 60))
+    ]
+    names = set.intersection(*open_sets) if mode == "all" else set.union(*open_sets)
+    return [name for name in catalog.restaurants if name in names]
+
+
+def test_window_parts():
+    # 2024-12-22 is a Sunday
+    assert window_parts(datetime(2024, 12, 16, 19, 0), datetime(2024, 12, 16, 22, 0)) == [(1140, 1320)]
+    assert window_parts(datetime(2024, 12, 22, 23, 0), datetime(2024, 12, 23, 1, 0, 30)) == [(10020, 10079), (0, 60)]
+    assert window_parts(datetime(2024, 12, 16), datetime(2024, 12, 30)) == [(0, 10079)]
+    with pytest.raises(ValueError):
+        window_parts(datetime(2024, 12, 16, 2, 0), datetime(2024, 12, 16, 1, 0))
+
+
+def test_overnight_split_counts_as_continuous(make_catalog):
+    catalog = make_catalog([
+        ("Bar", "Sat-Sun 10 pm - 2 am"),
+        ("Diner", "Mon-Sun 6 am - 11 pm"),
+        ("Lunch", "Mon 11 am - 2 pm"),
+    ])
+    # Sunday 11 pm through Monday 1 am wraps the end of the week
+    start, end = datetime(2024, 12, 22, 23, 0), datetime(2024, 12, 23, 1, 0)
+    assert catalog.ranges.open_between(start, end, "all") == ["Bar"]
+    assert catalog.ranges.open_between(start, end, "any") == ["Bar", "Diner"]
+    # Several days: the diner closes every night, and the bar's Monday hours end before noon
+    start, end = datetime(2024, 12, 16, 12, 0), datetime(2024, 12, 19, 12, 0)
+    assert catalog.ranges.open_between(start, end, "all") == []
+    assert catalog.ranges.open_between(start, end, "any") == ["Diner", "Lunch"]
+
+
+def test_matches_minute_by_minute_scan():
+    restaurants = load_data("app/restaurants.db")
+    catalog = Catalog(restaurants, {})
+    rng = random.Random(7)
+    base = datetime(2024, 12, 16)
+    for _ in range(40):
+        start_dt = base + timedelta(minutes=rng.randrange(7 * 24 * 60))
+        end_dt = start_dt + timedelta(minutes=rng.choice([0, 30, 180, 600, 2000]))
+        for mode in ("all", "any"):
+            assert catalog.ranges.open_between(start_dt, end_dt, mode) == brute_force(catalog, start_dt, end_dt, mode)
@@ -0,0 +1,33 @@
+# test_response_cache.py
+
+import json
+from app.response_cache import ResponseCache, etag_matches
+
+
+def test_cache_slots_and_invalidation(make_catalog):
+    catalog = make_catalog([("A", "Mon 9 am - 5 pm")])
+    cache = ResponseCache()
+
+    # Minute 1020 is Monday 17:00, the closing minute
+    on_minute = cache.get(catalog, 1020)
+    with_seconds = cache.get(catalog, 1020.5)
+    assert json.loads(on_minute.body) == {"open_restaurants": ["A"]}
+    assert "message" in json.loads(with_seconds.body)
+    assert cache.get(catalog, 1020) is on_minute
+    assert len(cache) == 1
+
+    reloaded = make_catalog([("A", "Mon 9 am - 6 pm")], previous=catalog)
+    assert json.loads(cache.get(reloaded, 1020.5).body) == {"open_restaurants": ["A"]}
+    # A request still holding the old catalog is answered but does not reset the cache
+    assert cache.get(catalog, 1020.5).etag == with_seconds.etag
+    assert cache.get(reloaded, 1020.5).etag != with_seconds.etag
+
+
+def test_etag_matches_validator_lists():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd", "x"', etag)
+    assert not etag_matches(None, etag)
@@ -0,0 +1,98 @@
+# test_schedule_index.py
+
+from datetime import datetime, timedelta
+import numpy as np
+from app.data_handler import parse_hours, load_data
+from app.schedule_index import (
+    MINUTES_PER_WEEK,
+    ScheduleIndex,
+    build_index_arrays,
+    schedule_to_intervals,
+    query_point,
+)
+
+DAY_NAMES = ["mon", "tue", "wed", "thu", "fri", "sat", "sun"]
+
+
+def brute_force_open(restaurants, query_dt):
+    # Reference implementation: the original linear scan from get_open_restaurants
+    query_day = DAY_NAMES[query_dt.weekday()]
+    query_time = query_dt.time()
+    open_restaurants = []
+    for name, schedule in restaurants.items():
+        for start, end in schedule[query_day]:
+            if start <= query_time <= end:
+                open_restaurants.append(name)
+                break
+    return open_restaurants
+
+
+def test_schedule_to_intervals():
+    schedule = parse_hours("Mon 11 am - 10 pm / Sun 10 pm - 1 am")
+    intervals = schedule_to_intervals(schedule)
+    # Sunday's overnight range is split into Mon 00:00-01:00 and Sun 22:00-23:59
+    assert intervals == [(0, 60), (660, 1320), (6 * 1440 + 1320, 6 * 1440 + 1439)]
+
+
+def test_query_point_sub_minute():
+    # 2024-12-16 is a Monday
+    assert query_point(datetime(2024, 12, 16, 0, 0)) == 0
+    assert query_point(datetime(2024, 12, 16, 22, 0, 30)) == 1320.5
+    assert query_point(datetime(2024, 12, 22, 23, 59)) == 10079
+
+
+def test_index_matches_linear_scan():
+    restaurants = load_data("app/restaurants.db")
+    index = ScheduleIndex(restaurants)
+    assert len(index) == len(restaurants)
+
+    start = datetime(2024, 12, 16)
+    for step in range(0, 7 * 24 * 60, 7):
+        query_dt = start + timedelta(minutes=step)
+        assert index.open_at(query_dt) == brute_force_open(restaurants, query_dt)
+        query_dt = query_dt + timedelta(seconds=30)
+        assert index.open_at(query_dt) == brute_force_open(restaurants, query_dt)
+
+
+def test_index_boundaries_and_empty():
+    restaurants = {
+        "Late": parse_hours("Fri 10 pm - 1 am"),
+        "Lunch": parse_hours("Mon-Fri 11 am - 2 pm"),
+        "Closed": parse_hours("Mon-Fri"),
+    }
+    index = ScheduleIndex(restaurants)
+    # 2024-12-20 is a Friday
+    assert index.open_at(datetime(2024, 12, 20, 14, 0)) == ["Lunch"]
+    assert index.open_at(datetime(2024, 12, 20, 14, 0, 1)) == []
+    assert index.open_at(datetime(2024, 12, 21, 1, 0)) == ["Late"]
+    assert ScheduleIndex({}).open_at(datetime(2024, 12, 20, 12, 0)) == []
+
+
+def test_patched_index_matches_rebuild():
+    rng = np.random.default_rng(7)
+
+    def random_intervals(owners):
+        starts = rng.integers(0, MINUTES_PER_WEEK - 600, len(owners))
+        return starts, starts + rng.integers(0, 600, len(owners)), np.asarray(owners)
+
+    starts, ends, owners = random_intervals(np.repeat(np.arange(200), 3))
+    index = ScheduleIndex.from_arrays([str(i) for i in range(200)], build_index_arrays(starts, ends, owners))
+
+    # Drop every fifth restaurant, replace the intervals of every seventh, append ten
+    keep = np.arange(200) % 5 != 0
+    replaced = np.flatnonzero(keep & (np.arange(200) % 7 == 0))
+    new_ids = np.cumsum(keep) - 1
+    kept = keep[owners] & ~np.isin(owners, replaced)
+    count = int(keep.sum())
+    added = random_intervals(np.concatenate([np.repeat(new_ids[replaced], 2), np.arange(count, count + 10)]))
+    patched = index.patched(
+        [str(i) for i in range(count + 10)], np.union1d(np.flatnonzero(~keep), replaced), new_ids, *added
+    )
+
+    rebuilt = ScheduleIndex.from_arrays(patched.names, build_index_arrays(
+        np.concatenate([starts[kept], added[0]]),
+        np.concatenate([ends[kept], added[1]]),
+        np.concatenate([new_ids[owners[kept]], added[2]]),
+    ))
+    for point in range(0, MINUTES_PER_WEEK, 3):
+        assert patched.open_ids(point) == rebuilt.open_ids(point), point
@@ -0,0 +1,56 @@
+# test_search.py
+
+import asyncio
+import numpy as np
+from csv_to_sqlite import ingest
+from app import search as search_module
+from app.catalog import CatalogStore
+from app.db import ConnectionPool
+from app.search import build_match_query, search
+
+
+class CountingPool:
+    """
+    Wraps a ConnectionPool, recording the LIMIT of every search query.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.limits = []
+
+    async def fetch_all(self, sql, params=()):
+        self.limits.append(params[1])
+        return await self.pool.fetch_all(sql, params)
+
+
+def test_search_fetches_bounded_batches(tmp_path, monkeypatch):
+    csv_path = str(tmp_path / "restaurants.csv")
+    db_path = str(tmp_path / "restaurants.db")
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write('"Restaurant Name","Hours","Cuisine"\n')
+        for i in range(600):
+            # Only every tenth restaurant is open on Tuesdays
+            f.write(f'"Place {i:03d}","{"Tue" if i % 10 == 0 else "Mon"} 9 am - 5 pm","Sushi"\n')
+    ingest(csv_path, db_path)
+    catalog = CatalogStore(db_path).current
+    pool = ConnectionPool(db_path, size=1)
+    monkeypatch.setattr(search_module, "SEARCH_BATCH_SIZE", 16)
+    match = build_match_query("sushi")
+
+    counting = CountingPool(pool)
+    rows = asyncio.run(search(counting, catalog, match, 5))
+    assert len(rows) == 5
+    assert counting.limits == [5]
+
+    tuesday = np.array([catalog.ids[f"Place {i:03d}"] for i in range(0, 600, 10)], dtype=np.int32)
+    counting = CountingPool(pool)
+    rows = asyncio.run(search(counting, catalog, match, 12, np.sort(tuesday)))
+    assert len(rows) == 12
+    assert all(int(name[-3:]) % 10 == 0 for name, _, _ in rows)
+    # Batches double from SEARCH_BATCH_SIZE and stop well short of the 600 hits
+    assert counting.limits == [16 * 2 ** i for i in range(len(counting.limits))]
+    assert sum(counting.limits) < 600
+
+    counting = CountingPool(pool)
+    assert len(asyncio.run(search(counting, catalog, match, 100, np.sort(tuesday)))) == 60
+    pool.close()
@@ -0,0 +1,80 @@
+# test_snapshot.py
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from functools import partial
+from app.catalog import CatalogStore
+from app.snapshot import build_snapshot, load_snapshot
+from app.schedule_index import schedule_to_intervals
+
+
+def test_snapshot_round_trip(tmp_path, db_path):
+    snapshot_path = str(tmp_path / "restaurants.snapshot")
+    built = build_snapshot(db_path, snapshot_path)
+    loaded = load_snapshot(snapshot_path, db_path)
+
+    assert loaded is not None
+    assert list(loaded.restaurants) == list(built.restaurants)
+    for name in built.restaurants:
+        assert loaded.hours[name] == built.hours[name]
+        assert schedule_to_intervals(loaded.restaurants[name]) == schedule_to_intervals(built.restaurants[name])
+    assert not loaded.batch.starts.flags.writeable
+
+    start = datetime(2024, 12, 16)
+    query_dts = [start + timedelta(minutes=11 * i) for i in range(7 * 24 * 6)]
+    for query_dt in query_dts:
+        assert loaded.index.open_at(query_dt) == built.index.open_at(query_dt)
+    assert (loaded.batch.open_matrix(query_dts) == built.batch.open_matrix(query_dts)).all()
+
+
+def test_snapshot_stale_or_missing(tmp_path, db_path):
+    snapshot_path = str(tmp_path / "restaurants.snapshot")
+    assert load_snapshot(snapshot_path, db_path) is None
+
+    build_snapshot(db_path, snapshot_path)
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET hours = 'Mon 1 am - 2 am' WHERE id = 1")
+    conn.commit()
+    conn.close()
+    assert load_snapshot(snapshot_path, db_path) is None
+
+    with open(snapshot_path, "wb") as f:
+        f.write(b"not a snapshot")
+    assert load_snapshot(snapshot_path) is None
+
+
+def test_store_starts_from_snapshot_and_reloads(tmp_path, db_path):
+    snapshot_path = str(tmp_path / "restaurants.snapshot")
+    build_snapshot(db_path, snapshot_path)
+
+    store = CatalogStore(db_path, snapshot_loader=partial(load_snapshot, snapshot_path))
+    assert type(store.current.restaurants["Caffe Luna"]).__name__ == "mappingproxy"
+    assert store.reload() is False
+
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE restaurants SET hours = 'Mon 1 am - 2 am' WHERE name = 'Caffe Luna'")
+    conn.commit()
+    conn.close()
+    assert store.reload() is True
+    # 2024-12-16 is a Monday
+    assert "Caffe Luna" in store.current.index.open_at(datetime(2024, 12, 16, 1, 30))
+
+
+def test_snapshot_fresh_for_wal_database(tmp_path, db_path):
+    snapshot_path = str(tmp_path / "restaurants.snapshot")
+    conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.close()
+    build_snapshot(db_path, snapshot_path)
+
+    # A new connection recreates an empty WAL file, which must not make the snapshot stale
+    conn = sqlite3.connect(db_path)
+    conn.execute("SELECT count(*) FROM restaurants").fetchone()
+    assert os.path.exists(db_path + "-wal")
+    assert load_snapshot(snapshot_path, db_path) is not None
+
+    conn.execute("UPDATE restaurants SET hours = 'Mon 1 am - 2 am' WHERE id = 1")
+    conn.commit()
+    assert load_snapshot(snapshot_path, db_path) is None
+    conn.close()
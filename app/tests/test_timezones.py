@@ -0,0 +1,219 @@
+# test_timezones.py
+
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+from fastapi.testclient import TestClient
+from app import main
+from app.snapshot import load_snapshot, write_snapshot
+from app.timezones import ZoneGroups, from_local, minutes_between
+
+NEW_YORK = ZoneInfo("America/New_York")
+
+
+def open_names(catalog, query_dt):
+    names = catalog.index.names
+    return [names[i] for i in catalog.zone_groups.open_ids(query_dt)]
+
+
+def test_zones_are_probed_at_local_time(make_catalog):
+    catalog = make_catalog([
+        ("NY", "Mon-Sun 9 am - 5 pm", "America/New_York"),
+        ("Tokyo", "Mon-Sun 9 am - 5 pm", "Asia/Tokyo"),
+        ("Local", "Mon-Sun 9 am - 5 pm"),
+    ])
+    # 14:00 UTC is 9 am in New York and 11 pm in Tokyo
+    assert open_names(catalog, datetime(2024, 12, 13, 14, 0, tzinfo=timezone.utc)) == ["NY", "Local"]
+    # 01:00 UTC is 8 pm in New York and 10 am in Tokyo
+    assert open_names(catalog, datetime(2024, 12, 13, 1, 0, tzinfo=timezone.utc)) == ["Tokyo"]
+    # Naive queries keep wall-clock semantics everywhere
+    assert open_names(catalog, datetime(2024, 12, 13, 10, 0)) == ["NY", "Tokyo", "Local"]
+
+
+def test_overnight_hours_across_spring_forward(make_catalog):
+    catalog = make_catalog([("Bar", "Sat 10 pm - 3 am", "America/New_York")])
+    # 2024-03-10: clocks jump from 2:00 to 3:00 am, so the bar is open for four hours, not five
+    start = datetime(2024, 3, 10, 2, 0, tzinfo=timezone.utc)
+    open_minutes = [
+        minute for minute in range(0, 8 * 60, 15)
+        if open_names(catalog, start + timedelta(minutes=minute))
+    ]
+    assert open_minutes[0] == 60  # 22:00 EST is 03:00 UTC
+    assert open_minutes[-1] == 60 + 4 * 60  # 03:00 EDT is 07:00 UTC
+    assert len(open_minutes) == 4 * 4 + 1
+
+
+def test_repeated_hour_at_fall_back(make_catalog):
+    catalog = make_catalog([("Late", "Sun 1 am - 1:59 am", "America/New_York")])
+    # 1:30 am on 2024-11-03 happens twice, at 05:30 and 06:30 UTC
+    first = datetime(2024, 11, 3, 1, 30, tzinfo=NEW_YORK)
+    second = first.replace(fold=1)
+    assert first.astimezone(timezone.utc).hour == 5
+    assert second.astimezone(timezone.utc).hour == 6
+    assert open_names(catalog, first) == ["Late"]
+    assert open_names(catalog, second) == ["Late"]
+    assert open_names(catalog, datetime(2024, 11, 3, 7, 0, tzinfo=timezone.utc)) == []
+
+
+def test_batch_matches_point_queries(make_catalog):
+    catalog = make_catalog([
+        ("NY", "Mon-Fri 11 pm - 2 am", "America/New_York"),
+        ("LA", "Mon-Sun 6 am - 11 am", "America/Los_Angeles"),
+        ("Paris", "Sat-Sun 10 am - 4 pm", "Europe/Paris"),
+    ])
+    start = datetime(2024, 3, 8, tzinfo=timezone.utc)
+    query_dts = [start + timedelta(minutes=37 * i) for i in range(400)]
+    matrix = catalog.zone_groups.open_matrix(query_dts)
+    for row, query_dt in zip(matrix, query_dts):
+        assert row.nonzero()[0].tolist() == catalog.zone_groups.open_ids(query_dt)
+    assert catalog.zone_groups.open_counts(query_dts).tolist() == matrix.sum(axis=1).tolist()
+    names = catalog.index.names
+    assert catalog.zone_groups.open_names(query_dts) == [[names[j] for j in row.nonzero()[0]] for row in matrix]
+
+
+def test_unknown_timezone_and_default_zone(make_catalog):
+    catalog = make_catalog([
+        ("Typo", "Mon-Sun 9 am - 5 pm", "Mars/Olympus"),
+        ("Plain", "Mon-Sun 9 am - 5 pm"),
+    ])
+    assert catalog.zone_of(0) is None
+    assert not catalog.zone_groups.zoned
+
+    zones = ZoneGroups(catalog, default_zone="Asia/Tokyo")
+    assert zones.zoned
+    assert zones.zone_for(1) == "Asia/Tokyo"
+    assert zones.open_ids(datetime(2024, 12, 13, 1, 0, tzinfo=timezone.utc)) == [0, 1]
+
+
+def test_snapshot_keeps_zones(tmp_path, make_catalog):
+    catalog = make_catalog([
+        ("NY", "Mon-Sun 9 am - 5 pm", "America/New_York"),
+        ("Plain", "Mon-Sun 9 am - 5 pm"),
+    ])
+    path = str(tmp_path / "zones.snapshot")
+    write_snapshot(catalog, path)
+    loaded = load_snapshot(path)
+    assert [loaded.zone_of(i) for i in range(len(loaded))] == ["America/New_York", None]
+
+
+def test_endpoints_convert_aware_queries(monkeypatch, make_catalog):
+    catalog = make_catalog([
+        ("NY", "Mon-Sun 9 am - 5 pm", "America/New_York"),
+        ("Tokyo", "Mon-Sun 9 am - 5 pm", "Asia/Tokyo"),
+    ])
+    monkeypatch.setattr(main.catalog_store, "current", catalog)
+    client = TestClient(main.app)
+
+    response = client.get("/open_restaurants/", params={"datetime_str": "2024-12-13T14:00:00+00:00"})
+    assert response.json() == {"open_restaurants": ["NY"]}
+
+    response = client.post("/open_restaurants/batch", json={"datetimes": ["2024-12-13T01:00:00Z"]})
+    assert response.json()["results"][0]["open_restaurants"] == ["Tokyo"]
+
+    response = client.get("/restaurants/Tokyo/next_change", params={"datetime_str": "2024-12-13T01:00:00Z"})
+    assert response.json()["closes_at"] == "2024-12-13T17:00:00+09:00"
+
+    response = client.get("/open_restaurants/closing_soon", params={"datetime_str": "2024-12-13T21:30:00Z", "within": 60})
+    assert response.json()["closing_soon"] == [
+        {"name": "NY", "closes_at": "2024-12-13T17:00:00-05:00", "minutes_until_close": 30}
+    ]
+
+    response = client.get("/open_restaurants/range", params={"start": "2024-12-13T14:00:00Z", "end": "2024-12-13T16:00:00Z"})
+    assert response.json() == {"open_restaurants": ["NY"]}
+
+
+def test_range_and_closing_use_per_zone_tables(make_catalog):
+    catalog = make_catalog([
+        ("NY", "Mon-Sun 9 am - 5 pm", "America/New_York"),
+        ("Tokyo", "Mon-Sun 9 am - 5 pm", "Asia/Tokyo"),
+        ("NY Late", "Mon-Sun 4 pm - 11 pm", "America/New_York"),
+        ("Paris", "Mon-Sun 8 am - 4:30 pm", "Europe/Paris"),
+    ])
+    zones = catalog.zone_groups
+    start = datetime(2024, 12, 13, 14, 0, tzinfo=timezone.utc)
+    end = start + timedelta(hours=2)
+    minutes = [start + timedelta(minutes=m) for m in range(121)]
+    always = set.intersection(*(set(zones.open_ids(dt)) for dt in minutes))
+    ever = set.union(*(set(zones.open_ids(dt)) for dt in minutes))
+    assert zones.range_ids(start, end, "all") == sorted(always)
+    assert zones.range_ids(start, end, "any") == sorted(ever)
+
+    # 21:30 UTC is 4:30 pm in New York and 10:30 pm in Paris
+    closing = zones.closing_within(datetime(2024, 12, 13, 21, 30, tzinfo=timezone.utc), 60)
+    assert [(catalog.index.names[rid], until) for rid, until, _ in closing] == [("NY", 30)]
+
+
+def test_next_change_and_closing_soon_across_dst(monkeypatch, make_catalog):
+    catalog = make_catalog([
+        ("Four", "Sat 10 pm - 4 am", "America/New_York"),
+        ("Quarter", "Sat 10 pm - 1:45 am", "America/New_York"),
+    ])
+    monkeypatch.setattr(main.catalog_store, "current", catalog)
+    client = TestClient(main.app)
+
+    def next_change(name, query):
+        return client.get(f"/restaurants/{name}/next_change", params={"datetime_str": query}).json()
+
+    def closing_soon(query, within):
+        response = client.get("/open_restaurants/closing_soon", params={"datetime_str": query, "within": within})
+        return [(r["name"], r["closes_at"], r["minutes_until_close"]) for r in response.json()["closing_soon"]]
+
+    # Spring-forward: 1:30 EST to 4:00 EDT is 90 real minutes, not 150 on the wall clock
+    spring = "2024-03-10T01:30:00-05:00"
+    body = next_change("Four", spring)
+    assert (body["closes_at"], body["minutes_until_change"]) == ("2024-03-10T04:00:00-04:00", 90)
+    assert closing_soon(spring, 100) == [
+        ("Quarter", "2024-03-10T01:45:00-05:00", 15),
+        ("Four", "2024-03-10T04:00:00-04:00", 90),
+    ]
+
+    # Fall-back: at the second 1:30 (EST) the close is the second 1:45, not the one already past
+    fall = "2024-11-03T01:30:00-05:00"
+    body = next_change("Quarter", fall)
+    assert (body["closes_at"], body["minutes_until_change"]) == ("2024-11-03T01:45:00-05:00", 15)
+    assert closing_soon(fall, 30) == [("Quarter", "2024-11-03T01:45:00-05:00", 15)]
+
+    # At the first 1:30 (EDT) it is the first 1:45; 4:00 is 210 wall but 270 real minutes away
+    body = next_change("Quarter", "2024-11-03T01:30:00-04:00")
+    assert (body["closes_at"], body["minutes_until_change"]) == ("2024-11-03T01:45:00-04:00", 15)
+    body = next_change("Four", "2024-11-03T00:30:00-04:00")
+    assert (body["closes_at"], body["minutes_until_change"]) == ("2024-11-03T04:00:00-05:00", 270)
+    assert closing_soon("2024-11-03T00:30:00-04:00", 240) == [("Quarter", "2024-11-03T01:45:00-04:00", 75)]
+
+
+def test_range_across_dst(monkeypatch, make_catalog):
+    catalog = make_catalog([
+        ("Bar", "Sat 11 pm - 2:30 am", "America/New_York"),
+        ("Early", "Sun 1 am - 1:30 am", "America/New_York"),
+        ("Split", "Sun 12 am - 2 am / Sun 3 am - 5 am", "America/New_York"),
+    ])
+    monkeypatch.setattr(main.catalog_store, "current", catalog)
+    client = TestClient(main.app)
+
+    def open_range(start, end, mode):
+        response = client.get("/open_restaurants/range", params={"start": start, "end": end, "mode": mode})
+        assert response.status_code == 200
+        return response.json().get("open_restaurants", [])
+
+    # Fall-back: 1:50 EDT to 1:10 EST is 20 real minutes, covering 1:50-1:59 and then 1:00-1:10
+    assert open_range("2024-11-03T01:50:00-04:00", "2024-11-03T01:10:00-05:00", "all") == ["Bar", "Split"]
+    assert open_range("2024-11-03T01:50:00-04:00", "2024-11-03T01:10:00-05:00", "any") == ["Bar", "Early", "Split"]
+    # Spring-forward: 1:50 EST to 3:10 EDT skips the 2 am hour that Split is closed for
+    assert open_range("2024-03-10T01:50:00-05:00", "2024-03-10T03:10:00-04:00", "all") == ["Split"]
+
+    zones = catalog.zone_groups
+    start = datetime(2024, 11, 3, 4, 0, tzinfo=timezone.utc)
+    minutes = [start + timedelta(minutes=m) for m in range(181)]
+    assert zones.range_ids(start, minutes[-1], "all") == sorted(
+        set.intersection(*(set(zones.open_ids(dt)) for dt in minutes))
+    )
+    assert zones.range_ids(start, minutes[-1], "any") == sorted(
+        set.union(*(set(zones.open_ids(dt)) for dt in minutes))
+    )
+
+
+def test_from_local_resolves_skipped_times():
+    # 2:30 am does not exist on 2024-03-10; clocks pass it when they jump to 3:00 EDT
+    query_dt = datetime(2024, 3, 10, 1, 0, tzinfo=NEW_YORK)
+    resolved = from_local(datetime(2024, 3, 10, 2, 30), "America/New_York", query_dt)
+    assert resolved.isoformat() == "2024-03-10T03:00:00-04:00"
+    assert minutes_between(query_dt, resolved) == 60
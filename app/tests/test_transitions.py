@@ -0,0 +1,63 @@
+# test_transitions.py
+
+import random
+from app.catalog import Catalog
+from app.data_handler import load_data
+from app.schedule_index import MINUTES_PER_WEEK
+
+
+def is_open(catalog, restaurant_id, minute):
+    return restaurant_id in catalog.index.open_ids(minute % MINUTES_PER_WEEK)
+
+
+def test_next_change_matches_minute_scan():
+    catalog = Catalog(load_data("app/restaurants.db"), {})
+    table = catalog.transitions
+    rng = random.Random(3)
+    for _ in range(100):
+        restaurant_id = rng.randrange(len(catalog))
+        minute = rng.randrange(MINUTES_PER_WEEK)
+        point = minute + rng.choice([0, 0.5])
+        open_now, until = table.next_change(restaurant_id, point)
+        assert open_now == (restaurant_id in catalog.index.open_ids(point))
+        if until is None:
+            continue
+        change = minute + until
+        if open_now:
+            assert all(is_open(catalog, restaurant_id, m) for m in range(minute + 1, change + 1))
+            assert not is_open(catalog, restaurant_id, change + 1)
+        else:
+            assert not any(is_open(catalog, restaurant_id, m) for m in range(minute + 1, change))
+            assert is_open(catalog, restaurant_id, change)
+
+
+def test_closing_within_matches_next_change():
+    catalog = Catalog(load_data("app/restaurants.db"), {})
+    table = catalog.transitions
+    for point in (0, 700, 1319.5, 6000, 10070):
+        expected = []
+        for restaurant_id in range(len(catalog)):
+            open_now, until = table.next_change(restaurant_id, point)
+            if open_now and until is not None and until <= 90:
+                expected.append((restaurant_id, until))
+        expected.sort(key=lambda item: (item[1], item[0]))
+        assert table.closing_within(point, 90) == expected
+
+
+def test_week_wrap_always_open_and_closed(make_catalog):
+    catalog = make_catalog([
+        ("Bar", "Sun 10 pm - 2 am / Mon 6 pm - 9 pm"),
+        ("Always", "Mon-Sun 12 am - 11:59 pm"),
+        ("Never", "Mon-Fri"),
+    ])
+    table = catalog.transitions
+    # Sunday 11 pm: open, closes 3 hours later on Monday
+    assert table.next_change(0, MINUTES_PER_WEEK - 60) == (True, 180)
+    # Monday 1 am: still inside the wrapped run
+    assert table.next_change(0, 60) == (True, 60)
+    # Monday 3 am: opens again at 6 pm
+    assert table.next_change(0, 180) == (False, 900)
+    assert table.next_change(1, 4000) == (True, None)
+    assert table.next_change(2, 4000) == (False, None)
+    assert table.closing_within(MINUTES_PER_WEEK - 60, 180) == [(0, 180)]
+    assert table.closing_within(MINUTES_PER_WEEK - 60, 179) == []
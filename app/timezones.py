@@ -0,0 +1,323 @@
+import os
+from datetime import timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+import numpy as np
+
+from app.batch_engine import BatchEngine
+from app.range_query import RangeIndex
+from app.schedule_index import ScheduleIndex, build_index_arrays, query_point
+from app.transitions import TransitionTable, minutes_later
+
+# Zone for restaurants without a timezone; unset keeps the query's own wall-clock time
+DEFAULT_TIMEZONE = os.environ.get("OPEN_BITES_DEFAULT_TIMEZONE") or None
+
+# Largest UTC offset change at a DST transition; wall-clock searches are
+# widened by it so no result within a real-time limit is missed
+DST_MARGIN = 120
+
+
+@lru_cache(maxsize=None)
+def get_zone(name):
+    """
+    Returns the ZoneInfo for an IANA timezone name.
+    Raises ValueError for unknown names.
+    """
+    try:
+        return ZoneInfo(name)
+    except (ZoneInfoNotFoundError, ValueError) as e:
+        raise ValueError(f"Unknown timezone: '{name}'") from e
+
+
+def is_valid_zone(name):
+    """
+    Returns True if `name` is a timezone get_zone can load.
+    """
+    try:
+        get_zone(name)
+    except ValueError:
+        return False
+    return True
+
+
+class ZoneGroups:
+    """
+    Restaurants of a catalog grouped by timezone, each group with its own
+    point index, batch engine, range index and transition table over the
+    group's intervals, each built on first use.
+
+    Restaurant hours are local wall-clock times. A naive query is read as wall
+    time everywhere, as before. An aware query is an instant: it is converted
+    once per zone rather than once per restaurant, and each group is probed at
+    its own local time. Converting the instant means DST is handled by zoneinfo.
+    Spring-forward skips the missing local hour, even inside an overnight range.
+    Fall-back matches the repeated hour twice.
+    """
+
+    def __init__(self, catalog, default_zone=DEFAULT_TIMEZONE):
+        batch = catalog.batch
+        self.names = batch.names
+        zone_names = list(catalog.zone_names)
+        zone_ids = np.asarray(catalog.zone_ids, dtype=np.int32)
+
+        # Fold restaurants without a zone into the default zone's group
+        if default_zone is not None:
+            if None not in zone_names:
+                zone_names.append(None)
+            none_id = zone_names.index(None)
+            if default_zone in zone_names:
+                zone_ids = np.where(zone_ids == none_id, zone_names.index(default_zone), zone_ids)
+            else:
+                zone_names[none_id] = default_zone
+
+        self.zone_ids = zone_ids
+        self.zone_names = zone_names
+        self.groups = []
+        for zone_id, zone in enumerate(zone_names):
+            members = np.flatnonzero(zone_ids == zone_id).astype(np.int32)
+            if len(members):
+                self.groups.append((zone, zone_id, members))
+
+        self.zoned = any(zone is not None for zone, _, _ in self.groups)
+        self._batch = batch
+        self._indexes = {}
+        self._engines = {}
+        self._ranges = {}
+        self._transitions = {}
+
+    def _subset(self, zone_id, members):
+        """
+        Returns the group's names and its intervals renumbered to group-local owner ids.
+        """
+        batch = self._batch
+        local_ids = np.full(len(self.names), -1, dtype=np.int32)
+        local_ids[members] = np.arange(len(members), dtype=np.int32)
+        mask = self.zone_ids[batch.owners] == zone_id
+        names = [self.names[i] for i in members.tolist()]
+        return names, batch.starts[mask], batch.ends[mask], local_ids[batch.owners[mask]]
+
+    def _index(self, zone_id, members):
+        index = self._indexes.get(zone_id)
+        if index is None:
+            names, starts, ends, owners = self._subset(zone_id, members)
+            index = self._indexes[zone_id] = ScheduleIndex.from_arrays(
+                names, build_index_arrays(starts, ends, owners)
+            )
+        return index
+
+    def _engine(self, zone_id, members):
+        engine = self._engines.get(zone_id)
+        if engine is None:
+            engine = self._engines[zone_id] = BatchEngine.from_arrays(*self._subset(zone_id, members))
+        return engine
+
+    def _range_index(self, zone_id, members):
+        ranges = self._ranges.get(zone_id)
+        if ranges is None:
+            ranges = self._ranges[zone_id] = RangeIndex(*self._subset(zone_id, members))
+        return ranges
+
+    def _transition_table(self, zone_id, members):
+        table = self._transitions.get(zone_id)
+        if table is None:
+            table = self._transitions[zone_id] = TransitionTable(self._range_index(zone_id, members))
+        return table
+
+    def local_times(self, query_dt):
+        """
+        Yields (zone_id, members, local_dt) per group, where local_dt is query_dt
+        as naive wall-clock time in that group's zone.
+        """
+        for zone, zone_id, members in self.groups:
+            yield zone_id, members, to_local(query_dt, zone)
+
+    def open_ids(self, query_dt):
+        """
+        Returns the sorted catalog ids of restaurants open at query_dt.
+        """
+        found = []
+        for zone_id, members, local_dt in self.local_times(query_dt):
+            local = self._index(zone_id, members).open_ids(query_point(local_dt))
+            found.append(members[local])
+        if not found:
+            return []
+        return np.sort(np.concatenate(found)).tolist()
+
+    def open_matrix(self, query_dts):
+        """
+        Boolean (len(query_dts), len(catalog)) matrix, converting timestamps once per zone.
+        """
+        matrix = np.zeros((len(query_dts), len(self.names)), dtype=bool)
+        for zone, zone_id, members in self.groups:
+            local_dts = [to_local(dt, zone) for dt in query_dts]
+            matrix[:, members] = self._engine(zone_id, members).open_matrix(local_dts)
+        return matrix
+
+    def open_counts(self, query_dts):
+        """
+        Returns the number of open restaurants at each of `query_dts`, summing
+        each group's counts rather than building the open matrix.
+        """
+        counts = np.zeros(len(query_dts), dtype=np.int32)
+        for zone, zone_id, members in self.groups:
+            local_dts = [to_local(dt, zone) for dt in query_dts]
+            counts += self._engine(zone_id, members).open_counts(local_dts)
+        return counts
+
+    def open_names(self, query_dts):
+        """
+        Returns, for each of `query_dts`, the names of open restaurants in catalog
+        order, collecting each group's open ids rather than building the open matrix.
+        """
+        found = [[] for _ in query_dts]
+        for zone, zone_id, members in self.groups:
+            local_dts = [to_local(dt, zone) for dt in query_dts]
+            for row, local in zip(found, self._engine(zone_id, members).open_id_lists(local_dts)):
+                row.append(members[local])
+        names = self.names
+        return [[names[j] for j in np.sort(np.concatenate(row)).tolist()] if row else [] for row in found]
+
+    def range_ids(self, start_dt, end_dt, mode):
+        """
+        Runs each group's RangeIndex window query on the local windows the
+        window covers in that zone, requiring all of them (mode "all") or any.
+        """
+        found = []
+        for zone, zone_id, members in self.groups:
+            ranges = self._range_index(zone_id, members)
+            ids = None
+            for local_start, local_end in local_windows(start_dt, end_dt, zone):
+                local = np.asarray(ranges.open_ids(local_start, local_end, mode), dtype=np.int32)
+                if ids is None:
+                    ids = local
+                elif mode == "all":
+                    ids = np.intersect1d(ids, local, assume_unique=True)
+                else:
+                    ids = np.union1d(ids, local)
+            found.append(members[ids])
+        return np.sort(np.concatenate(found)).tolist() if found else []
+
+    def closing_within(self, query_dt, minutes):
+        """
+        Returns (restaurant_id, minutes_until_close, closes_at) for restaurants
+        open at query_dt that close within `minutes` real minutes, soonest
+        first. closes_at is aware in the restaurant's zone for aware queries.
+        """
+        found = []
+        for zone, zone_id, members in self.groups:
+            local_dt = to_local(query_dt, zone)
+            table = self._transition_table(zone_id, members)
+            # Wall-clock minutes differ from real ones across a DST change
+            for local_id, until in table.closing_within(query_point(local_dt), minutes + DST_MARGIN):
+                closes_at = from_local(minutes_later(local_dt, until), zone, query_dt)
+                elapsed = minutes_between(query_dt, closes_at)
+                if elapsed <= minutes:
+                    found.append((int(members[local_id]), elapsed, closes_at))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
+
+    def zone_for(self, restaurant_id):
+        """
+        Returns the timezone name used for a restaurant, or None if it has none.
+        """
+        return self.zone_names[self.zone_ids[restaurant_id]]
+
+
+def from_local(local_dt, zone, query_dt):
+    """
+    Resolves a naive local result of an aware query into an aware datetime in
+    `zone` (the query's own offset for restaurants without a zone): the first
+    instant, from query_dt's minute on, at which clocks there read local_dt.
+    A time repeated at fall-back resolves to whichever occurrence comes first
+    after the query; a time skipped at spring-forward resolves to the jump.
+    Results of naive queries stay naive wall-clock times.
+    """
+    if query_dt.tzinfo is None:
+        return local_dt
+    tz = query_dt.tzinfo if zone is None else get_zone(zone)
+    not_before = query_dt.replace(second=0, microsecond=0).astimezone(timezone.utc)
+
+    # Compared in UTC: aware datetimes sharing a tzinfo compare by wall time and ignore fold
+    candidates = []
+    for fold in (0, 1):
+        instant = local_dt.replace(tzinfo=tz, fold=fold).astimezone(timezone.utc)
+        if instant.astimezone(tz).replace(tzinfo=None) == local_dt:
+            candidates.append(instant)
+    if candidates:
+        later = [instant for instant in candidates if instant >= not_before]
+        return (min(later) if later else max(candidates)).astimezone(tz)
+
+    # Skipped: fold=1 reads it with the offset after the jump and fold=0 with the
+    # one before, which brackets the jump; search for it to the minute
+    low = local_dt.replace(tzinfo=tz, fold=1).astimezone(timezone.utc)
+    offset = low.astimezone(tz).utcoffset()
+    lo, hi = 0, (local_dt.replace(tzinfo=tz, fold=0).astimezone(timezone.utc) - low) // timedelta(minutes=1)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if (low + timedelta(minutes=mid)).astimezone(tz).utcoffset() == offset:
+            lo = mid
+        else:
+            hi = mid
+    return (low + timedelta(minutes=hi)).astimezone(tz)
+
+
+def local_windows(start_dt, end_dt, zone):
+    """
+    Splits a window into the naive wall-clock windows it covers in `zone`
+    (start_dt's own offset for restaurants without a zone), one per stretch
+    of constant UTC offset. Both ends are truncated to the minute. Across
+    fall-back the repeated hour is covered twice; across spring-forward the
+    skipped hour is left out. Naive windows are returned as they are.
+    Raises ValueError if end_dt is before start_dt or only one end is aware.
+    """
+    if start_dt.tzinfo is None and end_dt.tzinfo is None:
+        return [(start_dt, end_dt)]
+    if start_dt.tzinfo is None or end_dt.tzinfo is None:
+        raise ValueError("Window ends must both be naive or both be aware")
+    tz = start_dt.tzinfo if zone is None else get_zone(zone)
+    start = start_dt.replace(second=0, microsecond=0).astimezone(timezone.utc)
+    end = end_dt.replace(second=0, microsecond=0).astimezone(timezone.utc)
+    if end < start:
+        raise ValueError("Window end must not be before its start")
+
+    def local(instant):
+        return instant.astimezone(tz).replace(tzinfo=None)
+
+    # Windows shorter than a week cross at most one offset change in practice
+    windows = []
+    offset = start.astimezone(tz).utcoffset()
+    while end.astimezone(tz).utcoffset() != offset:
+        lo, hi = 0, (end - start) // timedelta(minutes=1)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if (start + timedelta(minutes=mid)).astimezone(tz).utcoffset() == offset:
+                lo = mid
+            else:
+                hi = mid
+        change = start + timedelta(minutes=hi)
+        windows.append((local(start), local(change - timedelta(minutes=1))))
+        start, offset = change, change.astimezone(tz).utcoffset()
+    windows.append((local(start), local(end)))
+    return windows
+
+
+def minutes_between(query_dt, change_dt):
+    """
+    Whole minutes from the start of query_dt's minute until change_dt: real
+    elapsed time for aware datetimes, wall-clock minutes for naive ones.
+    """
+    start = query_dt.replace(second=0, microsecond=0)
+    if start.tzinfo is not None:
+        start, change_dt = start.astimezone(timezone.utc), change_dt.astimezone(timezone.utc)
+    return (change_dt - start) // timedelta(minutes=1)
+
+
+def to_local(query_dt, zone):
+    """
+    Converts query_dt to naive wall-clock time in `zone`. Naive datetimes, and
+    restaurants without a zone, keep the query's own wall-clock time.
+    """
+    if query_dt.tzinfo is None or zone is None:
+        return query_dt.replace(tzinfo=None)
+    return query_dt.astimezone(get_zone(zone)).replace(tzinfo=None)
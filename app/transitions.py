@@ -0,0 +1,103 @@
+from datetime import timedelta
+
+import numpy as np
+
+from app.schedule_index import MINUTES_PER_WEEK
+
+# Run end used for restaurants that are open around the clock and never close
+ALWAYS_OPEN = 3 * MINUTES_PER_WEEK
+
+
+class TransitionTable:
+    """
+    Per-restaurant weekly open/close transitions in minute-of-week.
+
+    Built from a RangeIndex's merged runs. A run that closes at the end of
+    Sunday and reopens at Monday 00:00 is one stretch, so it is stored once
+    with its end pushed past MINUTES_PER_WEEK. Each restaurant's runs are
+    sorted by start, which makes every lookup a binary search. A second copy
+    sorted by end answers "closing within N minutes" across the whole catalog.
+    """
+
+    def __init__(self, ranges):
+        self.names = ranges.names
+        starts = ranges.run_starts.astype(np.int32)
+        ends = ranges.run_ends.astype(np.int32)
+        owners = ranges.run_owners.astype(np.int32)
+
+        if len(owners):
+            group_first = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+            group_last = np.r_[group_first[1:] - 1, len(owners) - 1]
+            single = group_first == group_last
+            opens_monday = starts[group_first] == 0
+            closes_sunday = ends[group_last] == MINUTES_PER_WEEK - 1
+
+            always = single & opens_monday & closes_sunday
+            ends[group_first[always]] = ALWAYS_OPEN
+
+            wraps = ~single & opens_monday & closes_sunday
+            ends[group_last[wraps]] = ends[group_first[wraps]] + MINUTES_PER_WEEK
+            keep = np.ones(len(owners), dtype=bool)
+            keep[group_first[wraps]] = False
+            starts, ends, owners = starts[keep], ends[keep], owners[keep]
+
+        self.starts = starts
+        self.ends = ends
+        self.owners = owners
+        self.offsets = np.searchsorted(owners, np.arange(len(self.names) + 1))
+
+        by_end = np.argsort(ends, kind="stable")
+        self._ends_sorted = ends[by_end]
+        self._starts_by_end = starts[by_end]
+        self._owners_by_end = owners[by_end]
+
+    def next_change(self, restaurant_id, point):
+        """
+        Returns (is_open, minutes_until_change) for a restaurant at a query_point.
+        minutes_until_change counts from the query's minute and is None when the
+        restaurant never changes state (always open, or no hours at all).
+        """
+        a, b = self.offsets[restaurant_id], self.offsets[restaurant_id + 1]
+        if a == b:
+            return False, None
+        starts, ends = self.starts[a:b], self.ends[a:b]
+        minute = int(point)
+
+        i = int(np.searchsorted(starts, point, side="right")) - 1
+        if i >= 0 and ends[i] >= point:
+            if ends[i] == ALWAYS_OPEN:
+                return True, None
+            return True, int(ends[i]) - minute
+        # A run wrapping past Sunday is the last one and may cover the start of the week
+        if ends[-1] >= MINUTES_PER_WEEK and ends[-1] - MINUTES_PER_WEEK >= point:
+            return True, int(ends[-1]) - MINUTES_PER_WEEK - minute
+
+        j = i + 1
+        if j < len(starts):
+            return False, int(starts[j]) - minute
+        return False, int(starts[0]) + MINUTES_PER_WEEK - minute
+
+    def closing_within(self, point, minutes):
+        """
+        Returns (restaurant_id, minutes_until_close) for every restaurant open at
+        `point` that closes within `minutes`, soonest first.
+        """
+        minute = int(point)
+        found = []
+        # A run may contain the point directly or, if it wraps, one week later
+        for shift in (0, MINUTES_PER_WEEK):
+            q = point + shift
+            lo = int(np.searchsorted(self._ends_sorted, q, side="left"))
+            hi = int(np.searchsorted(self._ends_sorted, minute + shift + minutes, side="right"))
+            hit = self._starts_by_end[lo:hi] <= q
+            for owner, end in zip(self._owners_by_end[lo:hi][hit].tolist(), self._ends_sorted[lo:hi][hit].tolist()):
+                found.append((owner, end - shift - minute))
+        found.sort(key=lambda item: (item[1], item[0]))
+        return found
+
+
+def minutes_later(query_dt, minutes):
+    """
+    Returns the datetime `minutes` after the start of query_dt's minute.
+    """
+    return query_dt.replace(second=0, microsecond=0) + timedelta(minutes=minutes)
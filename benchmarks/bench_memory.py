@@ -0,0 +1,79 @@
+"""
+Memory per restaurant of the schedule representations, measured with
+tracemalloc over a synthetic catalog.
+
+    python -m benchmarks.bench_memory --rows 100000,1000000
+"""
+import argparse
+import gc
+import tracemalloc
+
+from app.compact_schedule import CompactScheduleBuilder
+from app.data_handler import _parse_hours_uncached, clear_parse_cache, parse_hours_cached
+from app.schedule_index import hours_to_blob
+from benchmarks.synthetic import iter_catalog
+
+
+def measure(build):
+    """
+    Returns (bytes still allocated by build's result, result).
+    """
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before, result
+
+
+def per_restaurant_dicts(rows):
+    # What load_data originally held: an independent dict of lists per restaurant
+    return {name: _parse_hours_uncached(hours)[0] for name, hours in rows}
+
+
+def shared_cached_dicts(rows):
+    # Restaurants with identical hours share one cached read-only mapping
+    clear_parse_cache()
+    return {name: parse_hours_cached(hours) for name, hours in rows}
+
+
+def compact_pool(rows):
+    hours_to_blob.cache_clear()
+    builder = CompactScheduleBuilder()
+    for name, hours in rows:
+        builder.add(name, hours_to_blob(hours))
+    compact = builder.build()
+    # The parse caches are bounded and transient; count only what the catalog keeps
+    hours_to_blob.cache_clear()
+    clear_parse_cache()
+    return compact
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", default="100000,1000000", help="comma-separated catalog sizes")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for size in (int(size) for size in args.rows.split(",")):
+        rows = [(name, hours) for name, hours, _ in iter_catalog(size, args.seed)]
+        # Names are shared by every representation, so only the schedule side is measured
+        print(f"{size:,} restaurants, {len({hours for _, hours in rows}):,} distinct hours strings")
+        baseline = None
+        for label, build in (
+            ("dict per restaurant", per_restaurant_dicts),
+            ("shared cached dicts", shared_cached_dicts),
+            ("compact pool", compact_pool),
+        ):
+            allocated, result = measure(lambda: build(rows))
+            per = allocated / size
+            baseline = baseline or per
+            print(f"  {label:<22} {allocated / 2**20:10.1f} MiB  {per:8.1f} bytes/restaurant  "
+                  f"saves {baseline - per:8.1f} bytes/restaurant")
+            del result
+
+
+if __name__ == "__main__":
+    main()
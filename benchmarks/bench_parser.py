@@ -0,0 +1,84 @@
+"""
+Parsing benchmark over a synthetic corpus built from the hours shapes in
+data/restaurants.csv.
+
+    python -m benchmarks.bench_parser --rows 1000000
+"""
+import argparse
+import csv
+import random
+import time
+
+from app.data_handler import (
+    _parse_hours_uncached,
+    clear_parse_cache,
+    parse_hours,
+    parse_hours_cached,
+)
+
+CSV_PATH = "data/restaurants.csv"
+
+
+def load_shapes(csv_path=CSV_PATH):
+    """
+    Reads the distinct hours strings from the sample CSV.
+    """
+    with open(csv_path, "r", encoding="utf-8") as f:
+        return sorted({row["Hours"].strip() for row in csv.DictReader(f) if row.get("Hours")})
+
+
+def shift_hour(shape, rng):
+    """
+    Produces a variant of an hours string by moving its first whole hour by up to two hours.
+    """
+    words = shape.split()
+    for i, word in enumerate(words):
+        if word.isdigit() and 1 <= int(word) <= 12:
+            words[i] = str((int(word) - 1 + rng.randint(-2, 2)) % 12 + 1)
+            break
+    return " ".join(words)
+
+
+def build_corpus(rows, shapes, unique_ratio=0.05, seed=0):
+    """
+    Builds `rows` hours strings. Most rows repeat a chain-wide shape verbatim,
+    and `unique_ratio` of them are per-venue variants, as in real feeds.
+    """
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(rows):
+        shape = rng.choice(shapes)
+        if rng.random() < unique_ratio:
+            shape = shift_hour(shape, rng)
+        corpus.append(shape)
+    return corpus
+
+
+def timed(label, fn, corpus):
+    start = time.perf_counter()
+    for hours_str in corpus:
+        fn(hours_str)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f} s  {len(corpus) / elapsed:14,.0f} rows/s")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--unique-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.rows, load_shapes(), args.unique_ratio, args.seed)
+    print(f"{len(corpus):,} rows, {len(set(corpus)):,} distinct hours strings")
+
+    timed("uncached parse", _parse_hours_uncached, corpus)
+    clear_parse_cache()
+    timed("parse_hours_cached (cold)", parse_hours_cached, corpus)
+    timed("parse_hours_cached (warm)", parse_hours_cached, corpus)
+    timed("parse_hours (warm, copies)", parse_hours, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+End-to-end benchmark suite: synthetic catalogs from 1k to 1M restaurants,
+measuring import, parse throughput, startup time, peak RSS and endpoint
+latency percentiles through the ASGI app. Results are written as JSON so runs
+can be compared across commits.
+
+    python -m benchmarks.bench_suite --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from functools import partial
+
+import numpy as np
+
+from benchmarks.synthetic import build_catalog_db, iter_catalog
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+
+RESULTS_DIR = "benchmarks/results"
+
+# Hours strings parsed per throughput measurement; larger catalogs are sampled
+PARSE_SAMPLE = 200_000
+
+STARTUP_MODES = ("parse", "stored", "snapshot")
+
+# Monday 2024-12-16, so every offset below lands on a known weekday
+WEEK_START = datetime(2024, 12, 16)
+
+
+def peak_rss_bytes():
+    """
+    Returns this process's peak resident set size in bytes.
+    """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def percentiles(samples):
+    """
+    Summarizes latencies in seconds as milliseconds.
+    """
+    ms = np.asarray(samples) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": len(ms),
+        "mean_ms": float(ms.mean()),
+        "p50_ms": float(p50),
+        "p90_ms": float(p90),
+        "p99_ms": float(p99),
+        "max_ms": float(ms.max()),
+    }
+
+
+def bench_parse(hours, seed=0):
+    """
+    Parse throughput in rows/s: uncached, then through the cache cold and warm.
+    """
+    from app.data_handler import _parse_hours_uncached, clear_parse_cache, parse_hours_cached
+
+    if len(hours) > PARSE_SAMPLE:
+        hours = random.Random(seed).sample(hours, PARSE_SAMPLE)
+
+    def rate(fn):
+        start = time.perf_counter()
+        for hours_str in hours:
+            fn(hours_str)
+        return len(hours) / (time.perf_counter() - start)
+
+    result = {"rows": len(hours), "distinct": len(set(hours))}
+    result["uncached_rows_per_s"] = rate(_parse_hours_uncached)
+    clear_parse_cache()
+    result["cached_cold_rows_per_s"] = rate(parse_hours_cached)
+    result["cached_warm_rows_per_s"] = rate(parse_hours_cached)
+    return result
+
+
+def measure_startup(mode, db_path, snapshot_path):
+    """
+    Loads a catalog the way the server would and returns timing and memory.
+    Runs in a child process (see startup_in_subprocess) so peak RSS is per mode.
+    """
+    from app.catalog import Catalog, CatalogStore
+    from app.data_handler import load_data
+    from app.snapshot import load_snapshot
+
+    rss_before = peak_rss_bytes()
+    start = time.perf_counter()
+    if mode == "parse":
+        # The original path: parse every hours string, then build the index
+        catalog = Catalog(load_data(db_path), {})
+        catalog.index
+    elif mode == "stored":
+        catalog = CatalogStore(db_path).current
+    elif mode == "snapshot":
+        catalog = CatalogStore(db_path, snapshot_loader=partial(load_snapshot, snapshot_path)).current
+    else:
+        raise ValueError(f"Unknown startup mode: '{mode}'")
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "restaurants": len(catalog),
+        "rss_before_bytes": rss_before,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def startup_in_subprocess(mode, db_path, snapshot_path):
+    """
+    Runs measure_startup in a fresh interpreter and returns its result.
+    """
+    output = subprocess.run(
+        [sys.executable, "-m", "benchmarks.bench_suite", "--startup-child", mode, db_path, snapshot_path],
+        check=True, capture_output=True, text=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def endpoint_requests(names, requests, seed=0):
+    """
+    Builds (label, method, path, params, body) request lists per endpoint.
+    """
+    rng = random.Random(seed)
+
+    def moment():
+        # Spread over the whole week, with seconds so the response cache sees misses too
+        return (WEEK_START + timedelta(seconds=rng.randrange(7 * 24 * 3600))).isoformat()
+
+    def window(hours):
+        start = moment()
+        return start, (datetime.fromisoformat(start) + timedelta(hours=hours)).isoformat()
+
+    warm = [moment() for _ in range(16)]
+    return {
+        "open_restaurants_cold": [
+            ("GET", "/open_restaurants/", {"datetime_str": moment()}, None) for _ in range(requests)
+        ],
+        "open_restaurants_warm": [
+            ("GET", "/open_restaurants/", {"datetime_str": rng.choice(warm)}, None) for _ in range(requests)
+        ],
+        "open_restaurants_utc": [
+            ("GET", "/open_restaurants/", {"datetime_str": moment() + "+00:00"}, None) for _ in range(requests)
+        ],
+        "range": [
+            ("GET", "/open_restaurants/range", {"start": start, "end": end, "mode": rng.choice(["all", "any"])}, None)
+            for start, end in (window(3) for _ in range(requests))
+        ],
+        "closing_soon": [
+            ("GET", "/open_restaurants/closing_soon", {"datetime_str": moment(), "within": 30}, None) for _ in range(requests)
+        ],
+        "next_change": [
+            ("GET", f"/restaurants/{rng.choice(names)}/next_change", {"datetime_str": moment()}, None) for _ in range(requests)
+        ],
+        "batch_96_counts": [
+            ("POST", "/open_restaurants/batch", None, {"datetimes": [moment() for _ in range(96)], "counts_only": True})
+            for _ in range(max(1, requests // 10))
+        ],
+    }
+
+
+async def run_requests(app, plan):
+    """
+    Sends each request in turn through the ASGI app and returns per-endpoint percentiles.
+    """
+    import httpx
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for label, requests in plan.items():
+            samples = []
+            for method, path, params, body in requests:
+                start = time.perf_counter()
+                response = await client.request(method, path, params=params, json=body)
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise RuntimeError(f"{method} {path} returned {response.status_code}: {response.text[:200]}")
+            result = percentiles(samples)
+            result["requests_per_s"] = len(samples) / sum(samples)
+            results[label] = result
+    return results
+
+
+def bench_endpoints(db_path, snapshot_path, requests, seed=0):
+    """
+    Points the app at the synthetic catalog and measures in-process latency.
+    No network or server is involved, so this is the app's own cost per request.
+    """
+    from app import main
+    from app.catalog import CatalogStore
+    from app.response_cache import ResponseCache
+    from app.snapshot import load_snapshot
+
+    store = CatalogStore(db_path, snapshot_loader=partial(load_snapshot, snapshot_path))
+    names = list(store.current.index.names)
+    previous = main.catalog_store, main.response_cache
+    main.catalog_store, main.response_cache = store, ResponseCache()
+    try:
+        return asyncio.run(run_requests(main.app, endpoint_requests(names, requests, seed)))
+    finally:
+        main.catalog_store, main.response_cache = previous
+
+
+def run_size(rows, workdir, requests=2000, seed=0, zones=False):
+    """
+    Runs every benchmark against one synthetic catalog size.
+    """
+    from app.snapshot import build_snapshot
+
+    csv_path = os.path.join(workdir, f"restaurants_{rows}.csv")
+    db_path = os.path.join(workdir, f"restaurants_{rows}.db")
+    snapshot_path = os.path.join(workdir, f"restaurants_{rows}.snapshot")
+
+    print(f"[{rows:,}] importing synthetic catalog", flush=True)
+    stats = build_catalog_db(csv_path, db_path, rows, seed, zones=zones)
+    start = time.perf_counter()
+    build_snapshot(db_path, snapshot_path)
+    result = {
+        "restaurants": rows,
+        "zones": zones,
+        "import": {
+            "seconds": stats["seconds"],
+            "rows_per_s": stats["written"] / stats["seconds"],
+            "db_bytes": os.path.getsize(db_path),
+            "snapshot_seconds": time.perf_counter() - start,
+            "snapshot_bytes": os.path.getsize(snapshot_path),
+        },
+    }
+
+    print(f"[{rows:,}] parse throughput", flush=True)
+    result["parse"] = bench_parse([hours for _, hours, _ in iter_catalog(rows, seed, zones=zones)], seed)
+
+    result["startup"] = {}
+    for mode in STARTUP_MODES:
+        print(f"[{rows:,}] startup ({mode})", flush=True)
+        result["startup"][mode] = startup_in_subprocess(mode, db_path, snapshot_path)
+
+    if requests:
+        print(f"[{rows:,}] endpoint latency", flush=True)
+        result["endpoints"] = bench_endpoints(db_path, snapshot_path, requests, seed)
+    return result
+
+
+def environment():
+    """
+    Describes the machine and tree the results came from.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def print_summary(results):
+    for result in results:
+        parse = result["parse"]
+        startup = result["startup"]
+        print(
+            f"{result['restaurants']:>9,} restaurants  "
+            f"import {result['import']['rows_per_s']:>9,.0f} rows/s  "
+            f"parse {parse['uncached_rows_per_s']:>9,.0f} rows/s  "
+            + "  ".join(
+                f"{mode} {s['seconds']:.2f} s / {s['peak_rss_bytes'] / 2**20:,.0f} MiB"
+                for mode, s in startup.items()
+            )
+        )
+        for label, latency in result.get("endpoints", {}).items():
+            print(
+                f"{'':>11}{label:<24} p50 {latency['p50_ms']:7.3f} ms  "
+                f"p90 {latency['p90_ms']:7.3f} ms  p99 {latency['p99_ms']:7.3f} ms"
+            )
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["--startup-child"]:
+        # Internal entry point for startup_in_subprocess
+        print(json.dumps(measure_startup(*argv[1:4])))
+        return 0
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="comma-separated catalog sizes")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per endpoint; 0 skips latency")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--zones", action="store_true", help="give synthetic restaurants timezones")
+    parser.add_argument("--workdir", help="keep generated databases here instead of a temporary directory")
+    parser.add_argument("--output", help=f"results JSON path (default: {RESULTS_DIR}/<commit>.json)")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    report = {"environment": environment(), "results": []}
+
+    with tempfile.TemporaryDirectory(prefix="open-bites-bench-") as tmp:
+        workdir = args.workdir or tmp
+        os.makedirs(workdir, exist_ok=True)
+        for rows in sizes:
+            report["results"].append(run_size(rows, workdir, args.requests, args.seed, args.zones))
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{report['environment']['commit'] or 'results'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print_summary(report["results"])
+    print(f"Results written to '{output}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
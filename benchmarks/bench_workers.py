@@ -0,0 +1,100 @@
+"""
+Throughput of `python -m app.serve` as the number of worker processes grows.
+Each client process sends keep-alive requests for a fixed time; run it on a
+machine with more cores than the largest worker count plus clients.
+
+    python -m benchmarks.bench_workers --workers 1,2,4 --clients 8 --seconds 10
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import httpx
+
+from benchmarks.synthetic import build_catalog_db
+
+WEEK_START = datetime(2024, 12, 16)
+
+
+def client(base_url, seconds, seed):
+    """
+    Sends /open_restaurants/ requests with random minutes for `seconds`; returns the count.
+    """
+    rng = random.Random(seed)
+    done = 0
+    deadline = time.perf_counter() + seconds
+    with httpx.Client(base_url=base_url, timeout=30) as http:
+        while time.perf_counter() < deadline:
+            moment = WEEK_START + timedelta(minutes=rng.randrange(7 * 24 * 60))
+            http.get("/open_restaurants/", params={"datetime_str": moment.isoformat(), "limit": 10}).raise_for_status()
+            done += 1
+    return done
+
+
+def wait_until_ready(base_url, timeout=120):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(base_url + "/metrics", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def run(workers, clients, seconds, db_path, workdir, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port),
+         "--db", db_path, "--snapshot", os.path.join(workdir, "none.snapshot"),
+         "--generations-dir", os.path.join(workdir, f"generations-{workers}")],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_until_ready(base_url)
+        # Warm every worker's response cache and lazily built structures first
+        client(base_url, 2, seed=-1)
+        with multiprocessing.Pool(clients) as pool:
+            counts = pool.starmap(client, [(base_url, seconds, seed) for seed in range(clients)])
+    finally:
+        server.terminate()
+        server.wait()
+    return sum(counts) / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4", help="comma-separated worker counts")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--output", help="optional results JSON path")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory(prefix="open-bites-workers-") as workdir:
+        db_path = os.path.join(workdir, "restaurants.db")
+        build_catalog_db(os.path.join(workdir, "restaurants.csv"), db_path, args.rows)
+        baseline = None
+        for workers in (int(w) for w in args.workers.split(",")):
+            rate = run(workers, args.clients, args.seconds, db_path, workdir, args.port)
+            baseline = baseline or rate
+            results.append({"workers": workers, "requests_per_s": rate, "speedup": rate / baseline})
+            print(f"{workers:>3} workers  {rate:10,.0f} req/s  x{rate / baseline:.2f}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "rows": args.rows, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
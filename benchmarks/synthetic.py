@@ -0,0 +1,130 @@
+"""
+Synthetic restaurant catalogs for benchmarks, with the hours shapes real feeds
+contain: single ranges, multi-segment schedules, day ranges that wrap past
+Sunday and overnight hours that close after midnight.
+
+    python -m benchmarks.synthetic --rows 100000 --db /tmp/restaurants.db
+"""
+import argparse
+import csv
+import random
+
+from benchmarks.bench_parser import load_shapes
+from csv_to_sqlite import ingest
+
+DAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+# Timezones written to the optional Timezone column when zones are requested
+ZONES = ["America/New_York", "America/Chicago", "America/Los_Angeles", "Europe/London", "Asia/Tokyo"]
+
+# Distinct hours strings per restaurant; the rest repeat a chain-wide schedule
+UNIQUE_RATIO = 0.02
+
+
+def format_time(minutes):
+    """
+    Formats minutes after midnight the way the sample CSV does, e.g. "11:30 am".
+    """
+    hour, minute = divmod(minutes % (24 * 60), 60)
+    period = "am" if hour < 12 else "pm"
+    hour = hour % 12 or 12
+    return f"{hour}:{minute:02d} {period}" if minute else f"{hour} {period}"
+
+
+def day_range(rng, wrap=False):
+    """
+    Returns a day range like "Mon-Fri", or one wrapping past Sunday like "Fri-Mon".
+    """
+    if wrap:
+        start = rng.randint(3, 6)
+        end = rng.randint(0, start - 2)
+    else:
+        start = rng.randint(0, 5)
+        end = rng.randint(start + 1, 6)
+    return f"{DAYS[start]}-{DAYS[end]}"
+
+
+def time_range(rng, overnight=False):
+    """
+    Returns a time range on a quarter-hour grid; overnight ranges close after midnight.
+    """
+    if overnight:
+        opens = rng.randrange(16 * 60, 23 * 60, 15)
+        closes = rng.randrange(24 * 60 + 30, 28 * 60, 15)
+    else:
+        opens = rng.randrange(6 * 60, 13 * 60, 15)
+        closes = rng.randrange(max(opens + 120, 14 * 60), 23 * 60 + 30, 15)
+    return f"{format_time(opens)} - {format_time(closes)}"
+
+
+def random_hours(rng):
+    """
+    Generates one hours string.
+    """
+    kind = rng.random()
+    if kind < 0.35:
+        return f"{day_range(rng)} {time_range(rng)}"
+    if kind < 0.6:
+        # Weekday and weekend hours, the most common multi-segment shape
+        split = rng.randint(3, 5)
+        return (
+            f"{DAYS[0]}-{DAYS[split - 1]}, {DAYS[6]} {time_range(rng)} / "
+            f"{DAYS[split]}-{DAYS[5]} {time_range(rng, overnight=rng.random() < 0.5)}"
+        )
+    if kind < 0.8:
+        return f"{day_range(rng, wrap=True)} {time_range(rng, overnight=rng.random() < 0.5)}"
+    if kind < 0.9:
+        return f"{day_range(rng)} {time_range(rng, overnight=True)}"
+    segments = rng.sample(DAYS, 3)
+    return " / ".join(f"{day} {time_range(rng, overnight=rng.random() < 0.3)}" for day in segments)
+
+
+def iter_catalog(rows, seed=0, unique_ratio=UNIQUE_RATIO, zones=False):
+    """
+    Yields (name, hours, timezone) for `rows` synthetic restaurants. Most rows
+    reuse one of a pool of chain schedules, seeded with the sample CSV's shapes,
+    so the parse cache sees the same repetition it does on real data.
+    """
+    rng = random.Random(seed)
+    chains = load_shapes() + [random_hours(rng) for _ in range(max(50, rows // 200))]
+    for i in range(rows):
+        hours = random_hours(rng) if rng.random() < unique_ratio else rng.choice(chains)
+        timezone = rng.choice(ZONES) if zones else ""
+        yield f"Restaurant {i:07d}", hours, timezone
+
+
+def write_catalog_csv(path, rows, seed=0, unique_ratio=UNIQUE_RATIO, zones=False):
+    """
+    Writes a synthetic catalog in the layout csv_to_sqlite.py reads.
+    """
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
+        writer.writerow(["Restaurant Name", "Hours", "Timezone"])
+        writer.writerows(iter_catalog(rows, seed, unique_ratio, zones))
+
+
+def build_catalog_db(csv_path, db_path, rows, seed=0, unique_ratio=UNIQUE_RATIO, zones=False):
+    """
+    Writes a synthetic CSV and imports it with csv_to_sqlite.ingest.
+    Returns the ingest stats.
+    """
+    write_catalog_csv(csv_path, rows, seed, unique_ratio, zones)
+    return ingest(csv_path, db_path, progress_every=0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--db", required=True, help="output SQLite database path")
+    parser.add_argument("--csv", help="intermediate CSV path (default: next to the database)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--unique-ratio", type=float, default=UNIQUE_RATIO)
+    parser.add_argument("--zones", action="store_true", help="fill the Timezone column")
+    args = parser.parse_args()
+
+    stats = build_catalog_db(args.csv or args.db + ".csv", args.db, args.rows, args.seed, args.unique_ratio, args.zones)
+    print(f"{stats['written']:,} restaurants written to '{args.db}' in {stats['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,283 @@
 import sqlite3
 import csv
 import os
+import sys
+import time
+import argparse
+
+from app.data_handler import parse_failures, record_parse_failures
+from app.schedule_index import hours_digest, hours_to_blob
+from app.snapshot import DEFAULT_SNAPSHOT_PATH, build_snapshot
+from app.timezones import is_valid_zone
 
 # Define paths
 db_path = "app/restaurants.db"
 csv_path = "data/restaurants.csv"
 
-# Check if CSV exists
-if not os.path.exists(csv_path):
-    print(f"CSV file not found at path: '{csv_path}'")
-    exit(1)
-
-# Connect to SQLite database
-conn = sqlite3.connect(db_path)
-cursor = conn.cursor()
-
-# Read CSV and insert data
-with open(csv_path, "r", encoding="utf-8") as f:
-    reader = csv.DictReader(f)
-    for row in reader:
-        name = row.get("Restaurant Name", "").strip().strip('"')
-        hours = row.get("Hours", "").strip()
-
-        if name and hours:
-            try:
-                cursor.execute("""
-                    INSERT INTO restaurants (name, hours)
-                    VALUES (?, ?)
-                """, (name, hours))
-            except sqlite3.IntegrityError:
-                print(f"Duplicate entry skipped for restaurant: {name}")
-        else:
-            print(f"Skipping incomplete row: {row}")
-
-# Commit changes and close connection
-conn.commit()
-conn.close()
-print("Data successfully migrated to SQLite!")
+# Rows written per executemany transaction
+BATCH_SIZE = 10_000
+
+# Newest change log entries kept after an import; servers further behind reload in full
+CHANGE_LOG_KEEP = 100_000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurants (
+id INTEGER PRIMARY KEY AUTOINCREMENT,
+name TEXT NOT NULL UNIQUE,
+hours TEXT NOT NULL,
+intervals BLOB,
+hours_hash TEXT,
+timezone TEXT,
+cuisine TEXT,
+tags TEXT
+)
+"""
+
+# Full-text index over the searchable columns, kept in sync by the triggers
+# below. External content: the text lives only in the restaurants table.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS restaurants_fts USING fts5(
+name, cuisine, tags,
+content='restaurants', content_rowid='id',
+tokenize='unicode61 remove_diacritics 2'
+)
+"""
+
+SEARCH_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_insert AFTER INSERT ON restaurants BEGIN
+        INSERT INTO restaurants_fts(rowid, name, cuisine, tags)
+        VALUES (NEW.id, NEW.name, NEW.cuisine, NEW.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_delete AFTER DELETE ON restaurants BEGIN
+        INSERT INTO restaurants_fts(restaurants_fts, rowid, name, cuisine, tags)
+        VALUES ('delete', OLD.id, OLD.name, OLD.cuisine, OLD.tags);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_fts_update AFTER UPDATE OF name, cuisine, tags ON restaurants BEGIN
+        INSERT INTO restaurants_fts(restaurants_fts, rowid, name, cuisine, tags)
+        VALUES ('delete', OLD.id, OLD.name, OLD.cuisine, OLD.tags);
+        INSERT INTO restaurants_fts(rowid, name, cuisine, tags)
+        VALUES (NEW.id, NEW.name, NEW.cuisine, NEW.tags);
+    END
+    """,
+)
+
+# Names of restaurants whose catalog entry changed, in commit order, so a
+# running server can reload just those rows. Maintained by the triggers below;
+# edits that touch neither name, hours nor timezone are not logged.
+CHANGES_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurant_changes (
+seq INTEGER PRIMARY KEY AUTOINCREMENT,
+name TEXT NOT NULL
+)
+"""
+
+CHANGE_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_log_insert AFTER INSERT ON restaurants BEGIN
+        INSERT INTO restaurant_changes(name) VALUES (NEW.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_log_delete AFTER DELETE ON restaurants BEGIN
+        INSERT INTO restaurant_changes(name) VALUES (OLD.name);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS restaurants_log_update AFTER UPDATE OF name, hours, timezone ON restaurants
+    WHEN NEW.name IS NOT OLD.name OR NEW.hours IS NOT OLD.hours OR NEW.timezone IS NOT OLD.timezone
+    BEGIN
+        INSERT INTO restaurant_changes(name) SELECT OLD.name UNION SELECT NEW.name;
+    END
+    """,
+)
+
+# Random token identifying this database's change log. Sequence numbers restart
+# in a recreated database, so a server compares the token before trusting them.
+CHANGES_ID_SCHEMA = """
+CREATE TABLE IF NOT EXISTS restaurant_changes_id (
+id TEXT NOT NULL
+)
+"""
+
+CHANGES_ID_INSERT = """
+    INSERT INTO restaurant_changes_id (id)
+    SELECT lower(hex(randomblob(16)))
+    WHERE NOT EXISTS (SELECT 1 FROM restaurant_changes_id)
+"""
+
+PRUNE_CHANGES = """
+    DELETE FROM restaurant_changes
+    WHERE seq <= (SELECT MAX(seq) FROM restaurant_changes) - ?
+"""
+
+UPSERT = """
+    INSERT INTO restaurants (name, hours, intervals, hours_hash, timezone, cuisine, tags)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(name) DO UPDATE SET
+        hours = excluded.hours, intervals = excluded.intervals, hours_hash = excluded.hours_hash,
+        timezone = excluded.timezone,
+        cuisine = excluded.cuisine, tags = excluded.tags
+    WHERE excluded.hours IS NOT restaurants.hours
+        OR excluded.intervals IS NOT restaurants.intervals
+        OR excluded.hours_hash IS NOT restaurants.hours_hash
+        OR excluded.timezone IS NOT restaurants.timezone
+        OR excluded.cuisine IS NOT restaurants.cuisine
+        OR excluded.tags IS NOT restaurants.tags
+"""
+
+
+def ensure_schema(conn):
+    """
+    Creates the restaurants table, its change log and its search index, adding
+    columns missing from older databases and indexing the rows they already hold.
+    """
+    conn.execute(SCHEMA)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(restaurants)")}
+    for column, column_type in (
+        ("intervals", "BLOB"), ("hours_hash", "TEXT"), ("timezone", "TEXT"), ("cuisine", "TEXT"), ("tags", "TEXT"),
+    ):
+        if column not in columns:
+            conn.execute(f"ALTER TABLE restaurants ADD COLUMN {column} {column_type}")
+    # Superseded by hours_hash, which readers check against the hours text
+    conn.execute("DROP TRIGGER IF EXISTS restaurants_clear_stale_intervals")
+    conn.execute(CHANGES_SCHEMA)
+    conn.execute(CHANGES_ID_SCHEMA)
+    conn.execute(CHANGES_ID_INSERT)
+    for trigger in CHANGE_TRIGGERS:
+        conn.execute(trigger)
+
+    indexed = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'restaurants_fts'").fetchone()
+    conn.execute(SEARCH_SCHEMA)
+    for trigger in SEARCH_TRIGGERS:
+        conn.execute(trigger)
+    if indexed is None:
+        conn.execute("INSERT INTO restaurants_fts(restaurants_fts) VALUES ('rebuild')")
+
+
+def read_rows(csv_path, stats):
+    """
+    Streams (name, hours, timezone, cuisine, tags) from the CSV, skipping incomplete
+    rows. The "Timezone", "Cuisine" and "Tags" columns are optional; a blank value stores NULL.
+    """
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            stats["read"] += 1
+            name = (row.get("Restaurant Name") or "").strip().strip('"')
+            hours = (row.get("Hours") or "").strip()
+            timezone = (row.get("Timezone") or "").strip() or None
+            cuisine = (row.get("Cuisine") or "").strip() or None
+            tags = (row.get("Tags") or "").strip() or None
+
+            if name and hours:
+                yield name, hours, timezone, cuisine, tags
+            else:
+                stats["incomplete"] += 1
+                print(f"Skipping incomplete row: {row}")
+
+
+def validate_rows(rows, stats):
+    """
+    Pre-parses hours with parse_hours and yields (name, hours, intervals, hours_hash,
+    timezone, cuisine, tags) ready to insert. Rows with any hours segment the parser
+    rejects, so a day would be silently dropped, or whose timezone is not a
+    known IANA name, are reported and skipped.
+    """
+    for name, hours, timezone, cuisine, tags in rows:
+        if timezone is not None and not is_valid_zone(timezone):
+            stats["invalid"] += 1
+            print(f"Skipping restaurant with unknown timezone: {name!r}: {timezone!r}")
+            continue
+        intervals = hours_to_blob(hours)
+        failures = parse_failures(hours)
+        record_parse_failures(failures)
+        if failures or not intervals:
+            stats["invalid"] += 1
+            detail = f" ({', '.join(failures)})" if failures else ""
+            print(f"Skipping restaurant with unparseable hours{detail}: {name!r}: {hours!r}")
+            continue
+        yield name, hours, intervals, hours_digest(hours), timezone, cuisine, tags
+
+
+def batched(rows, size):
+    """
+    Groups an iterable into lists of at most `size` items.
+    """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ingest(csv_path, db_path, batch_size=BATCH_SIZE, progress_every=100_000):
+    """
+    Loads the CSV into SQLite in batched transactions with bounded memory.
+    Returns a stats dictionary.
+    """
+    stats = {"read": 0, "written": 0, "incomplete": 0, "invalid": 0}
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        ensure_schema(conn)
+
+        start = time.perf_counter()
+        next_report = progress_every
+        for batch in batched(validate_rows(read_rows(csv_path, stats), stats), batch_size):
+            conn.execute("BEGIN")
+            conn.executemany(UPSERT, batch)
+            conn.execute("COMMIT")
+            stats["written"] += len(batch)
+            if progress_every and stats["written"] >= next_report:
+                elapsed = time.perf_counter() - start
+                print(f"{stats['written']:,} rows written ({stats['written'] / elapsed:,.0f} rows/s)")
+                next_report += progress_every
+
+        stats["seconds"] = time.perf_counter() - start
+        conn.execute(PRUNE_CHANGES, (CHANGE_LOG_KEEP,))
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    finally:
+        conn.close()
+    return stats
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Stream a restaurants CSV into SQLite.")
+    parser.add_argument("--csv", default=csv_path, help="input CSV path")
+    parser.add_argument("--db", default=db_path, help="output SQLite database path")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--snapshot", default=DEFAULT_SNAPSHOT_PATH, help="catalog snapshot output path")
+    parser.add_argument("--no-snapshot", action="store_true", help="skip writing the catalog snapshot")
+    args = parser.parse_args(argv)
+
+    # Check if CSV exists
+    if not os.path.exists(args.csv):
+        print(f"CSV file not found at path: '{args.csv}'")
+        return 1
+
+    stats = ingest(args.csv, args.db, args.batch_size)
+    rate = stats["written"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(
+        f"Data successfully migrated to SQLite! {stats['written']:,} rows written, "
+        f"{stats['incomplete']:,} incomplete and {stats['invalid']:,} invalid rows skipped "
+        f"in {stats['seconds']:.2f} s ({rate:,.0f} rows/s)"
+    )
+
+    if not args.no_snapshot:
+        build_snapshot(args.db, args.snapshot)
+        print(f"Catalog snapshot written to '{args.snapshot}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())